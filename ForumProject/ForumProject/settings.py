@@ -68,6 +68,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'users.middleware.JWTAuthMiddleware',
+    'users.middleware.ActivityTrackingMiddleware',
+    'projects.middleware.AuditLogMiddleware',
     'django_ratelimit.middleware.RatelimitMiddleware',
 ]
 
@@ -262,6 +264,15 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# Bulk user provisioning (see users/provisioning.py)
+USER_IMPORT_CHUNK_SIZE = 500
+# Password hashing processes of the import command, None = one per CPU, 0 = hash in-process
+USER_IMPORT_WORKERS = None
+# Password hashing threads of the import API, 0 = hash in the request thread
+USER_IMPORT_REQUEST_WORKERS = 2
+# Records accepted by the import API, larger files are imported with the import_users command
+USER_IMPORT_MAX_RECORDS = 2000
+
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 # EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = config('EMAIL_HOST')
@@ -270,6 +281,12 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 EMAIL_PORT = config('EMAIL_PORT')
 EMAIL_USE_TLS = config('EMAIL_USE_TLS')
 
+# Outbox delivery (see notifications/management/commands/send_queued_emails.py)
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# Seconds before the first retry, doubled after every failed attempt
+EMAIL_OUTBOX_RETRY_DELAY = 60
+
 CRYPTOGRAPHY_KEY = config('CRYPTOGRAPHY_KEY')
 
 CACHES = {
@@ -284,6 +301,32 @@ CACHES = {
 
 RATELIMIT_VIEW = 'communications.views.too_many_requests'
 
+CHAT_DIRECTORY_PAGE_SIZE = 20
+
+# Project file uploads (see projects/uploads.py)
+# Bytes per startup
+STARTUP_STORAGE_QUOTA = 5 * 1024 ** 3
+# Seconds after the last chunk before a session expires
+PROJECT_UPLOAD_SESSION_TTL = 24 * 60 * 60
+# Seconds a request writing a chunk holds the session, longer than any request may take
+PROJECT_UPLOAD_CHUNK_LEASE = 15 * 60
+
+# File delivery (see projects/delivery.py)
+# 'x-accel-redirect' (nginx), 'x-sendfile' (Apache, lighttpd) or 'python' for local runs
+FILE_DELIVERY_BACKEND = 'python'
+# Internal nginx location mapped to MEDIA_ROOT
+FILE_DELIVERY_ACCEL_PREFIX = '/protected/'
+# Seconds a signed file URL stays valid
+FILE_URL_MAX_AGE = 5 * 60
+
+# Project budgets are normalized to this currency (see projects/budgets.py)
+BASE_CURRENCY = 'USD'
+# Seconds currency rates stay cached for converting saved budgets, dropped when the rates change
+CURRENCY_RATE_CACHE_TIMEOUT = 60 * 60
+
+# Seconds project cap tables stay cached (see projects/cap_table.py), invalidated on every change
+CAP_TABLE_CACHE_TIMEOUT = 60 * 60
+
 try:
     from .local_settings import *
 except ImportError:
@@ -3,7 +3,7 @@ import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 
 from .utils import get_room, get_messages, get_online_users, get_user_first_name, \
-    add_user_to_online, remove_user_from_online, create_message
+    add_user_to_online, remove_user_from_online, create_message, record_activity
 
 logger = logging.getLogger('django.server')
 
@@ -53,6 +53,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
         logger.info(f'{self.user.email} has connected to the room')
         await add_user_to_online(self.room, self.user)
+        await record_activity(self.user)
 
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard(
@@ -98,6 +99,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         logger.info(f'Message sent by {self.user.email}')
         await create_message(self.user, self.room, message)
+        await record_activity(self.user)
 
     async def chat_message(self, event):
         await self.send(text_data=json.dumps(event))
@@ -0,0 +1,47 @@
+"""
+Maintenance of the chat contact directory.
+
+`ChatContact` duplicates names and roles from other tables, so every change to a membership,
+user, role or startup is propagated here with a single INSERT or UPDATE. Bulk writes that bypass
+signals (such as user provisioning) create the rows themselves with `ChatContact.from_membership`.
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from startups.models import Startup
+from users.models import CustomUser, UserRoleCompany, UserStartup
+from .models import ChatContact
+
+
+@receiver(post_save, sender=UserStartup)
+def sync_membership_contact(sender, instance, created, **kwargs):
+    contact = ChatContact.from_membership(instance)
+    if created:
+        contact.save()
+        return
+    ChatContact.objects.update_or_create(membership=instance, defaults={
+        field: getattr(contact, field)
+        for field in ('user', 'startup', 'full_name', 'startup_name', 'role', 'name_key', 'startup_key')
+    })
+
+
+@receiver(post_save, sender=CustomUser)
+def sync_user_contacts(sender, instance, created, **kwargs):
+    if created:
+        return
+    full_name = f'{instance.first_name} {instance.last_name}'.strip()
+    ChatContact.objects.filter(user=instance).exclude(full_name=full_name).update(
+        full_name=full_name, name_key=full_name.lower())
+
+
+@receiver(post_save, sender=UserRoleCompany)
+def sync_role_contacts(sender, instance, **kwargs):
+    ChatContact.objects.filter(user_id=instance.user_id).exclude(role=instance.role).update(role=instance.role)
+
+
+@receiver(post_save, sender=Startup)
+def sync_startup_contacts(sender, instance, created, **kwargs):
+    if created:
+        return
+    ChatContact.objects.filter(startup=instance).exclude(startup_name=instance.startup_name).update(
+        startup_name=instance.startup_name, startup_key=instance.startup_name.lower())
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.6 on 2026-10-19 05:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+BACKFILL_SQL = '''
+    INSERT INTO communications_chatcontact
+        (membership_id, user_id, startup_id, full_name, startup_name, role, name_key, startup_key)
+    SELECT us.id, u.id, s.id,
+           btrim(u.first_name || ' ' || u.last_name), s.startup_name, coalesce(r.role, ''),
+           lower(btrim(u.first_name || ' ' || u.last_name)), lower(s.startup_name)
+    FROM users_userstartup us
+    JOIN users_customuser u ON u.id = us.customuser_id
+    JOIN startups_startup s ON s.id = us.startup_id
+    LEFT JOIN users_userrolecompany r ON r.user_id = u.id
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0002_initial'),
+        ('startups', '0001_initial'),
+        ('users', '0002_customuser_last_seen'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatContact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=41)),
+                ('startup_name', models.CharField(max_length=150)),
+                ('role', models.CharField(max_length=9)),
+                ('name_key', models.CharField(max_length=41)),
+                ('startup_key', models.CharField(max_length=150)),
+                ('membership', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='chat_contact', to='users.userstartup')),
+                ('startup', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='startups.startup')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name_key', 'id'],
+                'indexes': [models.Index(fields=['name_key', 'id'], name='chat_contact_name_idx'), models.Index(fields=['name_key'], name='chat_contact_name_like_idx', opclasses=['varchar_pattern_ops']), models.Index(fields=['startup_key'], name='chat_contact_startup_like_idx', opclasses=['varchar_pattern_ops'])],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -2,6 +2,8 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 from django_cryptography.fields import encrypt
+from startups.models import Startup
+from users.models import UserStartup
 
 
 User = get_user_model()
@@ -52,4 +54,52 @@ class Message(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f'{self.user.first_name}: {self.content} [{self.timestamp.strftime("%Y-%m-%d %H:%M")}]'
\ No newline at end of file
+        return f'{self.user.first_name}: {self.content} [{self.timestamp.strftime("%Y-%m-%d %H:%M")}]'
+
+
+class ChatContact(models.Model):
+    """
+    A denormalized row of the chat contact directory, one per startup membership.
+
+    The row joins the user, the startup and the user's role, so listing and searching the directory
+    reads a single table. Lowercase keys back the case-insensitive prefix search and the keyset
+    ordering. Rows are kept in sync by the receivers in `communications.directory`.
+    """
+    membership = models.OneToOneField(UserStartup, on_delete=models.CASCADE, related_name='chat_contact')
+    user = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    startup = models.ForeignKey(Startup, on_delete=models.CASCADE, related_name='+')
+    full_name = models.CharField(max_length=41)
+    startup_name = models.CharField(max_length=150)
+    role = models.CharField(max_length=9)
+    name_key = models.CharField(max_length=41)
+    startup_key = models.CharField(max_length=150)
+
+    class Meta:
+        ordering = ['name_key', 'id']
+        indexes = [
+            models.Index(fields=['name_key', 'id'], name='chat_contact_name_idx'),
+            models.Index(fields=['name_key'], opclasses=['varchar_pattern_ops'],
+                         name='chat_contact_name_like_idx'),
+            models.Index(fields=['startup_key'], opclasses=['varchar_pattern_ops'],
+                         name='chat_contact_startup_like_idx'),
+        ]
+
+    @classmethod
+    def from_membership(cls, membership, user=None, startup=None, role=None):
+        """
+        Builds an unsaved contact for a startup membership.
+
+        The related objects can be passed in when the caller already holds them,
+        which saves a query per object.
+        """
+        user = user or membership.customuser
+        startup = startup or membership.startup
+        if role is None:
+            role = getattr(getattr(user, 'user_info', None), 'role', '')
+        full_name = f'{user.first_name} {user.last_name}'.strip()
+        return cls(membership=membership, user=user, startup=startup, full_name=full_name,
+                   startup_name=startup.startup_name, role=role,
+                   name_key=full_name.lower(), startup_key=startup.startup_name.lower())
+
+    def __str__(self):
+        return f'{self.full_name} ({self.startup_name})'
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from communications.models import Room, Message
+from communications.models import Room, Message, ChatContact
 
 class CreateConversationSerializer(serializers.Serializer):
     participants = serializers.ListField(child=serializers.IntegerField())
@@ -21,4 +21,9 @@ class RoomSerializer(serializers.ModelSerializer):
 class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class ChatContactSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatContact
+        fields = ['user', 'full_name', 'startup', 'startup_name', 'role']
@@ -5,9 +5,11 @@ from channels.testing import WebsocketCommunicator
 from django.contrib.auth.models import AnonymousUser
 from django.test import TestCase, Client, TransactionTestCase
 from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
 
 from communications.consumers import ChatConsumer
-from communications.models import Room
+from communications.models import Room, ChatContact
 from communications.utils import get_room, get_user_first_name
 from investors.models import Investor
 from startups.models import Startup
@@ -117,6 +119,67 @@ class CommunicationsViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class ChatContactDirectoryTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.investor_user = CustomUser.objects.create_user(
+            email='investor@example.com', first_name='Investor', last_name='User',
+            phone_number='+3801234567', password='password', is_active=True)
+        UserRoleCompany.objects.create(user=cls.investor_user, role='investor')
+
+        cls.startup = Startup.objects.create(startup_name='Django startups', startup_industry='IT',
+                                             startup_phone='+3801234567', startup_country='UA',
+                                             startup_city='Lviv', startup_address='I Franka 123')
+        for first_name in ('Anna', 'Andrew', 'Boris'):
+            user = CustomUser.objects.create_user(
+                email=f'{first_name.lower()}@example.com', first_name=first_name, last_name='Doe',
+                phone_number='+3801234567', password='password', is_active=True)
+            UserStartup.objects.create(customuser=user, startup=cls.startup, startup_role_id=1)
+            UserRoleCompany.objects.create(user=user, role='startup', company_id=cls.startup.id)
+
+    def setUp(self):
+        self.client.force_authenticate(self.investor_user)
+
+    def test_contacts_are_kept_in_sync(self):
+        contact = ChatContact.objects.get(user__email='anna@example.com')
+        self.assertEqual((contact.full_name, contact.startup_name, contact.role),
+                         ('Anna Doe', 'Django startups', 'startup'))
+
+        self.startup.startup_name = 'Flask startups'
+        self.startup.save()
+        user = contact.user
+        user.last_name = 'Smith'
+        user.save()
+
+        contact.refresh_from_db()
+        self.assertEqual((contact.full_name, contact.name_key), ('Anna Smith', 'anna smith'))
+        self.assertEqual((contact.startup_name, contact.startup_key), ('Flask startups', 'flask startups'))
+
+    def test_contacts_keyset_pagination(self):
+        response = self.client.get(reverse('communications:contacts'), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([contact['full_name'] for contact in response.data['results']],
+                         ['Andrew Doe', 'Anna Doe'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([contact['full_name'] for contact in response.data['results']], ['Boris Doe'])
+        self.assertIsNone(response.data['next'])
+
+    def test_contacts_prefix_search(self):
+        response = self.client.get(reverse('communications:contacts'), {'q': 'AN'})
+        self.assertEqual([contact['full_name'] for contact in response.data['results']],
+                         ['Andrew Doe', 'Anna Doe'])
+
+        response = self.client.get(reverse('communications:contacts'), {'q': 'django'})
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_contacts_are_for_investors_only(self):
+        self.client.force_authenticate(CustomUser.objects.get(email='anna@example.com'))
+        response = self.client.get(reverse('communications:contacts'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
 class ChatConsumerTest(TestCase):
 
     def setUp(self):
@@ -10,6 +10,7 @@ urlpatterns = [
     path('conversations/', CreateConversationView.as_view(), name='create-conversation'),
     path('messages/', SendMessageView.as_view(), name='send-message'),
     path('conversations/<int:conversation_id>/messages/', ListMessagesView.as_view(), name='list-messages'),
+    path('api/contacts/', views.ChatContactListView.as_view(), name='contacts'),
     path('api/load-messages/<int:room_id>/', load_messages, name='load_messages'),
     path('api/conversations/', views.create_conversation, name='create-conversation'),
     path('api/messages/', views.send_message, name='send-message'),
@@ -4,6 +4,7 @@ from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 
 from communications.models import Room, Message
+from users import activity
 
 logger = logging.getLogger('django.server')
 
@@ -44,3 +45,8 @@ def remove_user_from_online(room, user):
 @sync_to_async
 def get_user_first_name(user):
     return user.first_name
+
+
+@sync_to_async
+def record_activity(user):
+    return activity.touch(user.pk)
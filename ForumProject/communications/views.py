@@ -1,16 +1,19 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.db.models import Q
 from django.http import HttpResponseForbidden
 from django.shortcuts import render, get_object_or_404
 
-from .serializers import RoomSerializer, MessageSerializer
-from .models import Room, Message
+from .serializers import RoomSerializer, MessageSerializer, ChatContactSerializer
+from .models import Room, Message, ChatContact
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from rest_framework import generics
-from users.models import UserRoleCompany, UserStartup
+from users.models import UserRoleCompany
+from users.permissions import IsInvestorRole
 from django.core.signing import BadSignature
 from .models import Room, Message
 
@@ -68,22 +71,61 @@ User = get_user_model()
 logger = logging.getLogger('django.server')
 
 
+def get_contacts(user, query=None):
+    """
+    Returns the chat contact directory as seen by the given user, optionally filtered
+    by a case-insensitive prefix of the contact's name or startup name.
+    """
+    contacts = ChatContact.objects.exclude(user=user)
+    if query:
+        query = query.strip().lower()
+        contacts = contacts.filter(Q(name_key__startswith=query) | Q(startup_key__startswith=query))
+    return contacts
+
+
+class ChatContactPagination(CursorPagination):
+    """
+    Keyset pagination over the contact directory, so every page costs the same
+    regardless of how deep the client has scrolled.
+    """
+    page_size = settings.CHAT_DIRECTORY_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('name_key', 'id')
+
+
+class ChatContactListView(generics.ListAPIView):
+    """
+    Lists the chat contact directory for investors.
+
+    Query parameters:
+    - q: Prefix of the contact's full name or startup name.
+    - cursor: The cursor returned in the `next`/`previous` links.
+    """
+    serializer_class = ChatContactSerializer
+    pagination_class = ChatContactPagination
+    permission_classes = [IsInvestorRole]
+
+    def get_queryset(self):
+        return get_contacts(self.request.user, self.request.query_params.get('q'))
+
+
 @login_required
 @ratelimit(key='user', rate='5/m', block=True)
 def index_view(request):
     user_role = UserRoleCompany.objects.filter(user=request.user).exists()
     if not user_role:
         raise PermissionDenied
-    users = []
+    contacts = []
     if request.user.user_info.role == 'investor':
-        startups = UserStartup.objects.all().values_list('customuser', flat=True)
-        users = User.objects.filter(id__in=startups).exclude(id=request.user.id)
+        contacts = get_contacts(request.user).order_by(*ChatContactPagination.ordering)[
+            :ChatContactPagination.page_size]
     rooms_list = Room.objects.filter(name__contains=str(request.user.id))
 
     logger.info(f"User  with email {request.user.email} accessed the index page")
 
     return render(request, 'index.html', {
-        'rooms': rooms_list, 'users': users
+        'rooms': rooms_list, 'contacts': contacts
     })
 
 
@@ -0,0 +1,247 @@
+"""
+Bulk loading of the platform's core entities through PostgreSQL COPY, for seeding and migrations.
+
+Records (e.g. read from the files written by `export_entities`, see `users.provisioning.read_records`)
+are streamed into a temporary staging table with one `COPY FROM STDIN` and moved into the entity's
+table with one INSERT ... SELECT, all in one transaction. Columns missing from the records get the
+model defaults; IDs come from the table's sequence unless the records carry them, in which case the
+sequence is advanced past them.
+
+No model signals are sent. The rows the receivers would derive are created afterwards from the
+staging table with one set-based statement each:
+
+- startups, investors: their default notification preferences;
+- projects: their 'Created Project' log entries, with the creation diff (see `projects.history`);
+- shares: the funding ledger (`Project.allocated_share`) of the affected projects, whose cached
+  cap tables are dropped (see `projects.cap_table`);
+- user_startups: the chat directory contacts of the memberships (see `communications.directory`);
+- user_roles: the roles shown in the chat directory.
+
+No notifications are sent for loaded rows.
+
+Functions:
+    load_records: Loads records of an entity, returning the number of loaded rows.
+"""
+
+import json
+from itertools import chain
+
+from django.db import connection, transaction
+
+from communications.models import ChatContact
+from investors.models import Investor
+from notifications.models import InvestorNotificationPrefs, StartupNotificationPrefs
+from projects import cap_table
+from projects.history import CREATED_PROJECT_ACTION, TRACKED_FIELDS
+from projects.models import InvestorProject, Project, ProjectLog
+from startups.models import Startup
+from users.models import UserInvestor, UserRoleCompany, UserStartup
+from .exports import EXCLUDED_FIELDS
+
+# In dependency order
+ENTITIES = {
+    'startups': Startup,
+    'investors': Investor,
+    'user_roles': UserRoleCompany,
+    'user_startups': UserStartup,
+    'user_investors': UserInvestor,
+    'projects': Project,
+    'shares': InvestorProject,
+}
+
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class _CopyStream:
+    """
+    A read-only file over lines of COPY text, as consumed by `copy_expert`.
+    """
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = b''
+
+    def read(self, size=-1):
+        size = COPY_BUFFER_SIZE if size is None or size < 0 else size
+        parts, length = [self._buffer], len(self._buffer)
+        for line in self._lines:
+            encoded = line.encode()
+            parts.append(encoded)
+            length += len(encoded)
+            if length >= size:
+                break
+        data = b''.join(parts)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _copy_value(field, value):
+    if value is None or (value == '' and field.null):
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return str(value).translate(COPY_ESCAPES)
+
+
+def _columns(model):
+    return [field for field in model._meta.concrete_fields if field.name not in EXCLUDED_FIELDS]
+
+
+def _loaded_fields(model, record):
+    """
+    Returns the fields named by the keys of a record, which may be field names or attnames.
+    """
+    fields = {}
+    for field in _columns(model):
+        fields[field.attname] = fields[field.name] = field
+    unknown = [key for key in record if key not in fields]
+    if unknown:
+        raise ValueError(f'Unknown columns for {model._meta.db_table}: {", ".join(unknown)}')
+    return [fields[key] for key in record]
+
+
+def _set_defaults(cursor, model, staging, loaded):
+    """
+    Gives the staging columns missing from the records the defaults the model would apply.
+    """
+    table = model._meta.db_table
+    for field in _columns(model):
+        if field in loaded:
+            continue
+        if field.primary_key:
+            cursor.execute(f"ALTER TABLE {staging} ALTER COLUMN {field.column} "
+                           f"SET DEFAULT nextval(pg_get_serial_sequence('{table}', '{field.column}'))")
+        elif getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            cursor.execute(f'ALTER TABLE {staging} ALTER COLUMN {field.column} SET DEFAULT now()')
+        elif field.has_default():
+            value = field.get_db_prep_save(field.get_default(), connection)
+            cursor.execute(f'ALTER TABLE {staging} ALTER COLUMN {field.column} SET DEFAULT %s', [value])
+        elif not field.null:
+            raise ValueError(f'Column {field.attname} is required for {table}')
+
+
+def _default_rows_sql(model, fk_column, staging):
+    """
+    Returns the statement creating a row of `model` with its defaults for every staged row.
+    """
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key and field.column != fk_column]
+    columns = ', '.join([fk_column] + [field.column for field in fields])
+    placeholders = ', '.join(['%s'] * len(fields))
+    params = [field.get_db_prep_save(field.get_default(), connection) for field in fields]
+    return (f'INSERT INTO {model._meta.db_table} ({columns}) SELECT id, {placeholders} FROM {staging} '
+            f'ON CONFLICT ({fk_column}) DO NOTHING', params)
+
+
+def _derived_rows_sql(entity, staging):
+    """
+    Returns the statements creating the rows signals would derive from the staged rows.
+    """
+    if entity == 'startups':
+        return [_default_rows_sql(StartupNotificationPrefs, 'startup_id', staging)]
+    if entity == 'investors':
+        return [_default_rows_sql(InvestorNotificationPrefs, 'investor_id', staging)]
+    if entity == 'projects':
+        tracked = ', '.join(f"'{field.attname}', p.{field.column}" for field in TRACKED_FIELDS)
+        return [(f"""
+            INSERT INTO {ProjectLog._meta.db_table}
+                (project_id, project_birth_id, change_date, change_time, user_id, startup_id,
+                 action, previous_state, modified_state, changes)
+            SELECT p.id, p.id, CURRENT_DATE, LOCALTIME,
+                   COALESCE((SELECT r.user_id FROM {UserRoleCompany._meta.db_table} r
+                             WHERE r.role = 'startup' AND r.company_id = p.startup_id
+                             ORDER BY r.id LIMIT 1), 0),
+                   p.startup_id, %s, 'n/a', left('New Project, id: ' || p.id || ', name: ' || p.name, 255),
+                   (SELECT jsonb_object_agg(key, jsonb_build_array(NULL, value))
+                    FROM jsonb_each(jsonb_strip_nulls(jsonb_build_object({tracked}))))
+            FROM {staging} p
+        """, [CREATED_PROJECT_ACTION])]
+    if entity == 'shares':
+        return [(f"""
+            UPDATE {Project._meta.db_table} p SET allocated_share = t.total, updated_at = now()
+            FROM (SELECT project_id, SUM(share) AS total FROM {InvestorProject._meta.db_table}
+                  WHERE project_id IN (SELECT project_id FROM {staging}) GROUP BY project_id) t
+            WHERE p.id = t.project_id
+        """, [])]
+    if entity == 'user_startups':
+        return [(f"""
+            INSERT INTO {ChatContact._meta.db_table}
+                (membership_id, user_id, startup_id, full_name, startup_name, role, name_key, startup_key)
+            SELECT m.id, u.id, s.id, btrim(u.first_name || ' ' || u.last_name), s.startup_name,
+                   COALESCE(r.role, ''), lower(btrim(u.first_name || ' ' || u.last_name)), lower(s.startup_name)
+            FROM {staging} m
+            JOIN users_customuser u ON u.id = m.customuser_id
+            JOIN {Startup._meta.db_table} s ON s.id = m.startup_id
+            LEFT JOIN {UserRoleCompany._meta.db_table} r ON r.user_id = u.id
+        """, [])]
+    if entity == 'user_roles':
+        return [(f"""
+            UPDATE {ChatContact._meta.db_table} c SET role = r.role
+            FROM {staging} r WHERE c.user_id = r.user_id AND c.role <> r.role
+        """, [])]
+    return []
+
+
+def load_records(entity, records):
+    """
+    Loads records of an entity, returning the number of loaded rows.
+
+    All records are loaded in one transaction: if any of them is rejected by the database (e.g. a
+    duplicate or a missing related row), nothing is loaded.
+
+    Parameters:
+    - entity (str): The name of the entity, a key of ENTITIES.
+    - records (iterable[dict]): The records; every record has the keys of the first one.
+
+    Returns:
+    - int: The number of loaded rows.
+
+    Raises:
+    - ValueError: If the records name unknown columns or miss a required one, or a line of the
+      file is not a record (see `users.provisioning.read_records`).
+    - DatabaseError: If the database rejects the records.
+    """
+    model = ENTITIES[entity]
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return 0
+    if isinstance(first, ValueError):
+        raise first
+    keys = list(first)
+    loaded = _loaded_fields(model, first)
+
+    # An error raised inside the COPY would surface as a cancelled query, it is raised after it instead
+    errors = []
+
+    def lines():
+        for record in chain([first], records):
+            if isinstance(record, ValueError):
+                errors.append(record)
+                return
+            yield '\t'.join(_copy_value(field, record.get(key)) for key, field in zip(keys, loaded)) + '\n'
+
+    table = model._meta.db_table
+    staging = f'load_{table}'
+    columns = ', '.join(field.column for field in _columns(model))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP')
+        _set_defaults(cursor, model, staging, loaded)
+        cursor.copy_expert(f'COPY {staging} ({", ".join(field.column for field in loaded)}) FROM STDIN',
+                           _CopyStream(lines()), size=COPY_BUFFER_SIZE)
+        if errors:
+            raise errors[0]
+        cursor.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging}')
+        count = cursor.rowcount
+        if model._meta.pk in loaded:
+            pk = model._meta.pk.column
+            cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', '{pk}'), "
+                           f"(SELECT max({pk}) FROM {table}))")
+        for sql, params in _derived_rows_sql(entity, staging):
+            cursor.execute(sql, params)
+        if entity == 'shares':
+            cursor.execute(f'SELECT DISTINCT project_id FROM {staging}')
+            cap_table.invalidate(*(project_id for project_id, in cursor.fetchall()))
+        cursor.execute(f'DROP TABLE {staging}')
+    return count
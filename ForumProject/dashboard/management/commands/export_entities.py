@@ -0,0 +1,59 @@
+"""
+Management command that dumps the platform's core entities for analytics.
+
+Each entity is written to `<output_dir>/<entity>.<format>[.gz]`, streamed from a server-side
+cursor, so memory use stays flat whatever the table size; see dashboard/exports.py.
+
+Usage:
+    python manage.py export_entities /var/exports                      # e.g. nightly from cron
+    python manage.py export_entities /var/exports --format csv --gzip
+    python manage.py export_entities /var/exports projects shares --since 2024-06-01T00:00:00Z
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from dashboard.exports import ENTITIES, FORMATS, export_rows, gzip_chunks
+
+
+class Command(BaseCommand):
+    help = 'Export startups, investors, projects, shares and subscriptions as NDJSON or CSV files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Directory the exports are written to.')
+        parser.add_argument('entities', nargs='*',
+                            help=f"Entities to export, all by default: {', '.join(ENTITIES)}.")
+        parser.add_argument('--format', choices=FORMATS, default='ndjson', help='Output format.')
+        parser.add_argument('--gzip', action='store_true', help='Compress the exports.')
+        parser.add_argument('--since', help='Only export rows updated at or after this ISO 8601 date-time.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['entities']) - set(ENTITIES)
+        if unknown:
+            raise CommandError(f"Unknown entities: {', '.join(sorted(unknown))}")
+        since = options['since']
+        if since is not None:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError('--since should be an ISO 8601 date-time')
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        os.makedirs(options['output_dir'], exist_ok=True)
+        for entity in options['entities'] or ENTITIES:
+            chunks = export_rows(entity, options['format'], since)
+            path = os.path.join(options['output_dir'], f"{entity}.{options['format']}")
+            if options['gzip']:
+                chunks, path = gzip_chunks(chunks), path + '.gz'
+            try:
+                with open(path, 'wb') as output:
+                    for chunk in chunks:
+                        output.write(chunk)
+            except OSError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f'Exported {entity} to {path}.')
@@ -0,0 +1,51 @@
+"""
+Management command that bulk loads the platform's core entities, e.g. to seed an environment.
+
+Each entity is read from `<input_dir>/<entity>.<format>[.gz]` (the layout written by
+`export_entities`) and loaded through PostgreSQL COPY, in dependency order, all in one
+transaction; see dashboard/loads.py. Missing files are skipped.
+
+Usage:
+    python manage.py load_entities /var/seed
+    python manage.py load_entities /var/seed startups projects --format csv
+"""
+
+import gzip
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from dashboard.exports import FORMATS
+from dashboard.loads import ENTITIES, load_records
+from users.provisioning import read_records
+
+
+class Command(BaseCommand):
+    help = 'Load startups, investors, user links, projects and shares from NDJSON or CSV files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input_dir', help='Directory the files are read from.')
+        parser.add_argument('entities', nargs='*',
+                            help=f"Entities to load, all by default: {', '.join(ENTITIES)}.")
+        parser.add_argument('--format', choices=FORMATS, default='ndjson', help='Input format.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['entities']) - set(ENTITIES)
+        if unknown:
+            raise CommandError(f"Unknown entities: {', '.join(sorted(unknown))}")
+        entities = [entity for entity in ENTITIES if entity in (options['entities'] or ENTITIES)]
+
+        try:
+            with transaction.atomic():
+                for entity in entities:
+                    path = os.path.join(options['input_dir'], f"{entity}.{options['format']}")
+                    if os.path.exists(path + '.gz'):
+                        path += '.gz'
+                    elif not os.path.exists(path):
+                        self.stdout.write(f'Skipped {entity}: no {path}.')
+                        continue
+                    with (gzip.open if path.endswith('.gz') else open)(path, 'rb') as stream:
+                        count = load_records(entity, read_records(stream, options['format']))
+                    self.stdout.write(f'Loaded {count} {entity} from {path}.')
+        except (ValueError, DatabaseError, OSError) as e:
+            raise CommandError(f'Nothing was loaded: {e}')
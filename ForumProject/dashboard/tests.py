@@ -1,3 +1,153 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from dashboard.loads import load_records
+from investors.models import Investor
+from notifications.models import StartupNotificationPrefs
+from projects.models import InvestorProject, Project, ProjectLog
+from startups.models import Startup
+from users.models import CustomUser
 
-# Create your tests here.
+
+class EntityExportTestCase(TestCase):
+    """
+    Tests of the bulk exports of the platform's core entities.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup = Startup.objects.create(startup_name='Exported', startup_industry='IT',
+                                             startup_phone='+380987654321', startup_country='UA',
+                                             startup_city='Lviv', startup_address='Sirka 56')
+        cls.projects = [Project.objects.create(name=f'Project {number}', startup=cls.startup, description='Export')
+                        for number in range(3)]
+        cls.staff = CustomUser.objects.create_user(email='staff@export.com', password='Pa88word_', is_staff=True)
+        cls.user = CustomUser.objects.create_user(email='user@export.com', password='Pa88word_')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_staff_streams_ndjson_changed_since(self):
+        Project.objects.filter(pk=self.projects[0].pk).update(updated_at=timezone.now() - timedelta(days=2))
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+
+        response = self.client.get(reverse('dashboard:export_entity', args=['projects']), {'since': since})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.projects[1].pk, self.projects[2].pk])
+        self.assertEqual(rows[0]['startup_id'], self.startup.pk)
+        self.assertNotIn('search_vector', rows[0])
+
+    def test_staff_streams_gzipped_csv(self):
+        response = self.client.get(reverse('dashboard:export_entity', args=['startups']),
+                                   {'output': 'csv', 'compress': 'gzip'})
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="startups.csv.gz"')
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(b''.join(response.streaming_content)).decode())))
+        self.assertEqual([(row['startup_name'], row['startup_country']) for row in rows], [('Exported', 'UA')])
+
+    def test_fail_export_by_non_staff_or_unknown_entity(self):
+        self.assertEqual(self.client.get(reverse('dashboard:export_entity', args=['users'])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse('dashboard:export_entity', args=['projects'])).status_code,
+                         status.HTTP_403_FORBIDDEN)
+
+    def test_command_writes_every_entity(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_entities', directory, '--gzip', stdout=io.StringIO())
+
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ['investors.ndjson.gz', 'projects.ndjson.gz', 'shares.ndjson.gz',
+                              'startups.ndjson.gz', 'subscriptions.ndjson.gz'])
+            with gzip.open(os.path.join(directory, 'projects.ndjson.gz'), 'rt') as export:
+                self.assertEqual(len(export.readlines()), 3)
+
+
+class EntityLoadTestCase(TestCase):
+    """
+    Tests of the COPY-based bulk loads of the platform's core entities.
+    """
+
+    def test_load_startups_creates_notification_prefs(self):
+        records = [{'startup_name': f'Loaded {number}', 'startup_industry': 'IT', 'startup_phone': '+380987654321',
+                    'startup_country': 'UA', 'startup_city': 'Lviv', 'startup_address': 'Tab\tand\\slash'}
+                   for number in range(3)]
+
+        self.assertEqual(load_records('startups', records), 3)
+
+        startups = Startup.objects.order_by('pk')
+        self.assertEqual([startup.startup_name for startup in startups], ['Loaded 0', 'Loaded 1', 'Loaded 2'])
+        self.assertEqual(startups[0].startup_address, 'Tab\tand\\slash')
+        self.assertEqual(StartupNotificationPrefs.objects.filter(startup__in=startups).count(), 3)
+        created = Startup.objects.create(startup_name='After', startup_industry='IT', startup_phone='+380987654321',
+                                         startup_country='UA', startup_city='Lviv', startup_address='Sirka 56')
+        self.assertGreater(created.pk, startups[2].pk)
+
+    def test_load_projects_and_shares_derive_logs_and_ledger(self):
+        startup = Startup.objects.create(startup_name='Owner', startup_industry='IT', startup_phone='+380987654321',
+                                         startup_country='UA', startup_city='Lviv', startup_address='Sirka 56')
+        investor = Investor.objects.create(investor_name='Funder', investor_industry='IT',
+                                           investor_phone='+380987654321', investor_country='UA',
+                                           investor_city='Kyiv', investor_address='Khreshchatyk 1')
+
+        load_records('projects', [{'id': 500, 'name': 'Loaded', 'startup_id': startup.pk, 'description': 'Bulk'}])
+        load_records('shares', [{'investor_id': investor.pk, 'project_id': 500, 'share': 20},
+                                {'investor_id': investor.pk, 'project_id': 500, 'share': 15}])
+
+        project = Project.objects.get(pk=500)
+        self.assertEqual(project.allocated_share, 35)
+        log = ProjectLog.objects.get(project_id=500)
+        self.assertEqual(log.action, 'Created Project')
+        self.assertEqual(log.changes['name'], [None, 'Loaded'])
+        self.assertEqual(log.changes['startup_id'], [None, startup.pk])
+        self.assertEqual(InvestorProject.objects.filter(project=project).count(), 2)
+        self.assertGreater(Project.objects.create(name='Next', startup=startup).pk, 500)
+
+    def test_fail_load_rolls_back_everything(self):
+        with self.assertRaises(ValueError):
+            load_records('startups', [{'startup_name': 'No industry', 'unknown': 1}])
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'projects.ndjson'), 'w') as stream:
+                stream.write(json.dumps({'name': 'Orphan', 'startup_id': 999999}) + '\n')
+            with self.assertRaises(CommandError):
+                call_command('load_entities', directory, stdout=io.StringIO())
+            with open(os.path.join(directory, 'startups.ndjson'), 'w') as stream:
+                stream.write(json.dumps({'startup_name': 'Valid', 'startup_industry': 'IT',
+                                         'startup_phone': '+380987654321', 'startup_country': 'UA',
+                                         'startup_city': 'Lviv', 'startup_address': 'Sirka 56'})
+                             + '\n{broken\n')
+            with self.assertRaisesMessage(CommandError, 'Invalid JSON'):
+                call_command('load_entities', directory, 'startups', stdout=io.StringIO())
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(Startup.objects.exists())
+
+    def test_command_loads_an_export(self):
+        startup = Startup.objects.create(startup_name='Round trip', startup_industry='IT',
+                                         startup_phone='+380987654321', startup_country='UA',
+                                         startup_city='Lviv', startup_address='Sirka 56')
+        Project.objects.create(name='Exported', startup=startup, description='Trip')
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_entities', directory, 'startups', 'projects', '--format', 'csv', '--gzip',
+                         stdout=io.StringIO())
+            Startup.objects.all().delete()
+
+            output = io.StringIO()
+            call_command('load_entities', directory, '--format', 'csv', stdout=output)
+
+        self.assertIn('Loaded 1 projects', output.getvalue())
+        project = Project.objects.get(name='Exported')
+        self.assertEqual((project.startup.startup_name, project.description), ('Round trip', 'Trip'))
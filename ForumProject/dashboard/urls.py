@@ -4,6 +4,5 @@ from . import views
 app_name = 'dashboard'
 
 urlpatterns = [
-    
-    
-]
\ No newline at end of file
+    path('export/<str:entity>/', views.export_entity, name='export_entity'),
+]
@@ -1,3 +1,63 @@
-from django.shortcuts import render
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
 
-# Create your views here.
+from . import exports
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_entity(request, entity):
+    '''
+    Stream a full or incremental export of one of the platform's core entities. Staff only.
+
+    Query Parameters:
+        output (str): `ndjson` (default) or `csv`.
+        since (str): An ISO 8601 date-time; only rows updated at or after it are exported.
+        compress (str): `gzip` to compress the export.
+
+    Parameters:
+        request (HttpRequest): The HTTP request object.
+        entity (str): The entity to export: startups, investors, projects, shares or subscriptions.
+
+    Returns:
+        StreamingHttpResponse: The export as an attachment, streamed while the rows are read.
+
+    Error Handling:
+        - An unknown entity returns an HTTP 404 status code.
+        - An unknown output format or compression, or an invalid `since`, returns an HTTP 400 status code.
+    '''
+    if entity not in exports.ENTITIES:
+        return Response({"error": f"Unknown entity: {entity}"}, status=status.HTTP_404_NOT_FOUND)
+    export_format = request.query_params.get('output', 'ndjson')
+    if export_format not in exports.FORMATS:
+        return Response({"error": "output must be one of: " + ', '.join(exports.FORMATS)},
+                        status=status.HTTP_400_BAD_REQUEST)
+    compress = request.query_params.get('compress')
+    if compress not in (None, 'gzip'):
+        return Response({"error": "compress must be gzip"}, status=status.HTTP_400_BAD_REQUEST)
+
+    since = request.query_params.get('since')
+    if since is not None:
+        try:
+            since = parse_datetime(since)
+        except ValueError:
+            since = None
+        if since is None:
+            return Response({"error": "since must be an ISO 8601 date-time"}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+    chunks = exports.export_rows(entity, export_format, since)
+    filename = f'{entity}.{export_format}'
+    content_type = exports.CONTENT_TYPES[export_format]
+    if compress:
+        chunks, filename, content_type = exports.gzip_chunks(chunks), filename + '.gz', 'application/gzip'
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
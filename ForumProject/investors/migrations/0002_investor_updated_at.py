@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='investor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
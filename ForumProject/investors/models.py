@@ -16,6 +16,7 @@ class Investor(models.Model):
         investor_country (CountryField): The country of the investor.
         investor_city (str): The city of the investor.
         investor_address (str): The address of the investor.
+        updated_at (datetime): When the investor was last modified, for incremental exports.
     """
 
     investor_name = models.CharField(max_length=150)
@@ -26,6 +27,7 @@ class Investor(models.Model):
     investor_country = CountryField()
     investor_city = models.CharField(max_length=50)
     investor_address = models.CharField(max_length=150)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         """
@@ -1,18 +1,19 @@
 from rest_framework import serializers
+from projects.delivery import SignedFilesMixin
 from .models import Investor
 
 from django.core.exceptions import ValidationError
 import re
 
 
-class InvestorSerializer(serializers.ModelSerializer):
+class InvestorSerializer(SignedFilesMixin, serializers.ModelSerializer):
     """
     Serializer for the Investor model.
 
     Attributes:
     id (int): The ID of the investor (read-only).
     investor_name (str): The name of the investor.
-    investor_logo (ImageField): The logo of the investor.
+    investor_logo (ImageField): The logo of the investor, represented by a signed URL.
     investor_industry (str): The industry of the investor.
     investor_phone (str): The phone number of the investor.
     investor_country (CountryField): The country where the investor is located.
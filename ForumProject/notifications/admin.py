@@ -1,5 +1,6 @@
 from django.contrib import admin
-from notifications.models import Notification, StartupNotificationPrefs, InvestorNotificationPrefs
+from notifications.models import (Notification, StartupNotificationPrefs, InvestorNotificationPrefs,
+                                  OutgoingEmail)
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -41,3 +42,9 @@ class InvestorNotificationPrefsAdmin(admin.ModelAdmin):
         'push_startup_profile_update'
     ]
 
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject', 'last_error']
@@ -0,0 +1,56 @@
+"""
+Management command that delivers the emails queued in the outbox.
+
+Usage:
+    python manage.py send_queued_emails            # run as a long-lived worker
+    python manage.py send_queued_emails --once     # drain the outbox and exit
+"""
+
+import logging
+import time
+from smtplib import SMTPException
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, transaction
+from notifications.utils import claim_pending_emails, deliver_emails
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails in batches over a reused SMTP connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+                            help='Maximum number of emails claimed per transaction.')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit as soon as there is nothing left to send.')
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        total = 0
+        try:
+            while True:
+                try:
+                    connection.open()
+                    with transaction.atomic():
+                        batch = claim_pending_emails(options['batch_size'])
+                        total += deliver_emails(batch, connection)
+                except (SMTPException, OSError, DatabaseError) as e:
+                    # Drop a broken connection, it is reopened on the next iteration; programming
+                    # errors are not retried and stop the worker
+                    logger.error(f'Email outbox worker error: {str(e)}')
+                    connection.close()
+                    batch = []
+                if len(batch) < options['batch_size']:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        self.stdout.write(f'{total} email(s) sent.')
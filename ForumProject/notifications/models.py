@@ -7,9 +7,11 @@ Classes:
     Notification: Model for storing notifications.
     StartupNotificationPrefs: Model for storing notification preferences for startups.
     InvestorNotificationPrefs: Model for storing notification preferences for investors.
+    OutgoingEmail: Model for storing emails queued for delivery by the outbox worker.
 """
 
 from django.db import models
+from django.utils import timezone
 from projects.models import Project
 from investors.models import Investor
 from startups.models import Startup
@@ -151,3 +153,49 @@ class InvestorNotificationPrefs(models.Model):
     def save(self, *args, **kwargs):
         self.update_active_preferences()
         super().save(*args, **kwargs)
+
+
+class OutgoingEmail(models.Model):
+    """
+    Model representing an email queued in the outbox.
+
+    Rows are written in the same transaction as the change that triggers the email and are
+    delivered later by the `send_queued_emails` management command.
+
+    Attributes:
+        subject (str): The subject of the email.
+        body (str): The body of the email.
+        recipients (list[str]): Email addresses the message is sent to.
+        status (str): Delivery status, chosen from predefined choices.
+        attempts (int): Number of failed delivery attempts so far.
+        next_attempt_at (date-time): The earliest time of the next delivery attempt.
+        last_error (str): The error of the last failed delivery attempt.
+        created_at (date-time): date of queueing of the email.
+        sent_at (date-time): date of delivery of the email.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Outgoing Email'
+        verbose_name_plural = 'Outgoing Emails'
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='pending'),
+                         name='outgoing_email_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'Email "{self.subject}" to {", ".join(self.recipients)} ({self.status})'
@@ -11,12 +11,13 @@ Receivers: set_notification_preferences_for_investor: Sets default notification
 newly created Investor. startup_set_notification_prefs_and_notify_updates: Sets default
 notification preferences for a newly created Startup or notifies investors of updates to the
 Startup profile. project_profile_updated: Notifies investors when a Project profile is updated.
+notify_projects_changed: Notifies every investor following any of several updated Projects once.
 startup_followed: Notifies the Startup when an investor subscribes or unsubscribes.
 project_followed_or_subscription_status_changed: Notifies the Startup when an investor follows or
 unfollows a project or when subscription share changes."""
 
 import logging
-import threading
+from collections import defaultdict
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.db import DatabaseError
@@ -25,8 +26,9 @@ from projects.models import Project, InvestorProject
 from startups.models import Startup
 from subscriptions.models import SubscribeInvestorStartup
 from investors.models import Investor
+from users.models import UserInvestor
 from .models import Notification, StartupNotificationPrefs, InvestorNotificationPrefs
-from .utils import send_email_async
+from .utils import queue_emails
 
 logger = logging.getLogger(__name__)
 
@@ -60,31 +62,32 @@ def send_notifications(notifications):
     Args:
         notifications (list): A list of Notification objects to be sent.
 
-    Side Effects: - Starts a new thread to send emails asynchronously. - Prints a message to the
-    console for push notifications (placeholder for actual implementation).
+    Side Effects: - Queues the emails in the outbox with a single INSERT; they are delivered by
+    the `send_queued_emails` worker. - Prints a message to the console for push notifications
+    (placeholder for actual implementation).
     """
+    emails = []
     for notification in notifications:
         project_msg = f'Project {notification.project} of ' if notification.project else ''
         subject = f'Update on {project_msg}Startup {notification.startup}'
         message = f'{notification.trigger}. Please check the relevant profile page.'
         if notification.initiator == 'investor':
             recipient = notification.startup
-            emails = [user_startup.customuser.email for user_startup in
-                      recipient.userstartup_set.all()]
+            recipients = [user_startup.customuser.email for user_startup in
+                          recipient.userstartup_set.all()]
             email_prefs = recipient.startup_notice_prefs.active_email_preferences
             push_prefs = recipient.startup_notice_prefs.active_push_preferences
         else:
             recipient = notification.investor
-            emails = [user_investor.customuser.email for user_investor in
-                      recipient.userinvestor_set.all()]
+            recipients = [user_investor.customuser.email for user_investor in
+                          recipient.userinvestor_set.all()]
             email_prefs = recipient.investor_notice_prefs.active_email_preferences
             push_prefs = recipient.investor_notice_prefs.active_push_preferences
         if notification.trigger in email_prefs:
-            email_thread = threading.Thread(target=send_email_async,
-                                            args=(subject, message, emails))
-            email_thread.start()
+            emails.append((subject, message, recipients))
         if notification.trigger in push_prefs:
             print(message)  # This is a placeholder for "in app" / push notifications implementation
+    queue_emails(emails)
 
 
 @receiver(post_save, sender=Investor)
@@ -172,6 +175,65 @@ def project_profile_updated(sender, instance, created, **kwargs):
             send_notifications(notifications)
 
 
+def notify_projects_changed(projects):
+    """
+    Notifies the investors following any of several updated Projects, with one notification and
+    one message per investor listing the Projects, instead of one per Project.
+
+    Used by bulk updates, which do not send `post_save`; the followers, their preferences and their
+    email addresses are read with two queries whatever the number of Projects.
+
+    Args:
+        projects (list[Project]): The updated Projects, with their startups loaded.
+
+    Side Effects: Records the notifications and queues their emails with one INSERT each.
+    """
+    trigger = 'Project profile changed'
+    projects_by_id = {project.pk: project for project in projects}
+    investors, followed = {}, defaultdict(list)
+    follows = (InvestorProject.objects.filter(project_id__in=projects_by_id)
+               .select_related('investor__investor_notice_prefs').order_by('investor_id', 'project_id'))
+    for follow in follows:
+        investors[follow.investor_id] = follow.investor
+        followed[follow.investor_id].append(projects_by_id[follow.project_id])
+    if not investors:
+        return
+
+    recipients = defaultdict(list)
+    for investor_id, email in UserInvestor.objects.filter(investor_id__in=investors).values_list(
+            'investor_id', 'customuser__email'):
+        recipients[investor_id].append(email)
+
+    notifications, emails = [], []
+    for investor_id, addressee in investors.items():
+        prefs = getattr(addressee, 'investor_notice_prefs', None)
+        if prefs is None:
+            continue
+        email_prefs_list = [pref.strip() for pref in prefs.active_email_preferences.split(',')]
+        push_prefs_list = [pref.strip() for pref in prefs.active_push_preferences.split(',')]
+        if trigger not in email_prefs_list and trigger not in push_prefs_list:
+            continue
+        changed = followed[investor_id]
+        startup = changed[0].startup
+        notifications.append(Notification(
+            project=changed[0] if len(changed) == 1 else None,
+            startup=startup,
+            investor=addressee,
+            trigger=trigger,
+            initiator='project'
+        ))
+        project_msg = f'Project {changed[0]}' if len(changed) == 1 else f'{len(changed)} Projects'
+        message = f'{trigger}: {", ".join(str(project) for project in changed)}. Please check the relevant profile page.'
+        if trigger in email_prefs_list:
+            emails.append((f'Update on {project_msg} of Startup {startup}', message, recipients[investor_id]))
+        if trigger in push_prefs_list:
+            # This is a placeholder for "in app" / push notifications implementation
+            print(message)
+    if notifications:
+        record_notifications(notifications)
+        queue_emails(emails)
+
+
 @receiver(post_save, sender=SubscribeInvestorStartup)
 @receiver(post_delete, sender=SubscribeInvestorStartup)
 def startup_followed(sender, instance, created=None, **kwargs):
@@ -35,6 +35,9 @@ It uses `APIClient` for making authenticated API requests and `RefreshToken` for
 JWT tokens for user authentication.
 """
 
+from unittest.mock import MagicMock
+from django.core import mail
+from django.core.mail import get_connection
 from django.test import TestCase
 from django.urls import reverse
 from django.db import transaction
@@ -43,7 +46,8 @@ from rest_framework.test import APIClient
 from users.models import UserRoleCompany, CustomUser, UserStartup, UserInvestor
 from investors.models import Investor
 from projects.models import Project
-from .models import Notification
+from .models import Notification, OutgoingEmail
+from .utils import queue_email, queue_emails, claim_pending_emails, deliver_emails
 from .tests_constants import get_urls, EXPECTED_STATUS
 
 
@@ -313,3 +317,80 @@ class NotificationsTestCase(TestCase):
 
         # Check if the request was unsuccessful
         self.assertEqual(response.status_code, EXPECTED_STATUS['FORBIDDEN'])
+
+
+class OutgoingEmailTestCase(TestCase):
+    """
+    A TestCase class for testing the email outbox.
+    """
+
+    def test_queued_email_is_not_sent_immediately(self):
+        """
+        Test that queueing an email does not send it.
+        """
+        queue_email('Subject', 'Message', ['startup@user.com'])
+        self.assertEqual(OutgoingEmail.objects.filter(status='pending').count(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_emails_without_recipients_are_not_queued(self):
+        """
+        Test that emails without recipients are skipped.
+        """
+        queue_emails([('Subject', 'Message', []), ('Subject', 'Message', ['a@user.com'])])
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+
+    def test_deliver_batch(self):
+        """
+        Test that a batch of queued emails is sent and marked as sent.
+        """
+        queue_emails([(f'Subject {i}', 'Message', [f'{i}@user.com']) for i in range(3)])
+        with transaction.atomic():
+            sent = deliver_emails(claim_pending_emails(10), get_connection())
+        self.assertEqual(sent, 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(OutgoingEmail.objects.filter(status='sent').count(), 3)
+        with transaction.atomic():
+            self.assertEqual(claim_pending_emails(10), [])
+
+    def test_failed_email_is_retried_with_backoff(self):
+        """
+        Test that a failing email is rescheduled while the rest of the batch is sent.
+        """
+        good = queue_email('Good', 'Message', ['good@user.com'])
+        bad = queue_email('Bad', 'Message', ['bad@user.com'])
+        connection = MagicMock()
+
+        def send_messages(messages):
+            if any('bad@user.com' in message.to for message in messages):
+                raise ConnectionError('Recipient refused')
+            return len(messages)
+
+        connection.send_messages.side_effect = send_messages
+        with transaction.atomic():
+            sent = deliver_emails(claim_pending_emails(10), connection)
+
+        self.assertEqual(sent, 1)
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual(good.status, 'sent')
+        self.assertEqual(bad.status, 'pending')
+        self.assertEqual(bad.attempts, 1)
+        self.assertGreater(bad.next_attempt_at, bad.created_at)
+        with transaction.atomic():
+            self.assertEqual(claim_pending_emails(10), [])
+        # Every email goes out once, the one before the failure is not sent again
+        self.assertEqual([call.args[0][0].to for call in connection.send_messages.call_args_list],
+                         [['good@user.com'], ['bad@user.com']])
+
+    def test_programming_error_is_not_recorded_as_failure(self):
+        """
+        Test that an error other than a delivery error propagates instead of being retried.
+        """
+        email = queue_email('Subject', 'Message', ['a@user.com'])
+        connection = MagicMock()
+        connection.send_messages.side_effect = TypeError('bad message')
+        with self.assertRaises(TypeError), transaction.atomic():
+            deliver_emails(claim_pending_emails(10), connection)
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.attempts, 0)
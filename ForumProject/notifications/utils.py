@@ -1,31 +1,132 @@
 """
-Utility for sending email notifications asynchronously.
+Utilities for queueing and delivering email notifications through the outbox.
 
-This module defines a function for sending email notifications and handles potential
-errors during the process.
+Emails are never sent from the request/response cycle. Callers queue them as `OutgoingEmail`
+rows, which are committed together with the change that triggered them, and the
+`send_queued_emails` management command delivers them in batches over a reused SMTP connection.
 
 Functions:
-    send_email_async: Sends email notifications asynchronously.
+    queue_email: Queues a single email for delivery.
+    queue_emails: Queues several emails for delivery with a single INSERT.
+    claim_pending_emails: Locks and returns a batch of emails that are due for delivery.
+    deliver_emails: Sends a batch of queued emails and records the outcome.
 """
 
 import logging
+from datetime import timedelta
+from smtplib import SMTPException
 from django.conf import settings
 from django.core.mail import EmailMessage
+from django.db import transaction
+from django.utils import timezone
+from .models import OutgoingEmail
 
 logger = logging.getLogger(__name__)
 
 
-def send_email_async(subject, message, recipients):
+def queue_emails(emails):
     """
-    Sends email notifications asynchronously.
+    Queues several emails for delivery with a single INSERT.
+
+    Args:
+    - emails (list[tuple]): (subject, message, recipients) tuples.
+
+    Returns:
+    - list[OutgoingEmail]: The queued emails.
+    """
+    outgoing = [
+        OutgoingEmail(subject=subject[:255], body=message, recipients=list(recipients))
+        for subject, message, recipients in emails if recipients
+    ]
+    if not outgoing:
+        return []
+    return OutgoingEmail.objects.bulk_create(outgoing)
+
+
+def queue_email(subject, message, recipients):
+    """
+    Queues a single email for delivery.
 
     Args:
     - subject (str): The subject of the email.
     - message (str): The body of the email.
     - recipients (list[str]): List of email addresses to send to.
+
+    Returns:
+    - OutgoingEmail | None: The queued email, or None if there are no recipients.
     """
-    try:
-        email = EmailMessage(subject, message, settings.EMAIL_HOST_USER, recipients)
-        email.send()
-    except Exception as e:
-        logger.error(f"Failed to send email: {str(e)}; Subject: {subject}; Recipients: {recipients}")
+    queued = queue_emails([(subject, message, recipients)])
+    return queued[0] if queued else None
+
+
+def claim_pending_emails(batch_size):
+    """
+    Locks and returns a batch of emails that are due for delivery.
+
+    `SKIP LOCKED` lets several workers drain the outbox concurrently without sending
+    the same email twice. The returned rows stay locked until the caller's transaction ends.
+
+    Args:
+    - batch_size (int): The maximum number of emails to claim.
+
+    Returns:
+    - list[OutgoingEmail]: The claimed emails.
+    """
+    return list(
+        OutgoingEmail.objects
+        .select_for_update(skip_locked=True)
+        .filter(status='pending', next_attempt_at__lte=timezone.now())
+        .order_by('next_attempt_at', 'pk')[:batch_size]
+    )
+
+
+def _register_failure(email, error, now):
+    """
+    Schedules the next delivery attempt with exponential backoff or gives up on the email.
+    """
+    email.attempts += 1
+    email.last_error = str(error)[:255]
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = 'failed'
+        logger.error(f'Giving up on email {email.pk} after {email.attempts} attempts: {error}')
+    else:
+        delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+        email.next_attempt_at = now + timedelta(seconds=delay)
+
+
+def deliver_emails(emails, connection):
+    """
+    Sends a batch of queued emails and records the outcome.
+
+    The emails are sent one `send_messages` call each over the same connection, and the outcome
+    of every email is recorded on its own row: a batch call stops at the first failure without
+    telling which messages were delivered, so retrying it would send those messages twice. A single
+    bad address does not hold back the rest of the batch. Only delivery errors (SMTP and socket
+    errors) are recorded as retryable failures; any other exception propagates.
+
+    Args:
+    - emails (list[OutgoingEmail]): The emails to send.
+    - connection: An open email backend connection.
+
+    Returns:
+    - int: The number of emails sent.
+    """
+    if not emails:
+        return 0
+    now = timezone.now()
+    sent = 0
+    for email in emails:
+        message = EmailMessage(email.subject, email.body, settings.EMAIL_HOST_USER, email.recipients,
+                               connection=connection)
+        try:
+            connection.send_messages([message])
+        except (SMTPException, OSError) as error:
+            _register_failure(email, error, now)
+            continue
+        email.status, email.sent_at = 'sent', now
+        sent += 1
+
+    with transaction.atomic():
+        OutgoingEmail.objects.bulk_update(
+            emails, ['status', 'sent_at', 'attempts', 'last_error', 'next_attempt_at'])
+    return sent
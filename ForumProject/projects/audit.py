@@ -0,0 +1,105 @@
+"""
+Audit log of project events.
+
+Project and project file signals and the batch operations of `projects.bulk`, `projects.deletion`
+and `projects.uploads` record `ProjectLog` events here. Events are written at once, inside the
+transaction that made the change they describe: an entry commits or rolls back together with its
+change, and a failed write fails the change instead of losing the entry. Operations that change
+several projects record their events with `record_many`, which writes them with one `bulk_create`.
+
+The acting user is taken from the current request, which `projects.middleware.AuditLogMiddleware`
+makes available while the request is handled. Writes without a request (management commands,
+shell) fall back to a user of the project's startup.
+
+Functions:
+    start: Makes a request the source of the acting user of the events recorded while handling it.
+    finish: Ends the request started with `start`.
+    record: Records a project event.
+    record_many: Records several project events at once.
+"""
+
+from contextvars import ContextVar
+
+from users.models import UserRoleCompany
+from .models import ProjectLog
+
+DELETED_PROJECT_ACTION = 'Deleted Project'
+
+_request = ContextVar('project_audit_request', default=None)
+
+
+def start(request):
+    """
+    Makes a request the source of the acting user of the events recorded while handling it.
+
+    Returns:
+    - Token: The token to pass to `finish`.
+    """
+    return _request.set(request)
+
+
+def finish(token):
+    """
+    Ends the request started with `start`.
+    """
+    _request.reset(token)
+
+
+def _acting_user_id(startup_id):
+    user = getattr(_request.get(), 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    return UserRoleCompany.objects.filter(
+        role='startup', company_id=startup_id).values_list('user_id', flat=True).first() or 0
+
+
+def _event(user_id, project_id, project_birth_id, startup_id, action, previous_state, modified_state, changes=None):
+    return ProjectLog(
+        project_id=project_id,
+        project_birth_id=project_birth_id,
+        user_id=user_id,
+        startup_id=startup_id,
+        action=action,
+        previous_state=previous_state[:255],
+        modified_state=modified_state[:255],
+        changes=changes
+    )
+
+
+def record(project_id, project_birth_id, startup_id, action, previous_state, modified_state, changes=None):
+    """
+    Records a project event.
+
+    Parameters:
+    - project_id (int | None): The project the entry links to, None once it is deleted.
+    - project_birth_id (int): The ID of the project the event is about.
+    - startup_id (int): The ID of the project's startup.
+    - action (str): The action performed.
+    - previous_state (str): The state before the action.
+    - modified_state (str): The state after the action.
+    - changes (dict | None): The field-level diff of the action, see `projects.history`.
+    """
+    record_many([dict(project_id=project_id, project_birth_id=project_birth_id, startup_id=startup_id,
+                      action=action, previous_state=previous_state, modified_state=modified_state,
+                      changes=changes)])
+
+
+def record_many(entries):
+    """
+    Records several project events with a single `bulk_create`, in the current transaction.
+
+    Parameters:
+    - entries (list[dict]): The keyword arguments of `record` for every event.
+
+    Raises:
+    - DatabaseError: If the entries cannot be written; the caller's change must not commit without them.
+    """
+    user_ids = {}
+    events = []
+    for entry in entries:
+        startup_id = entry['startup_id']
+        if startup_id not in user_ids:
+            user_ids[startup_id] = _acting_user_id(startup_id)
+        events.append(_event(user_ids[startup_id], **entry))
+    if events:
+        ProjectLog.objects.bulk_create(events)
@@ -0,0 +1,197 @@
+"""
+Content-addressed storage of project files.
+
+File content is stored once per SHA-256 digest under `media/blobs/<aa>/<bb>/<digest>`, where `aa`
+and `bb` are the first two bytes of the digest in hex, which keeps every directory small. The name
+follows from the content, so storing needs no existence checks, and uploading content that is
+already stored, e.g. the same deck for several projects, only adds a ProjectFiles row.
+
+Every `FileBlob` row counts the ProjectFiles rows referencing it; the count is maintained by the
+ProjectFiles signals. Blobs whose count dropped to zero keep their content until the
+`collect_file_blobs` command removes them. Whether content must be written is decided from the
+blob row alone: a new or unreferenced blob gets its content (re)written, since a collection
+interrupted after removing a file leaves its row behind, while a referenced blob always has it.
+
+Storing a blob and saving the ProjectFiles row that references it must happen in one transaction:
+the blob row stays locked until the reference is committed, which keeps the collector away.
+Rows created with `bulk_create`, which sends no signals, count their references with
+`update_references`.
+
+Functions:
+    file_sha256: Returns the hex SHA-256 digest of a file on disk.
+    store_upload: Stores the content of an uploaded file.
+    store_path: Stores the content of a file that is already on disk, moving it into place.
+    stage_upload: Writes an uploaded file next to the blob store while hashing it.
+    store_paths: Stores the contents of several files already on disk with a constant number of queries.
+    update_references: Changes the reference counts of several blobs.
+    collect_garbage: Removes the blobs no project file references.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+
+from .models import FileBlob
+
+COLLECT_BATCH_SIZE = 100
+BLOCK_SIZE = 1024 * 1024
+BLOB_ROOT = 'media/blobs'
+
+
+def file_sha256(path):
+    """
+    Returns the hex SHA-256 digest of a file on disk, read in blocks of BLOCK_SIZE bytes.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stored:
+        while block := stored.read(BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _place(path, sha256, ref_count):
+    """
+    Moves a file into place as the content of a locked blob, or removes it if the blob is referenced.
+    """
+    if ref_count > 0:
+        os.remove(path)
+        return
+    blob_path = default_storage.path(FileBlob.storage_name(sha256))
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    os.replace(path, blob_path)
+
+
+def store_upload(uploaded_file):
+    """
+    Stores the content of an uploaded file.
+
+    The file is read once: it is hashed while it is copied to a temporary file, which is then
+    renamed into place, so a blob is never visible half-written.
+
+    Parameters:
+    - uploaded_file (File): The uploaded file.
+
+    Returns:
+    - FileBlob: The (possibly existing) blob of the content.
+    """
+    path, sha256 = stage_upload(uploaded_file)
+    try:
+        return store_path(path, sha256, uploaded_file.size)
+    except BaseException:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def store_path(path, sha256, size):
+    """
+    Stores the content of a file that is already on disk, moving it into place.
+
+    The file is renamed without copying when the blob is new or unreferenced and removed otherwise.
+
+    Parameters:
+    - path (str): The path of the file.
+    - sha256 (str): The hex SHA-256 digest of the file.
+    - size (int): The size of the file in bytes.
+
+    Returns:
+    - FileBlob: The (possibly existing) blob of the content.
+    """
+    blob = FileBlob.objects.select_for_update().get_or_create(sha256=sha256, defaults={'size': size})[0]
+    _place(path, sha256, blob.ref_count)
+    return blob
+
+
+def stage_upload(uploaded_file):
+    """
+    Writes an uploaded file next to the blob store while hashing it, in one pass.
+
+    Does not touch the database, so uploads can be staged in parallel threads.
+
+    Parameters:
+    - uploaded_file (File): The uploaded file.
+
+    Returns:
+    - tuple[str, str]: The path of the staged file and its hex SHA-256 digest.
+    """
+    directory = default_storage.path(BLOB_ROOT)
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=directory, prefix='.staged-', delete=False) as staged:
+        try:
+            for chunk in uploaded_file.chunks():
+                digest.update(chunk)
+                staged.write(chunk)
+        except BaseException:
+            staged.close()
+            os.remove(staged.name)
+            raise
+    return staged.name, digest.hexdigest()
+
+
+def store_paths(files):
+    """
+    Stores the contents of several files already on disk, moving them into place.
+
+    The batch version of `store_path`: the missing blob rows are inserted with one query and all
+    blobs of the batch are locked with another, whatever the number of files. A file is moved into
+    place when its blob is new or unreferenced and removed otherwise.
+
+    Parameters:
+    - files (list[tuple[str, str, int]]): The path, hex SHA-256 digest and size of every file.
+    """
+    sizes = {sha256: size for _, sha256, size in files}
+    # A blob removed by a concurrent collection is inserted again once the collection commits
+    FileBlob.objects.bulk_create([FileBlob(sha256=sha256, size=size) for sha256, size in sizes.items()],
+                                 ignore_conflicts=True)
+    ref_counts = dict(FileBlob.objects.select_for_update().filter(pk__in=sizes).values_list('pk', 'ref_count'))
+    for path, sha256, _ in files:
+        _place(path, sha256, ref_counts[sha256])
+        # Later duplicates of the batch find the content in place
+        ref_counts[sha256] += 1
+
+
+def update_references(counts):
+    """
+    Changes the reference counts of several blobs, with one UPDATE per distinct change.
+
+    Parameters:
+    - counts (dict[str, int]): The change of the reference count by blob digest, negative for released references.
+    """
+    by_change = {}
+    for sha256, change in counts.items():
+        by_change.setdefault(change, []).append(sha256)
+    for change, digests in by_change.items():
+        FileBlob.objects.filter(pk__in=digests).update(ref_count=F('ref_count') + change)
+
+
+def collect_garbage():
+    """
+    Removes the blobs no project file references.
+
+    Blobs are processed in batches, each locked with SKIP LOCKED so blobs being stored or
+    referenced concurrently are left for the next run.
+
+    Returns:
+    - int: The number of removed blobs.
+    """
+    removed = 0
+    while True:
+        with transaction.atomic():
+            blobs = list(FileBlob.objects.select_for_update(skip_locked=True)
+                         .filter(ref_count=0)[:COLLECT_BATCH_SIZE])
+            if not blobs:
+                return removed
+            FileBlob.objects.filter(pk__in=[blob.pk for blob in blobs]).delete()
+            for blob in blobs:
+                try:
+                    os.remove(default_storage.path(FileBlob.storage_name(blob.pk)))
+                except FileNotFoundError:
+                    pass
+        removed += len(blobs)
@@ -0,0 +1,100 @@
+"""
+Normalization of project budgets to the base currency, for screening projects by budget ranges.
+
+Budgets are entered in any currency (`Project.budget_currency`), so they cannot be compared or
+indexed directly. Every project therefore carries `budget_base_amount`, its budget converted to
+settings.BASE_CURRENCY with the rates stored in `CurrencyRate` (no external feed is queried). A
+database trigger converts the budget whenever a row is inserted or its budget changes (and
+`Project.save` converts it with the cached rate, so the instance need not be read back); when rates
+change, `update_rates` recomputes the projects in the changed currencies with one set-based UPDATE
+per chunk of BUDGET_BATCH_SIZE rows, each in its own short transaction.
+
+Projects whose currency has no stored rate get no base amount and are left out of budget ranges.
+
+Functions:
+    update_rates: Stores currency rates and recomputes the base amounts of the affected projects.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from .models import CURRENCY_RATE_CACHE_KEY, CurrencyRate, Project
+
+BUDGET_BATCH_SIZE = 5000
+
+
+def _parse_rates(rates):
+    """
+    Returns the rates with upper-case currency codes and Decimal values, validating them.
+    """
+    parsed = {}
+    for currency, rate in rates.items():
+        code = str(currency).strip().upper()
+        if len(code) != 3 or not code.isalpha():
+            raise ValueError(f'Invalid currency code: {currency}')
+        try:
+            value = Decimal(str(rate))
+        except InvalidOperation:
+            raise ValueError(f'Invalid rate for {code}: {rate}')
+        if not value.is_finite() or value <= 0:
+            raise ValueError(f'Invalid rate for {code}: {rate}')
+        if code == settings.BASE_CURRENCY and value != 1:
+            raise ValueError(f'The rate of the base currency {code} is always 1')
+        parsed[code] = value
+    return parsed
+
+
+def _recompute(currencies, batch_size):
+    """
+    Recomputes the base amounts of the projects in the given currencies, returning the number of changed rows.
+    """
+    table, rates = Project._meta.db_table, CurrencyRate._meta.db_table
+    queryset = Project.all_objects.filter(budget_amount__isnull=False)
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+
+    changed = 0
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        # Rows already holding the new amount are not rewritten; updated_at is left alone, the
+        # project itself did not change
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE {table} p SET budget_base_amount = round(p.budget_amount * r.rate)
+                FROM {rates} r
+                WHERE r.currency = upper(btrim(p.budget_currency)) AND r.currency = ANY(%s)
+                  AND p.id >= %s AND p.id < %s AND p.budget_amount IS NOT NULL
+                  AND p.budget_base_amount IS DISTINCT FROM round(p.budget_amount * r.rate)
+            """, [list(currencies), start, start + batch_size])
+            changed += cursor.rowcount
+    return changed
+
+
+def update_rates(rates, batch_size=BUDGET_BATCH_SIZE):
+    """
+    Stores currency rates and recomputes the base amounts of the affected projects.
+
+    Parameters:
+    - rates (dict): The amount of settings.BASE_CURRENCY one unit of every currency is worth, by
+      currency code, e.g. `{'EUR': '1.08', 'UAH': '0.024'}`.
+    - batch_size (int): The number of project IDs recomputed per transaction.
+
+    Returns:
+    - int: The number of projects whose base amount changed.
+
+    Raises:
+    - ValueError: If a currency code or rate is invalid, or the base currency is given a rate other than 1.
+    """
+    rates = _parse_rates(rates)
+    if not rates:
+        return 0
+    CurrencyRate.objects.bulk_create([CurrencyRate(currency=code, rate=rate) for code, rate in rates.items()],
+                                     update_conflicts=True, unique_fields=['currency'],
+                                     update_fields=['rate', 'updated_at'])
+    keys = [CURRENCY_RATE_CACHE_KEY.format(code) for code in rates]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+    return _recompute(rates, batch_size)
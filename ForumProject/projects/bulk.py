@@ -0,0 +1,131 @@
+"""
+Bulk updates of the projects of a startup.
+
+Updating projects one by one costs a save, a log entry and a notification query per project.
+`update_projects` validates a whole batch first (every item with `ProjectSerializer`, the new
+names together), then applies it in one transaction: the projects are locked and written with a
+single `bulk_update`, one 'Updated Project' entry with the field diff of every changed project is
+recorded with one `bulk_create` (`audit.record_many`), and the followers are notified once per
+investor (`notifications.signals.notify_projects_changed`). `post_save` is not sent.
+
+A batch is applied completely or not at all.
+
+Functions:
+    update_projects: Applies a batch of project updates.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from notifications.signals import notify_projects_changed
+from .models import CurrencyRate, Project
+from .serializers import ProjectSerializer, normalize_project_name
+from . import audit, cap_table, history
+
+BULK_UPDATE_MAX_SIZE = 500
+
+
+class BulkUpdateError(Exception):
+    """
+    Raised when items of a bulk update are invalid; no project of the batch is updated.
+
+    Attributes:
+        errors (dict[int, dict]): The errors of every invalid item by its position in the batch.
+    """
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} item(s) of the batch are invalid')
+        self.errors = errors
+
+
+def _validate(projects, items, context):
+    """
+    Validates every item against its project, returning the (project, validated data) pairs and the errors.
+    """
+    validated, errors = [], {}
+    for index, item in enumerate(items):
+        project = projects.get(item.get('id')) if isinstance(item, dict) else None
+        if project is None:
+            errors[index] = {'id': ['Project not found.']}
+            continue
+        serializer = ProjectSerializer(project, data=item, partial=True, context=context or {})
+        if not serializer.is_valid():
+            errors[index] = serializer.errors
+            continue
+        data = dict(serializer.validated_data)
+        if 'name' in data:
+            try:
+                data['name'] = normalize_project_name(data['name'])
+            except serializers.ValidationError as e:
+                errors[index] = {'name': e.detail}
+                continue
+        validated.append((index, project, data))
+
+    # Names stay unique per startup, also when several projects of the batch are renamed
+    renamed = {index: (project, data['name']) for index, project, data in validated if 'name' in data}
+    names = [name for _, name in renamed.values()]
+    taken = set(Project.objects.filter(startup_id__in={project.startup_id for project, _ in renamed.values()},
+                                       name__in=names)
+                .exclude(pk__in=[project.pk for project, _ in renamed.values()]).values_list('name', flat=True))
+    for index, (project, name) in renamed.items():
+        if name in taken or names.count(name) > 1:
+            errors[index] = {'name': ['Project name must be unique for this Startup.']}
+    return [(project, data) for index, project, data in validated if index not in errors], errors
+
+
+def update_projects(startup_id, items, context=None):
+    """
+    Applies a batch of project updates.
+
+    Parameters:
+    - startup_id (int): The startup whose projects are updated; other projects are not found.
+    - items (list[dict]): The new field values of every project, with its `id`.
+    - context (dict | None): The serializer context, with the request.
+
+    Returns:
+    - list[Project]: The changed projects; items that change nothing are skipped.
+
+    Raises:
+    - ValueError: If the batch is not a list, is empty or holds more than BULK_UPDATE_MAX_SIZE items.
+    - BulkUpdateError: If any item is invalid.
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError('A non-empty list of projects is required')
+    if len(items) > BULK_UPDATE_MAX_SIZE:
+        raise ValueError(f'At most {BULK_UPDATE_MAX_SIZE} projects can be updated at once')
+
+    ids = [item.get('id') for item in items if isinstance(item, dict) and isinstance(item.get('id'), int)]
+    with transaction.atomic():
+        projects = {project.pk: project for project in
+                    Project.objects.select_for_update(of=('self',)).select_related('startup')
+                    .filter(startup_id=startup_id, pk__in=ids)}
+        validated, errors = _validate(projects, items, context)
+        if errors:
+            raise BulkUpdateError(errors)
+
+        now = timezone.now()
+        changed, fields, entries = [], set(), []
+        for project, data in validated:
+            changes = history.diff(history.snapshot(project), data)
+            if not changes:
+                continue
+            for field in history.TRACKED_FIELDS:
+                if field.attname in changes:
+                    setattr(project, field.attname, changes[field.attname][1])
+                    fields.add(field.name)
+            if {'budget_amount', 'budget_currency'} & changes.keys():
+                # Converted by the database trigger as well, bulk_update does not read rows back
+                project.budget_base_amount = CurrencyRate.base_amount(project.budget_amount, project.budget_currency)
+            project.updated_at = now
+            changed.append(project)
+            entries.append(dict(project_id=project.pk, project_birth_id=project.pk, startup_id=project.startup_id,
+                                action=history.UPDATED_PROJECT_ACTION, previous_state='', modified_state='',
+                                changes=changes))
+        if not changed:
+            return []
+
+        Project.objects.bulk_update(changed, sorted(fields) + ['updated_at'])
+        audit.record_many(entries)
+        cap_table.invalidate(*(project.pk for project in changed))
+        notify_projects_changed(changed)
+    return changed
@@ -0,0 +1,90 @@
+"""
+Cap table of a project: the investors' shares, ranked, with running totals.
+
+The breakdown is read in one query: the project is LEFT JOINed to its shares and their investors,
+and the running total and rank of every share are computed by window functions over the shares in
+descending order. The remaining allocation comes from the project's funding ledger
+(`Project.allocated_share`).
+
+Breakdowns are cached per project for CAP_TABLE_CACHE_TIMEOUT seconds and invalidated when the
+transaction changing a share, the project or an investor's name commits (see `projects.signals`),
+so the cache can back a live cap-table widget.
+
+Functions:
+    breakdown: Returns the cap table of a project, from the cache when possible.
+    invalidate: Drops the cached cap tables of projects once the current transaction commits.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum, Window
+from django.db.models.functions import Rank
+
+from .models import Project
+
+CACHE_KEY = 'projects:cap_table:{}'
+
+
+def _read(project_id):
+    """
+    Reads the cap table of a project in one query, or returns None if the project does not exist.
+    """
+    share_order = [F('project_share__share').desc(), F('project_share__id').asc()]
+    rows = list(
+        Project.objects.filter(pk=project_id)
+        .annotate(running_total=Window(Sum('project_share__share'), order_by=share_order),
+                  rank=Window(Rank(), order_by=F('project_share__share').desc()))
+        .values('name', 'allocated_share', 'project_share__id', 'project_share__investor_id',
+                'project_share__investor__investor_name', 'project_share__share', 'running_total', 'rank')
+        .order_by(*share_order)
+    )
+    if not rows:
+        return None
+
+    allocated_share = rows[0]['allocated_share']
+    return {
+        'project': rows[0]['name'],
+        'investors': [{
+            'id': row['project_share__id'],
+            'investor': row['project_share__investor_id'],
+            'investor_name': row['project_share__investor__investor_name'],
+            'share': row['project_share__share'],
+            'running_total': row['running_total'],
+            'rank': row['rank'],
+        } for row in rows if row['project_share__id'] is not None],
+        'total_share': float(allocated_share),
+        'remaining_share': float(100 - allocated_share),
+    }
+
+
+def breakdown(project_id):
+    """
+    Returns the cap table of a project, from the cache when possible.
+
+    Parameters:
+    - project_id (int): The ID of the project.
+
+    Returns:
+    - dict | None: The project name, its investors from the largest share down with their
+      running total and rank, the total and the remaining share; None if the project does not exist.
+    """
+    key = CACHE_KEY.format(project_id)
+    data = cache.get(key)
+    if data is None:
+        data = _read(project_id)
+        if data is not None:
+            cache.set(key, data, timeout=settings.CAP_TABLE_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate(*project_ids):
+    """
+    Drops the cached cap tables of projects once the current transaction commits.
+
+    Deleting after the commit keeps a concurrent request from caching the state the transaction
+    is replacing.
+    """
+    keys = [CACHE_KEY.format(project_id) for project_id in set(project_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
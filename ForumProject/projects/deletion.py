@@ -0,0 +1,239 @@
+"""
+Bulk deletion of project files, and soft deletion of projects and startups.
+
+Deleting files one by one costs a log entry, a blob reference update and a storage call per file,
+all in the request thread. The functions here delete the rows of any number of files in one
+transaction with the per-row ProjectFiles receivers muted (`signals.mute_file_signals`), drop
+their blob references with `blobs.update_references`, and record a single log entry.
+
+Files stored outside the blob store (uploaded before content-addressed storage, and partially
+uploaded files of upload sessions) are removed from storage once the transaction has committed,
+by a pool of DELETE_WORKERS threads, so slow storage calls overlap. Blobs are left to
+`blobs.collect_garbage` as usual.
+
+Projects and startups deleted through the API are only marked with `deleted_at`, which hides them
+at once (see `startups.models.SoftDeleteManager`). Their rows and files are removed later by
+`purge_deleted`, run by the `purge_deleted` command: files, shares, memberships, subscriptions,
+and log and notification links are removed in chunks of PURGE_BATCH_SIZE rows, each in its own short transaction, so purging a large company
+never holds locks for long.
+
+Functions:
+    delete_files: Deletes files of a project with a single log entry.
+    delete_project: Deletes a project together with its files.
+    soft_delete_project: Hides a project until it is purged.
+    soft_delete_startup: Hides a startup and its projects until they are purged.
+    purge_deleted: Removes soft-deleted projects and startups in bounded chunks.
+"""
+
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from communications.models import ChatContact
+from notifications.models import Notification
+from startups.models import Startup
+from subscriptions.models import SubscribeInvestorStartup
+from users.models import UserStartup
+from .models import InvestorProject, Project, ProjectFiles, ProjectLog, UploadSession
+from .signals import mute_file_signals
+from . import audit, blobs, cap_table
+
+logger = logging.getLogger(__name__)
+
+DELETE_WORKERS = 16
+PURGE_BATCH_SIZE = 500
+DELETED_FILE_ACTION = 'Deleted File of Project'
+DELETED_FILES_ACTION = 'Deleted Files of Project'
+
+
+def _remove_from_storage(names):
+    """
+    Removes files from storage in parallel, logging the failures.
+    """
+    def remove(name):
+        try:
+            default_storage.delete(name)
+        except OSError as e:
+            logger.error(f'Error: file {name} failed to be removed from storage: {str(e)}')
+
+    if names:
+        with ThreadPoolExecutor(max_workers=min(DELETE_WORKERS, len(names))) as pool:
+            list(pool.map(remove, names))
+
+
+def _release(project_files, staged_names=()):
+    """
+    Drops the blob references of deleted files and schedules the removal of their own storage.
+    """
+    released = Counter(f.blob_id for f in project_files if f.blob_id)
+    blobs.update_references({blob_id: -count for blob_id, count in released.items()})
+
+    names = [f.file.name for f in project_files if f.file and not f.blob_id] + list(staged_names)
+    transaction.on_commit(lambda: _remove_from_storage(names))
+
+
+def delete_files(project, ids=None):
+    """
+    Deletes files of a project with a single log entry.
+
+    Parameters:
+    - project (Project): The project whose files are deleted.
+    - ids (list[int] | None): The IDs of the files to delete, all files of the project by default.
+
+    Returns:
+    - int: The number of deleted files.
+    """
+    queryset = ProjectFiles.objects.filter(project=project)
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+
+    with transaction.atomic(), mute_file_signals():
+        project_files = list(queryset.only('id', 'file', 'file_description', 'blob'))
+        if not project_files:
+            return 0
+        ProjectFiles.objects.filter(pk__in=[f.pk for f in project_files]).delete()
+        _release(project_files)
+
+        if len(project_files) == 1:
+            action = DELETED_FILE_ACTION
+            previous_state = f'File ID: {project_files[0].pk}, Description: {project_files[0].file_description}'
+        else:
+            action = DELETED_FILES_ACTION
+            previous_state = f'{len(project_files)} files, IDs: ' + ', '.join(str(f.pk) for f in project_files)
+        audit.record(project.pk, project.pk, project.startup_id, action, previous_state, 'n/a')
+    return len(project_files)
+
+
+def delete_project(project):
+    """
+    Deletes a project together with its files.
+
+    The only log entry is the one of the deleted project.
+
+    Parameters:
+    - project (Project): The project to delete.
+
+    Returns:
+    - int: The number of deleted files.
+    """
+    with transaction.atomic(), mute_file_signals():
+        project_files = list(ProjectFiles.objects.filter(project=project).only('id', 'file', 'blob'))
+        staged_names = list(UploadSession.objects.filter(project=project).values_list('staged_name', flat=True))
+        project.delete()
+        _release(project_files, staged_names)
+    return len(project_files)
+
+
+def soft_delete_project(project):
+    """
+    Hides a project until it is purged, recording its deletion.
+
+    Parameters:
+    - project (Project): The project to delete.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        Project.objects.filter(pk=project.pk).update(deleted_at=now, updated_at=now)
+        project.deleted_at = now
+        audit.record(project.pk, project.pk, project.startup_id, audit.DELETED_PROJECT_ACTION,
+                     f'Project ID: {project.pk}, Name: {project.name}', 'n/a')
+        cap_table.invalidate(project.pk)
+
+
+def soft_delete_startup(startup):
+    """
+    Hides a startup and its projects until they are purged, recording the deletion of every project.
+
+    The startup's members leave the chat directory at once.
+
+    Parameters:
+    - startup (Startup): The startup to delete.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        projects = list(Project.objects.filter(startup=startup).values_list('pk', 'name'))
+        Project.objects.filter(startup=startup).update(deleted_at=now, updated_at=now)
+        Startup.objects.filter(pk=startup.pk).update(deleted_at=now, updated_at=now)
+        startup.deleted_at = now
+        ChatContact.objects.filter(startup=startup).delete()
+        audit.record_many([dict(project_id=pk, project_birth_id=pk, startup_id=startup.pk,
+                                action=audit.DELETED_PROJECT_ACTION,
+                                previous_state=f'Project ID: {pk}, Name: {name}', modified_state='n/a')
+                           for pk, name in projects])
+        cap_table.invalidate(*(pk for pk, _ in projects))
+
+
+def _chunks(queryset, batch_size):
+    """
+    Yields the primary keys of a queryset in chunks, re-reading the first chunk every time, as the
+    caller removes each chunk from the queryset.
+    """
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+
+
+def _purge_project(project, batch_size):
+    for ids in _chunks(ProjectFiles.objects.filter(project=project), batch_size):
+        with transaction.atomic(), mute_file_signals():
+            project_files = list(ProjectFiles.objects.filter(pk__in=ids).only('id', 'file', 'blob'))
+            ProjectFiles.objects.filter(pk__in=ids).delete()
+            _release(project_files)
+    for ids in _chunks(InvestorProject.objects.filter(project=project), batch_size):
+        with transaction.atomic():
+            InvestorProject.objects.filter(pk__in=ids).delete()
+    # The log outlives the project
+    for ids in _chunks(ProjectLog.objects.filter(project=project), batch_size):
+        ProjectLog.objects.filter(pk__in=ids).update(project=None)
+    # Notifications outlive the project too, as the SET_NULL of the foreign key would leave them
+    for ids in _chunks(Notification.objects.filter(project=project), batch_size):
+        Notification.objects.filter(pk__in=ids).update(project=None)
+    delete_project(project)
+
+
+def _purge_startup(startup, batch_size):
+    for ids in _chunks(SubscribeInvestorStartup.objects.filter(startup=startup), batch_size):
+        SubscribeInvestorStartup.objects.filter(pk__in=ids).delete()
+    for ids in _chunks(UserStartup.objects.filter(startup=startup), batch_size):
+        with transaction.atomic():
+            UserStartup.objects.filter(pk__in=ids).delete()
+    for ids in _chunks(Notification.objects.filter(startup=startup), batch_size):
+        Notification.objects.filter(pk__in=ids).update(startup=None)
+    # Only the row and its notification preferences are left
+    with transaction.atomic():
+        startup.delete()
+
+
+def purge_deleted(batch_size=PURGE_BATCH_SIZE, limit=None):
+    """
+    Removes soft-deleted projects and startups with their files and dependent rows, in bounded chunks.
+
+    Projects are purged first; a startup is purged once none of its projects is left.
+
+    Parameters:
+    - batch_size (int): The number of rows removed per transaction.
+    - limit (int | None): The number of projects and of startups to purge at most.
+
+    Returns:
+    - dict: The number of purged projects and startups.
+    """
+    projects = Project.all_objects.filter(deleted_at__isnull=False).order_by('deleted_at', 'pk')[:limit]
+    purged_projects = 0
+    for project in projects:
+        _purge_project(project, batch_size)
+        purged_projects += 1
+
+    startups = (Startup.all_objects.filter(deleted_at__isnull=False)
+                .exclude(pk__in=Project.all_objects.values('startup_id'))
+                .order_by('deleted_at', 'pk')[:limit])
+    purged_startups = 0
+    for startup in startups:
+        _purge_startup(startup, batch_size)
+        purged_startups += 1
+    return {'projects': purged_projects, 'startups': purged_startups}
@@ -0,0 +1,212 @@
+"""
+Delivery of stored files through short-lived signed URLs.
+
+Access to a file is authorized once, by the endpoint that returns its URL (e.g. `IsProjectMember`
+for project files). The URL carries a signed token naming the file, valid for `FILE_URL_MAX_AGE`
+seconds, so the download itself needs no authentication or database query, and the transfer is
+handed to the front web server according to `FILE_DELIVERY_BACKEND`:
+
+- `'x-accel-redirect'` (nginx): the response only names the file in an `X-Accel-Redirect` header
+  under `FILE_DELIVERY_ACCEL_PREFIX`, which must map to MEDIA_ROOT in an internal location:
+
+      location /protected/ {
+          internal;
+          alias /app/;  # MEDIA_ROOT
+      }
+
+- `'x-sendfile'` (Apache mod_xsendfile, lighttpd): the response names the absolute file path in an
+  `X-Sendfile` header.
+- `'python'`: the file is streamed by Django in blocks of BLOCK_SIZE bytes, for local runs without
+  a front server.
+
+The front servers answer range requests and conditional requests themselves; the Python fallback
+supports single byte ranges, `If-Range` and `ETag`/`Last-Modified` validation as well.
+
+Classes:
+    SignedFileField: A serializer file field represented by a signed download URL.
+    SignedImageField: A serializer image field represented by a signed URL for inline display.
+    SignedFilesMixin: Makes a ModelSerializer represent all its file fields by signed URLs.
+
+Functions:
+    signed_url: Returns a signed download URL for a stored file.
+    serve: Delivers the file named by a signed token.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.db import models
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+from rest_framework import serializers
+
+BLOCK_SIZE = 1024 * 1024
+SALT = 'projects.delivery'
+BYTE_RANGE = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def signed_url(name, filename=None, as_attachment=True, request=None):
+    """
+    Returns a signed download URL for a stored file.
+
+    Parameters:
+    - name (str): The name of the file in storage.
+    - filename (str | None): The name offered to the client, the base name of the file by default.
+    - as_attachment (bool): Whether the client should save the file rather than display it.
+    - request (HttpRequest | None): The current request, to build an absolute URL.
+
+    Returns:
+    - str: The URL, valid for FILE_URL_MAX_AGE seconds.
+    """
+    token = signing.dumps({'n': name, 'f': filename or os.path.basename(name), 'a': as_attachment},
+                          salt=SALT, compress=True)
+    url = reverse('projects:download', args=[token])
+    return request.build_absolute_uri(url) if request else url
+
+
+def _parse_range(header, size):
+    """
+    Returns the first and last byte of a single byte range, None if it cannot be satisfied
+    and False if it is malformed or asks for several ranges, which is answered with the whole file.
+    """
+    match = BYTE_RANGE.fullmatch(header.strip())
+    if not match or not (match[1] or match[2]):
+        return False
+    if not match[1]:
+        # Suffix range: the last N bytes
+        suffix = int(match[2])
+        return (max(size - suffix, 0), size - 1) if suffix and size else None
+    first = int(match[1])
+    last = min(int(match[2]), size - 1) if match[2] else size - 1
+    if match[2] and int(match[2]) < first:
+        return False
+    return (first, last) if first < size else None
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as stored:
+        stored.seek(start)
+        while length > 0:
+            block = stored.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def _stream(request, name, content_type):
+    """
+    Streams a file from storage, answering conditional and single-range requests.
+    """
+    path = default_storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404('File not found')
+    size = stat.st_size
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        return not_modified
+
+    start, last, status_code = 0, size - 1, 200
+    range_header = request.headers.get('Range')
+    if range_header and request.headers.get('If-Range', etag) == etag:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range:
+            (start, last), status_code = byte_range, 206
+
+    response = StreamingHttpResponse(_read(path, start, last - start + 1), status=status_code,
+                                     content_type=content_type)
+    response['Content-Length'] = str(last - start + 1)
+    if status_code == 206:
+        response['Content-Range'] = f'bytes {start}-{last}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+
+def serve(request, token):
+    """
+    Delivers the file named by a signed token.
+
+    Parameters:
+    - request (HttpRequest): The download request.
+    - token (str): The token of a URL returned by `signed_url`.
+
+    Returns:
+    - HttpResponse: A response handing the file to the front web server, or streaming it.
+
+    Raises:
+    - PermissionDenied: If the token is invalid or has expired.
+    - Http404: If the file is missing (Python fallback only).
+    """
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=settings.FILE_URL_MAX_AGE)
+    except signing.BadSignature:
+        # SignatureExpired is a BadSignature
+        raise PermissionDenied('The link is invalid or has expired')
+    name, filename = payload['n'], payload['f']
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    backend = settings.FILE_DELIVERY_BACKEND
+    if backend == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.FILE_DELIVERY_ACCEL_PREFIX + quote(name)
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = default_storage.path(name)
+    else:
+        response = _stream(request, name, content_type)
+    if response.status_code in (200, 206):
+        response['Content-Disposition'] = content_disposition_header(payload['a'], filename)
+    response['Cache-Control'] = 'private'
+    return response
+
+
+class SignedFileField(serializers.FileField):
+    """
+    A serializer file field represented by a signed download URL.
+
+    The download is offered under the `file_name` of the instance when it has one.
+    """
+    as_attachment = True
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        filename = getattr(value.instance, 'file_name', None)
+        return signed_url(value.name, filename, self.as_attachment, self.context.get('request'))
+
+
+class SignedImageField(serializers.ImageField):
+    """
+    A serializer image field represented by a signed URL for inline display.
+    """
+    as_attachment = False
+    to_representation = SignedFileField.to_representation
+
+
+class SignedFilesMixin:
+    """
+    Makes a ModelSerializer represent all its file and image fields by signed URLs.
+    """
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.FileField: SignedFileField,
+        models.ImageField: SignedImageField,
+    }
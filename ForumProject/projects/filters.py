@@ -0,0 +1,61 @@
+import django_filters
+from .models import InvestorProject, Project
+
+
+class InvestorProjectOrderingFilter(django_filters.OrderingFilter):
+    """
+    OrderingFilter that breaks ties by ID, newest first, so pages do not overlap.
+    """
+    def filter(self, qs, value):
+        if value in django_filters.constants.EMPTY_VALUES:
+            return qs
+        return qs.order_by(*[self.get_ordering_value(param) for param in value], '-id')
+
+
+class ProjectFilter(django_filters.FilterSet):
+    """
+    FilterSet for screening projects by status and by budget and duration ranges.
+
+    Budgets are compared in the base currency (`budget_base_amount`, see projects/budgets.py), so
+    projects budgeted in different currencies are screened together; the ranges are served by the
+    (status, budget) and (status, duration) indexes.
+
+    Attributes:
+        status (ChoiceFilter): Filter by the status of the project.
+        budget_min (NumberFilter): Filter by the lowest budget in the base currency, inclusive.
+        budget_max (NumberFilter): Filter by the highest budget in the base currency, inclusive.
+        duration_min (NumberFilter): Filter by the shortest duration in months, inclusive.
+        duration_max (NumberFilter): Filter by the longest duration in months, inclusive.
+        ordering (OrderingFilter): Order by `budget`, `duration` or `created`, `-` for descending.
+    """
+    status = django_filters.ChoiceFilter(choices=Project.PROJECT_STATUS_CHOICES)
+    budget_min = django_filters.NumberFilter(field_name='budget_base_amount', lookup_expr='gte')
+    budget_max = django_filters.NumberFilter(field_name='budget_base_amount', lookup_expr='lte')
+    duration_min = django_filters.NumberFilter(field_name='duration', lookup_expr='gte')
+    duration_max = django_filters.NumberFilter(field_name='duration', lookup_expr='lte')
+    ordering = InvestorProjectOrderingFilter(
+        fields=(('budget_base_amount', 'budget'), ('duration', 'duration'), ('created_at', 'created')))
+
+    class Meta:
+        model = Project
+        fields = ['status', 'budget_min', 'budget_max', 'duration_min', 'duration_max']
+
+
+class InvestorProjectFilter(django_filters.FilterSet):
+    """
+    FilterSet for filtering and ordering followed projects.
+
+    Attributes:
+        share_min (NumberFilter): Filter by the lowest share, inclusive.
+        share_max (NumberFilter): Filter by the highest share, inclusive.
+        status (ChoiceFilter): Filter by the status of the project.
+        ordering (OrderingFilter): Order by `share` or by recency (`updated`), `-` for descending.
+    """
+    share_min = django_filters.NumberFilter(field_name='share', lookup_expr='gte')
+    share_max = django_filters.NumberFilter(field_name='share', lookup_expr='lte')
+    status = django_filters.ChoiceFilter(field_name='project__status', choices=Project.PROJECT_STATUS_CHOICES)
+    ordering = InvestorProjectOrderingFilter(fields=(('share', 'share'), ('updated_at', 'updated')))
+
+    class Meta:
+        model = InvestorProject
+        fields = ['share_min', 'share_max', 'status']
@@ -0,0 +1,83 @@
+"""
+Background integrity checks of stored project files.
+
+The `scan_project_files` command walks the project files in batches, least recently checked
+first, and records for every file whether it exists, its size and modification time, and whether
+its content still matches the recorded SHA-256 digest. Results go to the metadata columns of
+`ProjectFiles` (`file_status`, `file_size`, `file_mtime`, `sha256`, `checked_at`) with one
+`bulk_update` per batch, which sends no signals, so checks never reach the project log. Request
+handlers only read the recorded status.
+
+A file is hashed only when it has no recorded digest yet, its size or modification time changed,
+or a full re-hash is requested. Files shared by several rows (blobs) are checked once per batch.
+
+Functions:
+    scan: Checks the project files not checked since the scan started.
+"""
+
+import os
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import F
+from django.utils import timezone
+
+from .blobs import file_sha256
+from .models import ProjectFiles
+
+SCANNED_FIELDS = ['file_status', 'file_size', 'file_mtime', 'sha256', 'checked_at']
+
+
+def _inspect(project_file, rehash):
+    """
+    Returns the status, size, modification time and digest of a stored file.
+    """
+    try:
+        stat = os.stat(project_file.file.path)
+    except (FileNotFoundError, ValueError):
+        # ValueError: no file is attached to the row
+        return 'missing', project_file.file_size, project_file.file_mtime, project_file.sha256
+
+    mtime = datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+    expected = project_file.sha256
+    if not (rehash or not expected or stat.st_size != project_file.file_size or mtime != project_file.file_mtime):
+        return 'ok', stat.st_size, mtime, expected
+    digest = file_sha256(project_file.file.path)
+    if expected and digest != expected:
+        return 'corrupted', stat.st_size, mtime, expected
+    return 'ok', stat.st_size, mtime, digest
+
+
+def scan(batch_size=500, rehash=False, limit=None):
+    """
+    Checks the project files not checked since the scan started.
+
+    Parameters:
+    - batch_size (int): The number of rows checked and updated at once.
+    - rehash (bool): Whether to hash every file, not only the changed ones.
+    - limit (int | None): The maximum number of rows to check, all by default.
+
+    Returns:
+    - dict: The number of checked rows per resulting status.
+    """
+    started = timezone.now()
+    pending = (ProjectFiles.objects.filter(checked_at__isnull=True)
+               | ProjectFiles.objects.filter(checked_at__lt=started))
+    report = {status: 0 for status, _ in ProjectFiles.FILE_STATUS_CHOICES if status != 'unchecked'}
+    checked = 0
+    while limit is None or checked < limit:
+        size = batch_size if limit is None else min(batch_size, limit - checked)
+        batch = list(pending.order_by(F('checked_at').asc(nulls_first=True), 'id')[:size])
+        if not batch:
+            break
+        results = {}
+        for project_file in batch:
+            key = project_file.file.name
+            if key not in results:
+                results[key] = _inspect(project_file, rehash)
+            (project_file.file_status, project_file.file_size,
+             project_file.file_mtime, project_file.sha256) = results[key]
+            project_file.checked_at = timezone.now()
+            report[project_file.file_status] += 1
+        ProjectFiles.objects.bulk_update(batch, SCANNED_FIELDS)
+        checked += len(batch)
+    return report
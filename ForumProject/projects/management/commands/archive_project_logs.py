@@ -0,0 +1,39 @@
+"""
+Management command that archives old months of the project log.
+
+Each monthly partition older than the retention period is detached, exported to a gzipped CSV file
+in the output directory and dropped.
+
+Usage:
+    python manage.py archive_project_logs /var/backups/project_logs
+    python manage.py archive_project_logs /var/backups/project_logs --keep-months 24
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from projects.partitions import archive_partitions
+
+
+class Command(BaseCommand):
+    help = 'Detach, export and drop the project log partitions older than the retention period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Directory the archives are written to.')
+        parser.add_argument('--keep-months', type=int, default=12,
+                            help='Number of past months to keep in the database besides the current one.')
+
+    def handle(self, *args, **options):
+        if options['keep_months'] < 0:
+            raise CommandError('--keep-months should not be negative')
+        today = date.today()
+        months = today.year * 12 + today.month - 1 - options['keep_months']
+        before = date(months // 12, months % 12 + 1, 1)
+        try:
+            paths = archive_partitions(before, options['output_dir'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for path in paths:
+            self.stdout.write(f'Archived {path}.')
+        self.stdout.write(f'{len(paths)} partition(s) archived.')
@@ -0,0 +1,16 @@
+"""
+Management command that removes the stored file contents no project file references anymore.
+
+Usage:
+    python manage.py collect_file_blobs   # e.g. daily from cron
+"""
+
+from django.core.management.base import BaseCommand
+from projects.blobs import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Remove the unreferenced file blobs and their content.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{collect_garbage()} blob(s) removed.')
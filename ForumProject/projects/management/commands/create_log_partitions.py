@@ -0,0 +1,24 @@
+"""
+Management command that creates the monthly partitions of the project log ahead of time.
+
+Usage:
+    python manage.py create_log_partitions                   # e.g. daily from cron
+    python manage.py create_log_partitions --months-ahead 6
+"""
+
+from django.core.management.base import BaseCommand
+from projects.partitions import create_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create the monthly project log partitions for the coming months.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Number of months after the current one to create partitions for.')
+
+    def handle(self, *args, **options):
+        created = create_partitions(options['months_ahead'])
+        for name in created:
+            self.stdout.write(f'Created {name}.')
+        self.stdout.write(f'{len(created)} partition(s) created.')
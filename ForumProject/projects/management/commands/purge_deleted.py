@@ -0,0 +1,27 @@
+"""
+Management command that removes soft-deleted projects and startups with their files and dependent rows.
+
+Rows are removed in chunks, each in its own short transaction; see projects/deletion.py.
+
+Usage:
+    python manage.py purge_deleted                    # e.g. every few minutes from cron
+    python manage.py purge_deleted --batch-size 200 --limit 10
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from projects.deletion import PURGE_BATCH_SIZE, purge_deleted
+
+
+class Command(BaseCommand):
+    help = 'Remove the deleted projects and startups together with their files, shares and subscriptions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE,
+                            help='Number of rows removed per transaction.')
+        parser.add_argument('--limit', type=int, help='Number of projects and of startups to purge at most.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size should be positive')
+        purged = purge_deleted(batch_size=options['batch_size'], limit=options['limit'])
+        self.stdout.write(f"{purged['projects']} project(s) and {purged['startups']} startup(s) purged.")
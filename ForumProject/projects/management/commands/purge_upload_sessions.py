@@ -0,0 +1,16 @@
+"""
+Management command that discards expired upload sessions together with their partial files.
+
+Usage:
+    python manage.py purge_upload_sessions   # e.g. hourly from cron
+"""
+
+from django.core.management.base import BaseCommand
+from projects.uploads import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Discard the expired project file upload sessions and their partially uploaded files.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{purge_expired_sessions()} upload session(s) discarded.')
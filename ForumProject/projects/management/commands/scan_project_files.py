@@ -0,0 +1,34 @@
+"""
+Management command that checks the stored project files and records their integrity status.
+
+Missing files and files whose content no longer matches their SHA-256 digest are flagged in
+`ProjectFiles.file_status`; see projects/integrity.py.
+
+Usage:
+    python manage.py scan_project_files                 # e.g. nightly from cron
+    python manage.py scan_project_files --limit 10000   # spread a large scan over several runs
+    python manage.py scan_project_files --rehash        # also hash the unchanged files
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from projects.integrity import scan
+
+
+class Command(BaseCommand):
+    help = 'Check that the stored project files exist and match their digests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of files checked and updated at once.')
+        parser.add_argument('--rehash', action='store_true',
+                            help='Hash every file, not only those whose size or modification time changed.')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Maximum number of files to check, the least recently checked first.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size should be positive')
+        if options['limit'] is not None and options['limit'] < 0:
+            raise CommandError('--limit should not be negative')
+        report = scan(options['batch_size'], options['rehash'], options['limit'])
+        self.stdout.write(', '.join(f'{count} {status}' for status, count in report.items()) + '.')
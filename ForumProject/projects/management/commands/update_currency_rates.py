@@ -0,0 +1,46 @@
+"""
+Management command that stores currency rates and renormalizes the budgets of the affected projects.
+
+Rates are the amount of the base currency (settings.BASE_CURRENCY) one unit of a currency is worth,
+given as arguments or read from a CSV file with `currency,rate` rows; see projects/budgets.py.
+
+Usage:
+    python manage.py update_currency_rates EUR=1.08 UAH=0.024
+    python manage.py update_currency_rates --file /var/rates.csv    # e.g. daily from cron
+"""
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from projects.budgets import BUDGET_BATCH_SIZE, update_rates
+
+
+class Command(BaseCommand):
+    help = 'Store currency rates and recompute the base-currency budgets of the affected projects.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('rates', nargs='*', help='Rates as CURRENCY=RATE, e.g. EUR=1.08.')
+        parser.add_argument('--file', help='CSV file with currency,rate rows.')
+        parser.add_argument('--batch-size', type=int, default=BUDGET_BATCH_SIZE,
+                            help='Number of project IDs recomputed per transaction.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size should be positive')
+        try:
+            pairs = [rate.split('=', 1) for rate in options['rates']]
+            if options['file']:
+                with open(options['file'], encoding='utf-8', newline='') as stream:
+                    pairs += [row for row in csv.reader(stream) if row]
+        except OSError as e:
+            raise CommandError(f'Could not read the rates: {e}')
+        if any(len(pair) != 2 for pair in pairs):
+            raise CommandError('Rates should be given as CURRENCY=RATE or currency,rate rows')
+        if not pairs:
+            raise CommandError('No rates were given')
+
+        try:
+            changed = update_rates(dict(pairs), batch_size=options['batch_size'])
+        except ValueError as e:
+            raise CommandError(f'No rates were stored: {e}')
+        self.stdout.write(f'{len(pairs)} rate(s) stored, {changed} project budget(s) renormalized.')
@@ -0,0 +1,16 @@
+from . import audit
+
+
+class AuditLogMiddleware:
+    """
+    Makes the current request the source of the acting user of the project log events it records.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = audit.start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            audit.finish(token)
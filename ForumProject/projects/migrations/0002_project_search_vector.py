@@ -0,0 +1,76 @@
+# Generated by Django 5.0.6 on 2026-10-19 05:23
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+# The project trigger builds the document from the row being written and its startup. The startup
+# trigger clears the vector of the startup's projects, which makes the project trigger rebuild it.
+TRIGGERS_SQL = '''
+    CREATE FUNCTION projects_project_search_vector() RETURNS trigger AS $$
+    BEGIN
+        SELECT setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B')
+            || setweight(to_tsvector('english', coalesce(s.startup_name, '')), 'C')
+            || setweight(to_tsvector('english', coalesce(s.startup_industry, '')), 'D')
+        INTO NEW.search_vector
+        FROM startups_startup s WHERE s.id = NEW.startup_id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER projects_project_search_vector_trigger
+        BEFORE INSERT OR UPDATE ON projects_project
+        FOR EACH ROW EXECUTE FUNCTION projects_project_search_vector();
+
+    CREATE FUNCTION startups_startup_project_search_vector() RETURNS trigger AS $$
+    BEGIN
+        UPDATE projects_project SET search_vector = NULL WHERE startup_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER startups_startup_project_search_vector_trigger
+        AFTER UPDATE OF startup_name, startup_industry ON startups_startup
+        FOR EACH ROW
+        WHEN (OLD.startup_name IS DISTINCT FROM NEW.startup_name
+              OR OLD.startup_industry IS DISTINCT FROM NEW.startup_industry)
+        EXECUTE FUNCTION startups_startup_project_search_vector();
+
+    UPDATE projects_project SET search_vector = NULL;
+'''
+
+DROP_TRIGGERS_SQL = '''
+    DROP TRIGGER startups_startup_project_search_vector_trigger ON startups_startup;
+    DROP FUNCTION startups_startup_project_search_vector();
+    DROP TRIGGER projects_project_search_vector_trigger ON projects_project;
+    DROP FUNCTION projects_project_search_vector();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('startups', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='description',
+            field=models.CharField(max_length=500),
+        ),
+        # Backfill before building the index, so existing rows are indexed in one pass
+        migrations.RunSQL(TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+        migrations.AddIndex(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='project_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.6 on 2026-10-19 05:30
+
+from django.db import migrations, models
+
+
+BACKFILL_SQL = '''
+    UPDATE projects_project p SET allocated_share = funding.total
+    FROM (SELECT project_id, SUM(share) AS total FROM projects_investorproject GROUP BY project_id) funding
+    WHERE funding.project_id = p.id
+'''
+
+
+def check_oversubscribed(apps, schema_editor):
+    """
+    Stops the migration with the list of projects whose shares add up to more than 100%.
+
+    Such shares were possible before the ledger locked allocations; clamping the ledger instead
+    would make it disagree with the shares and fail later releases, so they are fixed by hand.
+    """
+    Project = apps.get_model('projects', 'Project')
+    oversubscribed = list(Project.objects.filter(allocated_share__gt=100).order_by('pk')
+                          .values_list('pk', 'allocated_share'))
+    if oversubscribed:
+        projects = ', '.join(f'{pk} ({total}%)' for pk, total in oversubscribed)
+        raise RuntimeError(f'The shares of these projects add up to more than 100%, reduce them in '
+                           f'projects_investorproject and migrate again: {projects}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_search_vector'),
+        ('startups', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='allocated_share',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.RunPython(check_oversubscribed, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='project',
+            constraint=models.CheckConstraint(check=models.Q(('allocated_share__gte', 0), ('allocated_share__lte', 100)), name='project_allocated_share_range'),
+        ),
+    ]
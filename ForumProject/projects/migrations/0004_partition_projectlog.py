@@ -0,0 +1,120 @@
+# Generated by Django 5.0.6 on 2026-10-19 05:40
+
+from django.db import migrations, models
+
+
+COLUMNS = '''
+    id bigint NOT NULL,
+    project_birth_id integer NOT NULL,
+    change_date date NOT NULL,
+    change_time time NOT NULL,
+    user_id integer NOT NULL,
+    startup_id integer NOT NULL,
+    action varchar(50) NOT NULL,
+    previous_state varchar(255) NOT NULL,
+    modified_state varchar(255) NOT NULL,
+    project_id bigint NULL
+'''
+
+COLUMN_NAMES = ('id, project_birth_id, change_date, change_time, user_id, startup_id, action, '
+                'previous_state, modified_state, project_id')
+
+FOREIGN_KEY_SQL = '''
+    ALTER TABLE projects_projectlog ADD CONSTRAINT projects_projectlog_project_id_d6e73f8c_fk_projects_project_id
+        FOREIGN KEY (project_id) REFERENCES projects_project (id) DEFERRABLE INITIALLY DEFERRED;
+    CREATE INDEX projects_projectlog_project_id_d6e73f8c ON projects_projectlog (project_id);
+'''
+
+# Monthly partitions cover the existing rows and the next three months, later months are created
+# by the `create_log_partitions` command. The primary key has to include the partition key.
+PARTITION_SQL = f'''
+    CREATE TABLE projects_projectlog_partitioned ({COLUMNS}) PARTITION BY RANGE (change_date);
+    CREATE TABLE projects_projectlog_default PARTITION OF projects_projectlog_partitioned DEFAULT;
+
+    DO $$
+    DECLARE
+        month date := date_trunc('month', coalesce((SELECT min(change_date) FROM projects_projectlog),
+                                                   current_date));
+    BEGIN
+        WHILE month <= date_trunc('month', current_date) + interval '3 months' LOOP
+            EXECUTE format('CREATE TABLE %I PARTITION OF projects_projectlog_partitioned FOR VALUES FROM (%L) TO (%L)',
+                           'projects_projectlog_' || to_char(month, '"y"YYYY"m"MM'),
+                           month, (month + interval '1 month')::date);
+            month := month + interval '1 month';
+        END LOOP;
+    END
+    $$;
+
+    INSERT INTO projects_projectlog_partitioned ({COLUMN_NAMES})
+        SELECT {COLUMN_NAMES} FROM projects_projectlog;
+    DROP TABLE projects_projectlog;
+    ALTER TABLE projects_projectlog_partitioned RENAME TO projects_projectlog;
+
+    CREATE SEQUENCE projects_projectlog_id_seq OWNED BY projects_projectlog.id;
+    SELECT setval('projects_projectlog_id_seq', coalesce(max(id), 0) + 1, false) FROM projects_projectlog;
+    ALTER TABLE projects_projectlog ALTER COLUMN id SET DEFAULT nextval('projects_projectlog_id_seq');
+
+    ALTER TABLE projects_projectlog ADD CONSTRAINT projects_projectlog_pkey PRIMARY KEY (id, change_date);
+    {FOREIGN_KEY_SQL}
+    CREATE INDEX project_log_lookup_idx ON projects_projectlog (startup_id, project_birth_id, id DESC);
+'''
+
+UNPARTITION_SQL = f'''
+    ALTER TABLE projects_projectlog RENAME TO projects_projectlog_partitioned;
+    CREATE TABLE projects_projectlog ({COLUMNS});
+    INSERT INTO projects_projectlog ({COLUMN_NAMES})
+        SELECT {COLUMN_NAMES} FROM projects_projectlog_partitioned;
+    DROP TABLE projects_projectlog_partitioned;
+
+    ALTER TABLE projects_projectlog ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY;
+    SELECT setval(pg_get_serial_sequence('projects_projectlog', 'id'), coalesce(max(id), 0) + 1, false)
+        FROM projects_projectlog;
+    ALTER TABLE projects_projectlog ADD CONSTRAINT projects_projectlog_pkey PRIMARY KEY (id);
+    {FOREIGN_KEY_SQL}
+    CREATE INDEX projects_projectlog_change_date_fd1ef071 ON projects_projectlog (change_date);
+    CREATE INDEX projects_projectlog_user_id_bc14ad7a ON projects_projectlog (user_id);
+    CREATE INDEX projects_projectlog_startup_id_fcfe0935 ON projects_projectlog (startup_id);
+    CREATE INDEX projects_projectlog_action_876d7ec4 ON projects_projectlog (action);
+    CREATE INDEX projects_projectlog_action_876d7ec4_like ON projects_projectlog (action varchar_pattern_ops);
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_project_allocated_share'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='projectlog',
+                    name='action',
+                    field=models.CharField(max_length=50),
+                ),
+                migrations.AlterField(
+                    model_name='projectlog',
+                    name='change_date',
+                    field=models.DateField(auto_now_add=True),
+                ),
+                migrations.AlterField(
+                    model_name='projectlog',
+                    name='startup_id',
+                    field=models.IntegerField(),
+                ),
+                migrations.AlterField(
+                    model_name='projectlog',
+                    name='user_id',
+                    field=models.IntegerField(),
+                ),
+                migrations.AddIndex(
+                    model_name='projectlog',
+                    index=models.Index(fields=['startup_id', 'project_birth_id', '-id'], name='project_log_lookup_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-19 05:44
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_partition_projectlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectlog',
+            name='changes',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+        migrations.AlterField(
+            model_name='projectlog',
+            name='modified_state',
+            field=models.CharField(blank=True, max_length=255, verbose_name='After changes'),
+        ),
+        migrations.AlterField(
+            model_name='projectlog',
+            name='previous_state',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Before changes'),
+        ),
+    ]
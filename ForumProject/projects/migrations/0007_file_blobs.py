@@ -0,0 +1,42 @@
+# Generated by Django 5.0.6 on 2026-10-19 05:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectfiles',
+            name='file_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'File Blob',
+                'verbose_name_plural': 'File Blobs',
+                'indexes': [models.Index(condition=models.Q(('ref_count', 0)), fields=['ref_count'], name='file_blob_unreferenced_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='fileblob',
+            constraint=models.CheckConstraint(check=models.Q(('ref_count__gte', 0)), name='file_blob_ref_count_range'),
+        ),
+        migrations.AddField(
+            model_name='projectfiles',
+            name='blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='project_files', to='projects.fileblob'),
+        ),
+    ]
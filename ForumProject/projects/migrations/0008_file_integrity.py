@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-19 05:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_file_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectfiles',
+            name='checked_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectfiles',
+            name='file_mtime',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectfiles',
+            name='file_status',
+            field=models.CharField(choices=[('unchecked', 'Unchecked'), ('ok', 'OK'), ('missing', 'Missing'), ('corrupted', 'Corrupted')], default='unchecked', editable=False, max_length=20),
+        ),
+    ]
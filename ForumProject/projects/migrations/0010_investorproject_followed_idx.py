@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investors', '0002_investor_updated_at'),
+        ('projects', '0009_export_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='investorproject',
+            index=models.Index(fields=['investor', '-updated_at'], name='investorproject_followed_idx'),
+        ),
+    ]
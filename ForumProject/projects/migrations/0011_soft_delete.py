@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-19 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_investorproject_followed_idx'),
+        ('startups', '0003_soft_delete'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='project',
+            name='unique_project_per_startup',
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='project_deleted_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='project',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('startup', 'name'), name='unique_project_per_startup'),
+        ),
+    ]
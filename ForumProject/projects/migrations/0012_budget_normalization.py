@@ -0,0 +1,76 @@
+# Generated by Django 5.0.6 on 2026-10-19 06:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Converts the budget of the row being written with the stored rate of its currency. Rate changes
+# are applied to existing rows by projects.budgets.update_rates.
+TRIGGER_SQL = '''
+    CREATE FUNCTION projects_project_budget_base_amount() RETURNS trigger AS $$
+    BEGIN
+        NEW.budget_base_amount := round(NEW.budget_amount * (
+            SELECT rate FROM projects_currencyrate WHERE currency = upper(btrim(NEW.budget_currency))));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER projects_project_budget_base_amount_trigger
+        BEFORE INSERT OR UPDATE OF budget_amount, budget_currency ON projects_project
+        FOR EACH ROW EXECUTE FUNCTION projects_project_budget_base_amount();
+
+    UPDATE projects_project SET budget_currency = budget_currency WHERE budget_amount IS NOT NULL;
+'''
+
+DROP_TRIGGER_SQL = '''
+    DROP TRIGGER projects_project_budget_base_amount_trigger ON projects_project;
+    DROP FUNCTION projects_project_budget_base_amount();
+'''
+
+
+def add_base_currency(apps, schema_editor):
+    apps.get_model('projects', 'CurrencyRate').objects.get_or_create(currency=settings.BASE_CURRENCY,
+                                                                     defaults={'rate': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_soft_delete'),
+        ('startups', '0003_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrencyRate',
+            fields=[
+                ('currency', models.CharField(max_length=3, primary_key=True, serialize=False)),
+                ('rate', models.DecimalField(decimal_places=10, max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Currency Rate',
+                'verbose_name_plural': 'Currency Rates',
+            },
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='budget_base_amount',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='currencyrate',
+            constraint=models.CheckConstraint(check=models.Q(('rate__gt', 0)), name='currency_rate_positive'),
+        ),
+        migrations.RunPython(add_base_currency, migrations.RunPython.noop),
+        # Backfill before building the indexes, so existing rows are indexed in one pass
+        migrations.RunSQL(TRIGGER_SQL, DROP_TRIGGER_SQL),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['status', 'budget_base_amount'], name='project_status_budget_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['status', 'duration'], name='project_status_duration_idx'),
+        ),
+    ]
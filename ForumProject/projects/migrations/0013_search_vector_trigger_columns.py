@@ -0,0 +1,43 @@
+# Generated by Django 5.0.6 on 2026-10-19 07:10
+
+from django.db import migrations
+
+
+# The search document is rebuilt only when a column it is built from changes, or when the startup
+# trigger clears the vector. Ledger, budget and timestamp updates leave it alone.
+TRIGGERS_SQL = '''
+    DROP TRIGGER projects_project_search_vector_trigger ON projects_project;
+
+    CREATE TRIGGER projects_project_search_vector_insert_trigger
+        BEFORE INSERT ON projects_project
+        FOR EACH ROW EXECUTE FUNCTION projects_project_search_vector();
+
+    CREATE TRIGGER projects_project_search_vector_update_trigger
+        BEFORE UPDATE OF name, description, startup_id, search_vector ON projects_project
+        FOR EACH ROW
+        WHEN (OLD.name IS DISTINCT FROM NEW.name
+              OR OLD.description IS DISTINCT FROM NEW.description
+              OR OLD.startup_id IS DISTINCT FROM NEW.startup_id
+              OR NEW.search_vector IS NULL)
+        EXECUTE FUNCTION projects_project_search_vector();
+'''
+
+DROP_TRIGGERS_SQL = '''
+    DROP TRIGGER projects_project_search_vector_update_trigger ON projects_project;
+    DROP TRIGGER projects_project_search_vector_insert_trigger ON projects_project;
+
+    CREATE TRIGGER projects_project_search_vector_trigger
+        BEFORE INSERT OR UPDATE ON projects_project
+        FOR EACH ROW EXECUTE FUNCTION projects_project_search_vector();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_budget_normalization'),
+    ]
+
+    operations = [
+        migrations.RunSQL(TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+    ]
@@ -4,21 +4,38 @@ and project logs.
 
 Classes:
     Project: Represents a project associated with a startup.
+    FileBlob: Represents stored file content shared by project files.
     ProjectFiles: Represents files associated with a project.
+    UploadSession: Represents a resumable upload of a project file in progress.
     InvestorProject: Represents the relationship between an investor and a project.
     ProjectLog: Represents a log entry for project-related events.
 """
 
 import os
 import logging
-from django.db import models
+import uuid
+from decimal import ROUND_HALF_UP, Decimal
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import F
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from startups.models import Startup
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from startups.models import SoftDeleteManager, Startup
 from investors.models import Investor
 
 
 logger = logging.getLogger(__name__)
 
+# Text search configuration used by the search_vector triggers and the search queries
+SEARCH_CONFIG = 'english'
+
+# Cached currency rates, dropped by projects.budgets.update_rates when they change
+CURRENCY_RATE_CACHE_KEY = 'projects:currency_rate:{}'
+
 
 class Project(models.Model):
     """
@@ -35,10 +52,19 @@ class Project(models.Model):
         duration (float): number of months which implementation of the Project is planned for.
         budget_currency (str): currency of the Project's budget
         budget_amount (int): amount of the Project's budget
+        search_vector (tsvector): weighted full-text document of the Project's name and
+            description and its startup's name and industry, maintained by database triggers.
+        allocated_share (int): total share of the Project allocated to investors, maintained
+            by `InvestorProject.allocate_share` and guarded by a 0-100 check constraint.
+        deleted_at (date-time): when the Project, or its startup, was deleted; it is hidden from
+            then on and its rows and files are removed later by the `purge_deleted` command.
+        budget_base_amount (int): `budget_amount` converted to settings.BASE_CURRENCY with the
+            stored `CurrencyRate`, maintained by a database trigger and by `projects.budgets`;
+            None if the budget or the rate of its currency is unknown.
     """
     name = models.CharField(max_length=150, db_index=True)
     startup = models.ForeignKey(Startup, on_delete=models.CASCADE, related_name='projects')
-    description = models.CharField(max_length=500, db_index=True)
+    description = models.CharField(max_length=500)
     PROJECT_STATUS_CHOICES = [
         ('open', 'Open'),
         ('closed', 'Closed'),
@@ -46,17 +72,42 @@ class Project(models.Model):
     ]
     status = models.CharField(max_length=20, choices=PROJECT_STATUS_CHOICES, default='open')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     duration = models.FloatField(blank=True, null=True, verbose_name='duration (months)')
     budget_currency = models.CharField(max_length=3, blank=True, null=True)
     budget_amount = models.IntegerField(blank=True, null=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    allocated_share = models.IntegerField(default=0, editable=False)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+    budget_base_amount = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    # Columns written by the database or by atomic UPDATEs, never by save()
+    MANAGED_FIELDS = ('search_vector', 'allocated_share', 'deleted_at', 'budget_base_amount')
 
     class Meta:
         verbose_name = 'Project'
         verbose_name_plural = 'Projects'
         ordering = ['startup', 'name']
         constraints = [
-            models.UniqueConstraint(fields=['startup', 'name'], name='unique_project_per_startup')
+            models.UniqueConstraint(fields=['startup', 'name'], condition=models.Q(deleted_at__isnull=True),
+                                    name='unique_project_per_startup'),
+            models.CheckConstraint(
+                check=models.Q(allocated_share__gte=0) & models.Q(allocated_share__lte=100),
+                name='project_allocated_share_range'
+            )
+        ]
+        indexes = [
+            GinIndex(fields=['search_vector'], name='project_search_vector_idx'),
+            models.Index(fields=['deleted_at'], condition=models.Q(deleted_at__isnull=False),
+                         name='project_deleted_idx'),
+            # Screening of live projects by status and budget or duration ranges
+            models.Index(fields=['status', 'budget_base_amount'], condition=models.Q(deleted_at__isnull=True),
+                         name='project_status_budget_idx'),
+            models.Index(fields=['status', 'duration'], condition=models.Q(deleted_at__isnull=True),
+                         name='project_status_duration_idx'),
         ]
 
     def __str__(self):
@@ -68,6 +119,125 @@ class Project(models.Model):
         """
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        Save the project without overwriting the columns listed in MANAGED_FIELDS
+        with possibly stale values held by this instance, and convert a budget that is
+        written to the base currency.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MANAGED_FIELDS
+                and field.attname not in deferred
+            ]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'budget_amount', 'budget_currency'} & set(update_fields):
+            # The trigger stores the same conversion, so the row is not read back
+            self.budget_base_amount = CurrencyRate.base_amount(self.budget_amount, self.budget_currency)
+        super().save(*args, **kwargs)
+
+
+class CurrencyRate(models.Model):
+    """
+    Model representing the stored exchange rate of a currency to settings.BASE_CURRENCY, used to
+    normalize project budgets (see `projects.budgets`).
+
+    Attributes:
+        currency (str): The 3-letter currency code, upper case.
+        rate (Decimal): The amount of the base currency one unit of the currency is worth.
+        updated_at (datetime): When the rate was last stored.
+    """
+    currency = models.CharField(max_length=3, primary_key=True)
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Currency Rate'
+        verbose_name_plural = 'Currency Rates'
+        constraints = [
+            models.CheckConstraint(check=models.Q(rate__gt=0), name='currency_rate_positive'),
+        ]
+
+    def __str__(self):
+        return f'{self.currency}: {self.rate}'
+
+    @classmethod
+    def base_amount(cls, amount, currency):
+        """
+        Converts an amount to settings.BASE_CURRENCY with the cached rate of its currency, rounded
+        like the database trigger does.
+
+        Parameters:
+        - amount (int | None): The amount.
+        - currency (str | None): The currency code of the amount, in any case.
+
+        Returns:
+        - int | None: The converted amount; None if the amount or the rate of the currency is unknown.
+        """
+        if amount is None or not currency:
+            return None
+        code = currency.strip().upper()
+        key = CURRENCY_RATE_CACHE_KEY.format(code)
+        # A missing rate is cached as an empty string, so it is not looked up on every save either
+        rate = cache.get(key)
+        if rate is None:
+            rate = cls.objects.filter(currency=code).values_list('rate', flat=True).first() or ''
+            cache.set(key, rate, timeout=settings.CURRENCY_RATE_CACHE_TIMEOUT)
+        if rate == '':
+            return None
+        return int((Decimal(amount) * rate).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+class OversubscriptionError(Exception):
+    """
+    Raised when a share allocation would take a Project over 100%.
+
+    Attributes:
+        available_share (int): the share that is still available to the investor.
+    """
+    def __init__(self, available_share):
+        super().__init__(f'Available share: {available_share}%')
+        self.available_share = available_share
+
+
+class FileBlob(models.Model):
+    """
+    Model representing stored file content, shared by all project files with the same content.
+
+    The content is stored once under a name derived from its SHA-256 digest (see `projects.blobs`).
+    `ref_count` is kept equal to the number of ProjectFiles rows referencing the blob by the
+    ProjectFiles signals; unreferenced blobs are removed by the `collect_file_blobs` command.
+
+    Attributes:
+        sha256 (str): The hex SHA-256 digest of the content.
+        size (int): The size of the content in bytes.
+        ref_count (int): The number of ProjectFiles rows referencing the blob.
+        created_at (datetime): When the content was first stored.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'File Blob'
+        verbose_name_plural = 'File Blobs'
+        constraints = [
+            models.CheckConstraint(check=models.Q(ref_count__gte=0), name='file_blob_ref_count_range'),
+        ]
+        indexes = [
+            models.Index(fields=['ref_count'], condition=models.Q(ref_count=0), name='file_blob_unreferenced_idx'),
+        ]
+
+    @staticmethod
+    def storage_name(sha256):
+        """
+        Returns the storage name of the content with the given digest, sharded by its first bytes.
+        """
+        return f'media/blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
 
 class ProjectFiles(models.Model):
     """
@@ -76,13 +246,23 @@ class ProjectFiles(models.Model):
     Attributes:
         project (ForeignKey): The related Project instance.
         file_description (str): A description of the file.
-        file (FileField): The file being uploaded.
+        file (FileField): The file being uploaded, named after the blob for content-addressed files.
+        file_name (str): The original name of the file.
+        file_size (int): The size of the file in bytes, counted against the startup's storage quota.
+        sha256 (str): The hex SHA-256 digest of the file.
+        blob (ForeignKey): The stored content of the file; None for files uploaded before
+            content-addressed storage, which keep a file of their own.
+        file_status (str): The result of the last integrity check (see `projects.integrity`).
+        file_mtime (datetime): The modification time of the file at the last check.
+        checked_at (datetime): When the file was last checked, None if never.
     """
     def _generate_upload_path(self, filename):
         """
         The function creates a valid path for each Project's documentation upload
         and ensures renaming of the file being uploaded if its name is not unique in 
         the selected folder.
+
+        Only files assigned to `file` directly use this path; uploads are stored as blobs.
         """
         try:
             startup_folder = f'startup_{self.project.startup.pk}'
@@ -129,6 +309,21 @@ class ProjectFiles(models.Model):
         blank=True,
         null=True,
     )
+    file_name = models.CharField(max_length=255, blank=True)
+    file_size = models.BigIntegerField(blank=True, null=True, editable=False)
+    sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    blob = models.ForeignKey(FileBlob, on_delete=models.PROTECT, null=True, blank=True, editable=False,
+                             related_name='project_files')
+    FILE_STATUS_CHOICES = [
+        ('unchecked', 'Unchecked'),
+        ('ok', 'OK'),
+        ('missing', 'Missing'),
+        ('corrupted', 'Corrupted'),
+    ]
+    file_status = models.CharField(max_length=20, choices=FILE_STATUS_CHOICES, default='unchecked',
+                                   editable=False)
+    file_mtime = models.DateTimeField(blank=True, null=True, editable=False)
+    checked_at = models.DateTimeField(blank=True, null=True, editable=False, db_index=True)
 
     class Meta:
         verbose_name = 'Project File'
@@ -145,6 +340,41 @@ class ProjectFiles(models.Model):
             raise ValidationError("File description cannot be empty.")
 
 
+class UploadSession(models.Model):
+    """
+    Model representing a resumable upload of a project file in progress (see `projects.uploads`).
+
+    Attributes:
+        id (UUID): The opaque ID of the session, used in the upload URLs.
+        project (ForeignKey): The Project the file is uploaded to.
+        file_name (str): The name of the file being uploaded.
+        file_description (str): The description of the ProjectFiles row created on finalization.
+        size (int): The declared size of the file in bytes, reserved against the startup's quota.
+        offset (int): The number of bytes received so far.
+        staged_name (str): The storage name of the partially uploaded file.
+        created_at (datetime): When the session was opened.
+        expires_at (datetime): When the session expires unless another chunk arrives.
+        writer (UUID): The token of the request writing a chunk, if any.
+        writing_until (datetime): When the lease of the writing request lapses, if a chunk is being written.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='upload_sessions')
+    file_name = models.CharField(max_length=255)
+    file_description = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    staged_name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    writer = models.UUIDField(null=True, blank=True, editable=False)
+    writing_until = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = 'Upload Session'
+        verbose_name_plural = 'Upload Sessions'
+        ordering = ['created_at']
+
+
 class InvestorProject(models.Model):
     """
     Model representing the relationship between an Investor and a Project.
@@ -153,12 +383,14 @@ class InvestorProject(models.Model):
         investor (ForeignKey): The related Investor instance.
         project (ForeignKey): The related Project instance.
         share (int): The percentage share the Investor holds in the Project.
+        updated_at (datetime): When the share was last modified, for incremental exports.
     """
     investor = models.ForeignKey(Investor, on_delete=models.CASCADE, db_index=True,
                                  related_name='shortlisted_project')
     project = models.ForeignKey(Project, on_delete=models.CASCADE, db_index=True,
                                 related_name='project_share')
     share = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Project Shortlist'
@@ -170,6 +402,10 @@ class InvestorProject(models.Model):
                 name='percentage_share_range'
             )
         ]
+        indexes = [
+            # An investor's followed projects, most recent first
+            models.Index(fields=['investor', '-updated_at'], name='investorproject_followed_idx'),
+        ]
 
     def __str__(self):
         """
@@ -193,7 +429,10 @@ class InvestorProject(models.Model):
     @classmethod
     def get_total_funding(cls, project_id: int) -> float:
         """
-        Calculate the total funding from all investors for a specific project.
+        Return the total funding from all investors for a specific project.
+
+        The total is read from the project's funding ledger (`Project.allocated_share`),
+        so no aggregation over the investors is needed.
 
         Args:
             project_id (int): The ID of the project.
@@ -201,13 +440,118 @@ class InvestorProject(models.Model):
         Returns:
             float: The total amount of funding.
         """
-        try:
-            total_funding = cls.objects.filter(
-                project_id=project_id).aggregate(total=models.Sum('share'))['total']
-            return float(total_funding or 0)
-        except Exception as e:
-            print(f"An error occurred while calculating total funding: {e}")
-        return 0.0
+        total_funding = Project.objects.filter(pk=project_id).values_list(
+            'allocated_share', flat=True).first()
+        return float(total_funding or 0)
+
+    @classmethod
+    def _lock(cls, project_id: int, investor_id: int):
+        """
+        Lock the project's funding ledger and then the investor's share of the project.
+
+        Every change of a share goes through this method (and deletions through the pre_delete
+        receiver of `projects.signals`), so the rows are always locked in the same order and
+        concurrent changes of a project's shares cannot deadlock. Must be called in a transaction.
+
+        Args:
+            project_id (int): The ID of the project.
+            investor_id (int): The ID of the investor.
+
+        Returns:
+            tuple: The project with its `allocated_share` and the InvestorProject instance, or None.
+
+        Raises:
+            Project.DoesNotExist: If the project does not exist.
+        """
+        project = Project.objects.select_for_update().only('allocated_share').get(pk=project_id)
+        investor_project = cls.objects.select_for_update().filter(
+            project_id=project_id, investor_id=investor_id).first()
+        return project, investor_project
+
+    @classmethod
+    def allocate_share(cls, project_id: int, investor_id: int, share: int):
+        """
+        Set the share of an investor in a project and update the project's funding ledger.
+
+        The project row and then the investor's share are locked with SELECT ... FOR UPDATE, so
+        concurrent allocations for the same project are serialized, and the ledger is moved by the
+        difference between the new and the previous share with an F() expression. The check
+        constraint on `Project.allocated_share` guards against oversubscription at the database level.
+
+        Args:
+            project_id (int): The ID of the project.
+            investor_id (int): The ID of the investor.
+            share (int): The new share of the investor.
+
+        Returns:
+            tuple: The InvestorProject instance and whether it was created.
+
+        Raises:
+            Project.DoesNotExist: If the project does not exist.
+            OversubscriptionError: If the share exceeds what is available to the investor.
+        """
+        with transaction.atomic():
+            project, investor_project = cls._lock(project_id, investor_id)
+            previous_share = investor_project.share if investor_project else 0
+
+            available_share = 100 - project.allocated_share + previous_share
+            if share > available_share:
+                raise OversubscriptionError(available_share)
+
+            # updated_at is not set by update(), bump it for incremental exports
+            Project.objects.filter(pk=project_id).update(
+                allocated_share=F('allocated_share') + share - previous_share, updated_at=timezone.now())
+            if investor_project is None:
+                return cls.objects.create(project_id=project_id, investor_id=investor_id,
+                                          share=share), True
+            investor_project.share = share
+            investor_project.save()
+            return investor_project, False
+
+    @classmethod
+    def follow(cls, project_id: int, investor_id: int):
+        """
+        Shortlist a project for an investor with a share of zero, unless it is already followed.
+
+        Args:
+            project_id (int): The ID of the project.
+            investor_id (int): The ID of the investor.
+
+        Returns:
+            tuple: The InvestorProject instance and whether it was created.
+
+        Raises:
+            Project.DoesNotExist: If the project does not exist.
+        """
+        with transaction.atomic():
+            _, investor_project = cls._lock(project_id, investor_id)
+            if investor_project is not None:
+                return investor_project, False
+            return cls.objects.create(project_id=project_id, investor_id=investor_id, share=0), True
+
+    @classmethod
+    def release_share(cls, project_id: int, investor_id: int) -> bool:
+        """
+        Remove an investor from a project, returning the share to the project's funding ledger.
+
+        The ledger is moved by the post_delete receiver of `projects.signals`.
+
+        Args:
+            project_id (int): The ID of the project.
+            investor_id (int): The ID of the investor.
+
+        Returns:
+            bool: Whether the investor followed the project.
+
+        Raises:
+            Project.DoesNotExist: If the project does not exist.
+        """
+        with transaction.atomic():
+            _, investor_project = cls._lock(project_id, investor_id)
+            if investor_project is None:
+                return False
+            investor_project.delete()
+            return True
 
 
 class ProjectLog(models.Model):
@@ -229,6 +573,11 @@ class ProjectLog(models.Model):
         'Updated Project', 'Deleted Project').
         previous_state (str): A textual representation of the state before the change.
         modified_state (str): A textual representation of the state after the change.
+        changes (dict): The changed project fields as `{field: [old, new]}`, see `projects.history`.
+            Project updates store only this diff and leave the textual states empty.
+
+    The table is partitioned by month of `change_date` (see `projects.partitions`), so its primary
+    key in the database is `(id, change_date)`; `id` stays unique as it comes from one sequence.
     """
     project = models.ForeignKey(
         Project,
@@ -238,15 +587,19 @@ class ProjectLog(models.Model):
         db_index=True,
         verbose_name="Project in DB")
     project_birth_id = models.IntegerField(verbose_name='id')
-    change_date = models.DateField(auto_now_add=True, db_index=True)
+    change_date = models.DateField(auto_now_add=True)
     change_time = models.TimeField(auto_now_add=True)
-    user_id = models.IntegerField(db_index=True)
-    startup_id = models.IntegerField(db_index=True)
-    action = models.CharField(max_length=50, db_index=True)
-    previous_state = models.CharField(max_length=255, verbose_name='Before changes')
-    modified_state = models.CharField(max_length=255, verbose_name='After changes')
+    user_id = models.IntegerField()
+    startup_id = models.IntegerField()
+    action = models.CharField(max_length=50)
+    previous_state = models.CharField(max_length=255, blank=True, verbose_name='Before changes')
+    modified_state = models.CharField(max_length=255, blank=True, verbose_name='After changes')
+    changes = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
 
     class Meta:
         verbose_name = 'Project Log'
         verbose_name_plural = 'Project Logs'
         ordering = ['-pk']
+        indexes = [
+            models.Index(fields=['startup_id', 'project_birth_id', '-id'], name='project_log_lookup_idx'),
+        ]
@@ -0,0 +1,140 @@
+"""
+Monthly partitions of the project log.
+
+`ProjectLog` is range-partitioned by `change_date` with one partition per calendar month, named
+`projects_projectlog_yYYYYmMM`, and a default partition for rows no monthly partition covers yet.
+Each partition has its own small indexes, so an insert only touches the indexes of the current
+month, and old months can be detached and archived without rewriting or vacuuming a large table.
+
+Partitions are created ahead of time by the `create_log_partitions` command, which should run
+periodically (e.g. daily from cron). Rows that reached the default partition because the command
+did not run in time are moved to their monthly partition when it is created.
+
+Functions:
+    create_partitions: Creates the monthly partitions for the coming months.
+    archive_partitions: Detaches monthly partitions of past months and exports them to files.
+"""
+
+import gzip
+import os
+import re
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+
+from .models import ProjectLog
+
+TABLE = ProjectLog._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME = re.compile(rf'{TABLE}_y(\d{{4}})m(\d{{2}})')
+
+
+def partition_name(month):
+    """
+    Returns the name of the partition holding the given month.
+    """
+    return f'{TABLE}_y{month.year}m{month.month:02d}'
+
+
+def _next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _partitions(cursor):
+    """
+    Returns a mapping of the first day of a month to the name of its attached partition.
+    """
+    cursor.execute(
+        'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+        'WHERE i.inhparent = %s::regclass',
+        [TABLE]
+    )
+    months = {}
+    for name, in cursor.fetchall():
+        match = PARTITION_NAME.fullmatch(name)
+        if match:
+            months[date(int(match[1]), int(match[2]), 1)] = name
+    return months
+
+
+def _create_partition(cursor, month):
+    """
+    Creates the partition of a month, moving its rows out of the default partition.
+
+    A partition cannot be attached while the default partition holds rows of its range, so the
+    partition is filled as a standalone table first and attached afterwards.
+    """
+    name, bounds = partition_name(month), [month, _next_month(month)]
+    with transaction.atomic():
+        cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            f'WHERE change_date >= %s AND change_date < %s RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved',
+            bounds
+        )
+        cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', bounds)
+
+
+def create_partitions(months_ahead=3):
+    """
+    Creates the monthly partitions for the coming months.
+
+    Besides the current month and `months_ahead` following ones, partitions are created for every
+    month that has rows in the default partition.
+
+    Parameters:
+    - months_ahead (int): The number of months after the current one to create partitions for.
+
+    Returns:
+    - list[str]: The names of the created partitions.
+    """
+    month = date.today().replace(day=1)
+    wanted = set()
+    for _ in range(months_ahead + 1):
+        wanted.add(month)
+        month = _next_month(month)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT date_trunc('month', change_date)::date FROM {DEFAULT_PARTITION}")
+        wanted.update(month for month, in cursor.fetchall())
+        existing = _partitions(cursor)
+        created = []
+        for month in sorted(wanted - set(existing)):
+            _create_partition(cursor, month)
+            created.append(partition_name(month))
+    return created
+
+
+def archive_partitions(before, directory):
+    """
+    Detaches monthly partitions of past months and exports them to files.
+
+    Every partition that ends on or before `before` is detached, copied to
+    `<directory>/<partition name>.csv.gz` with a header row and dropped, all in one transaction,
+    so a failed export leaves the partition attached.
+
+    Parameters:
+    - before (date): Partitions of months ending on or before this date are archived.
+    - directory (str): The directory the archives are written to.
+
+    Returns:
+    - list[str]: The paths of the written archives.
+    """
+    paths = []
+    with connection.cursor() as cursor:
+        for month, name in sorted(_partitions(cursor).items()):
+            if _next_month(month) > before:
+                continue
+            path = os.path.join(directory, f'{name}.csv.gz')
+            try:
+                with transaction.atomic(), gzip.open(path, 'wt', newline='') as archive:
+                    cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+                    cursor.copy_expert(f'COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)', archive)
+                    cursor.execute(f'DROP TABLE {name}')
+            except Exception:
+                if os.path.exists(path):
+                    os.remove(path)
+                raise
+            paths.append(path)
+    return paths
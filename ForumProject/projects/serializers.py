@@ -7,21 +7,55 @@ model fields, validation methods, and methods for creating and updating instance
 
 Classes:
     ProjectSerializer: Serializer for the Project model.
+    ProjectSearchSerializer: Serializer for ranked and highlighted Project search results.
     ProjectFilesSerializer: Serializer for the ProjectFiles model.
+    UploadSessionSerializer: Serializer for the UploadSession model.
     InvestorProjectSerializer: Serializer for the InvestorProject model.
+    FollowedProjectSerializer: Serializer for followed projects with their project, startup and investor.
     ProjectLogSerializer: Serializer for the ProjectLog model.
 """
 
+import os
 from rest_framework import serializers
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, SuspiciousFileOperation
+from django.utils.html import escape
+from django.utils.text import get_valid_filename
 from startups.models import Startup
-from .models import Project, ProjectFiles, InvestorProject, ProjectLog
+from .models import Project, ProjectFiles, InvestorProject, ProjectLog, UploadSession
+from .delivery import SignedFilesMixin
+
+
+def query_param_list(request, name):
+    """
+    Return the comma-separated values of a query parameter as a set.
+    """
+    if request is None:
+        return set()
+    return {value.strip() for value in request.query_params.get(name, '').split(',') if value.strip()}
+
+
+def normalize_project_name(value):
+    """
+    Return a Project name with surrounding white space removed and the first letter capitalized.
+
+    Raises:
+        serializers.ValidationError: If the name is empty.
+    """
+    value = value.strip()
+    if not value:
+        raise serializers.ValidationError("Project name cannot be empty.")
+    return value[0].upper() + value[1:]
 
 
 class ProjectSerializer(serializers.ModelSerializer):
     """
     Serializer for the Project model.
 
+    Investor and share relations are summarized by `share_count` and `log_count`, which the
+    viewset annotates in the list query. The full `project_share` and `project_log` id lists are
+    included only when requested with `?expand=project_share,project_log`. Responses to GET
+    requests can be limited to a subset of fields with `?fields=id,name,...`.
+
     Attributes:
         id (int): The ID of the Project (read-only).
         name (str): The name of the Project.
@@ -35,9 +69,16 @@ class ProjectSerializer(serializers.ModelSerializer):
         duration (float): number of moonths which implementation of the Project is planned for.
         budget_currency (str): currency of the Project's budget
         budget_amount (int): amount of the Project's budget
+        budget_base_amount (int): the budget in the base currency (read-only).
+        share_count (int): number of investors following the Project (read-only).
+        log_count (int): number of log entries of the Project (read-only).
     """    
-    
+
+    EXPANDABLE_FIELDS = {'project_share', 'project_log'}
+
     startup = serializers.PrimaryKeyRelatedField(read_only=True)
+    share_count = serializers.SerializerMethodField()
+    log_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Project
@@ -52,6 +93,9 @@ class ProjectSerializer(serializers.ModelSerializer):
                   'duration',
                   'budget_currency',
                   'budget_amount',
+                  'budget_base_amount',
+                  'share_count',
+                  'log_count',
                   'project_share',
                   'project_log']
         read_only_fields = ['id',
@@ -60,7 +104,38 @@ class ProjectSerializer(serializers.ModelSerializer):
                             'updated_at',
                             'project_share',
                             'project_log']
-            
+
+    def __init__(self, *args, **kwargs):
+        """
+        Drop the relation lists that were not expanded and, for GET requests,
+        the fields that were not selected with `?fields=`.
+        """
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        expand = query_param_list(request, 'expand')
+        for field_name in self.EXPANDABLE_FIELDS - expand:
+            self.fields.pop(field_name)
+
+        selected = query_param_list(request, 'fields')
+        if selected and request.method == 'GET':
+            for field_name in set(self.fields) - selected - expand:
+                self.fields.pop(field_name)
+
+    def get_share_count(self, obj):
+        """
+        Return the annotated number of investors, counting them only for non-annotated instances.
+        """
+        count = getattr(obj, 'share_count', None)
+        return obj.project_share.count() if count is None else count
+
+    def get_log_count(self, obj):
+        """
+        Return the annotated number of log entries, counting them only for non-annotated instances.
+        """
+        count = getattr(obj, 'log_count', None)
+        return obj.project_log.count() if count is None else count
+
+
     def create(self, validated_data):
         """
         Create a new Project instance and associate it with a specific Startup.
@@ -149,10 +224,7 @@ class ProjectSerializer(serializers.ModelSerializer):
             Startup.
         """
         
-        value = value.strip()
-        value = value[0].upper() + value[1:]
-        if not value:
-            raise serializers.ValidationError("Project name cannot be empty.")
+        value = normalize_project_name(value)
         startup_id = self.context['request'].user.user_info.company_id
         if self.instance:
             if Project.objects.filter(
@@ -164,7 +236,38 @@ class ProjectSerializer(serializers.ModelSerializer):
         return value
     
 
-class ProjectFilesSerializer(serializers.ModelSerializer):
+# Marks matches in search headlines; the text is HTML-escaped before the marks become <b> tags
+HIGHLIGHT_START, HIGHLIGHT_STOP = '\x02', '\x03'
+
+
+class HighlightField(serializers.CharField):
+    """
+    Renders a search headline as HTML: the user-entered text is escaped and only the matches are
+    wrapped in <b> tags.
+    """
+    def to_representation(self, value):
+        return escape(value).replace(HIGHLIGHT_START, '<b>').replace(HIGHLIGHT_STOP, '</b>')
+
+
+class ProjectSearchSerializer(ProjectSerializer):
+    """
+    Serializer for Project search results.
+
+    Attributes:
+        rank (float): relevance of the Project to the search query (read-only).
+        name_highlight (str): the HTML-escaped name with matching words wrapped in <b> tags (read-only).
+        description_highlight (str): an HTML-escaped fragment of the description with matching words
+            wrapped in <b> tags (read-only).
+    """
+    rank = serializers.FloatField(read_only=True)
+    name_highlight = HighlightField(read_only=True)
+    description_highlight = HighlightField(read_only=True)
+
+    class Meta(ProjectSerializer.Meta):
+        fields = ProjectSerializer.Meta.fields + ['rank', 'name_highlight', 'description_highlight']
+
+
+class ProjectFilesSerializer(SignedFilesMixin, serializers.ModelSerializer):
     """
     Serializer for the ProjectFiles model.
 
@@ -175,12 +278,18 @@ class ProjectFilesSerializer(serializers.ModelSerializer):
         id (int): The unique identifier for the ProjectFile (read-only).
         project (Project): The related Project instance.
         file_description (str): A description for the file.
-        file (FileField): The uploaded file.
+        file (FileField): The uploaded file, represented by a signed download URL.
+        file_name (str): The original name of the file (read-only).
+        file_size (int): The size of the file in bytes (read-only).
+        sha256 (str): The hex SHA-256 digest of the file (read-only).
+        file_status (str): The result of the last integrity check: unchecked, ok, missing or corrupted (read-only).
+        checked_at (datetime): When the file was last checked (read-only).
     """
     class Meta:
         model = ProjectFiles
-        fields = ['id', 'project', 'file_description', 'file']
-        read_only_fields = ['id', 'project']
+        fields = ['id', 'project', 'file_description', 'file', 'file_name', 'file_size', 'sha256',
+                  'file_status', 'checked_at']
+        read_only_fields = ['id', 'project', 'file_name', 'file_size', 'sha256', 'file_status', 'checked_at']
 
     def validate_file_description(self, value):
         """
@@ -204,6 +313,50 @@ class ProjectFilesSerializer(serializers.ModelSerializer):
         return value
     
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the UploadSession model.
+
+    Attributes:
+        id (UUID): The ID of the session, used in the chunk and finalization URLs (read-only).
+        project (Project): The Project the file is uploaded to (read-only).
+        file_name (str): The name of the file, reduced to a safe base name.
+        file_description (str): A description for the file.
+        size (int): The size of the file in bytes.
+        offset (int): The number of bytes received so far (read-only).
+        expires_at (date-time): When the session expires unless another chunk arrives (read-only).
+    """
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'project', 'file_name', 'file_description', 'size', 'offset', 'expires_at']
+        read_only_fields = ['id', 'project', 'offset', 'expires_at']
+
+    def validate_file_name(self, value):
+        """
+        Strip directories and unsafe characters from the file name.
+        """
+        try:
+            return get_valid_filename(os.path.basename(value.replace('\\', '/')))
+        except SuspiciousFileOperation:
+            raise serializers.ValidationError("File name is not valid.")
+
+    def validate_file_description(self, value):
+        """
+        Validate the description for a Project file to ensure it is not empty.
+        """
+        if not value.strip():
+            raise serializers.ValidationError("File description cannot be empty.")
+        return value.strip()
+
+    def validate_size(self, value):
+        """
+        Validate that the file size is not negative.
+        """
+        if value < 0:
+            raise serializers.ValidationError("File size cannot be negative.")
+        return value
+
+
 class InvestorProjectSerializer(serializers.ModelSerializer):
     """
     Serializer for the InvestorProject model.
@@ -223,6 +376,41 @@ class InvestorProjectSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'investor', 'project', 'share']
 
 
+class FollowedProjectSerializer(serializers.ModelSerializer):
+    """
+    Serializer for followed projects, i.e. `InvestorProject` instances with the project, its startup
+    and the investor inlined, so clients do not fetch them one by one.
+
+    The related objects are read from `select_related`, see `views_follow.FollowedProjectListView`.
+
+    Attributes:
+        project (dict): The ID, name, status and allocated share of the project.
+        startup (dict): The ID and name of the startup of the project.
+        investor (dict): The ID and name of the investor.
+        updated_at (datetime): When the project was followed or the share last changed.
+    """
+    project = serializers.SerializerMethodField()
+    startup = serializers.SerializerMethodField()
+    investor = serializers.SerializerMethodField()
+
+    class Meta:
+        model = InvestorProject
+        fields = ['id', 'project', 'startup', 'investor', 'share', 'updated_at']
+        read_only_fields = fields
+
+    def get_project(self, obj):
+        project = obj.project
+        return {'id': project.pk, 'name': project.name, 'status': project.status,
+                'allocated_share': project.allocated_share}
+
+    def get_startup(self, obj):
+        startup = obj.project.startup
+        return {'id': startup.pk, 'startup_name': startup.startup_name}
+
+    def get_investor(self, obj):
+        return {'id': obj.investor.pk, 'investor_name': obj.investor.investor_name}
+
+
 class ProjectLogSerializer(serializers.ModelSerializer):
     """
     Serializer for the ProjectLog model.
@@ -240,6 +428,9 @@ class ProjectLogSerializer(serializers.ModelSerializer):
         action (str): The action performed on the project.
         previous_state (str): The previous state of the project or its components.
         modified_state (str): The new or modified state of the project or its components.
+        changes (dict): The changed fields as `{field: [old, new]}`, null for entries without a diff.
+
+    Project updates store only the diff; their textual states are rendered from it.
     """
     class Meta:
         model = ProjectLog
@@ -250,7 +441,8 @@ class ProjectLogSerializer(serializers.ModelSerializer):
                   'user_id',
                   'action',
                   'previous_state',
-                  'modified_state'
+                  'modified_state',
+                  'changes'
                   ]
         read_only_fields = ['id',
                             'project',
@@ -259,5 +451,13 @@ class ProjectLogSerializer(serializers.ModelSerializer):
                             'user_id',
                             'action',
                             'previous_state',
-                            'modified_state'
+                            'modified_state',
+                            'changes'
                             ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.changes and not (instance.previous_state or instance.modified_state):
+            data['previous_state'] = ', '.join(f'{field}: {old}' for field, (old, _) in instance.changes.items())
+            data['modified_state'] = ', '.join(f'{field}: {new}' for field, (_, new) in instance.changes.items())
+        return data
@@ -1,40 +1,57 @@
-from django.db.models.signals import post_save, post_delete
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from .models import Project, ProjectFiles, ProjectLog
-from users.models import UserRoleCompany
-from datetime import datetime
+from django.utils import timezone
+from investors.models import Investor
+from .models import Project, ProjectFiles, InvestorProject, FileBlob, ProjectLog
+from . import audit, cap_table, history
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_log(instance, action, previous_state, modified_state):
+_file_signals_muted = ContextVar('project_file_signals_muted', default=False)
+
+@contextmanager
+def mute_file_signals():
+    '''
+    Suppresses the per-row ProjectFiles receivers (log entries and blob references) in the current context.
+
+    Unlike disconnecting the receivers, this only affects the current thread or task, so concurrent
+    requests keep their signals. Bulk operations using it log and count references themselves,
+    see `projects.deletion`.
+    '''
+    token = _file_signals_muted.set(True)
+    try:
+        yield
+    finally:
+        _file_signals_muted.reset(token)
+
+def create_log(instance, action, previous_state, modified_state, changes=None):
     '''
-    Creates a log entry for a project action.
+    Records a log entry for a project action.
 
     Parameters:
-        instance (Project or ProjectFiles): The instance that triggered the log.
+        instance (Project): The instance that triggered the log.
         action (str): The action performed.
         previous_state (str): The state before the action.
         modified_state (str): The state after the action.
+        changes (dict): The changed fields as {field: [old, new]}, if any.
     '''
-    try:
-        ProjectLog.objects.create(
-            project=None if action == 'Deleted Project' else instance,
-            project_birth_id=instance.project.pk if action == 'Deleted File of Project' else instance.pk,
-            change_date=datetime.now().date(),
-            change_time=datetime.now().time(),
-            user_id=UserRoleCompany.objects.get(role='startup', company_id=instance.startup_id).user.pk,
-            startup_id=instance.startup_id,
-            action=action,
-            previous_state=previous_state[:255],
-            modified_state=modified_state[:255]
-        )
-    except:
-        logger.error(f'Error: Project log failed to be created on {datetime.now().date()} on {datetime.now().time()}')
+    audit.record(
+        project_id=None if action == 'Deleted Project' else instance.pk,
+        project_birth_id=instance.pk,
+        startup_id=instance.startup_id,
+        action=action,
+        previous_state=previous_state,
+        modified_state=modified_state,
+        changes=changes
+    )
 
 def create_file_handling_log(instance, action, previous_state, modified_state):
     '''
-    Creates a log entry for a project file action.
+    Records a log entry for a project file action.
 
     Parameters:
         instance (ProjectFiles): The project file instance that triggered the log.
@@ -42,20 +59,14 @@ def create_file_handling_log(instance, action, previous_state, modified_state):
         previous_state (str): The state before the action.
         modified_state (str): The state after the action.
     '''
-    try:
-        ProjectLog.objects.create(
-            project=instance.project,
-            project_birth_id=instance.project.pk,
-            change_date=datetime.now().date(),
-            change_time=datetime.now().time(),
-            user_id=UserRoleCompany.objects.get(role='startup', company_id=instance.project.startup_id).user.pk,
-            startup_id=instance.project.startup_id,
-            action=action,
-            previous_state=previous_state[:255],
-            modified_state=modified_state[:255]
-        )
-    except:
-        logger.error(f'Error: Project log failed to be created on {datetime.now().date()} on {datetime.now().time()}')
+    audit.record(
+        project_id=instance.project_id,
+        project_birth_id=instance.project_id,
+        startup_id=instance.project.startup_id,
+        action=action,
+        previous_state=previous_state,
+        modified_state=modified_state
+    )
 
 
 @receiver(post_save, sender=Project)
@@ -70,16 +81,11 @@ def create_update_project_log(sender, instance, created, **kwargs):
         **kwargs: Additional keyword arguments.
     '''
     if created:
-        action = 'Created Project'
-        previous_state = 'n/a'
-        modified_state = f'New Project, id: {instance.pk}, name: {instance.name}'
+        create_log(instance, history.CREATED_PROJECT_ACTION, 'n/a',
+                   f'New Project, id: {instance.pk}, name: {instance.name}', history.creation_diff(instance))
     else:
-        action = 'Updated Project'
-        changes = getattr(instance, '_changes', [])
-        previous_state = ', '.join([f'{field}: {old_value}' for field, old_value, _ in changes])
-        modified_state = ', '.join([f'{field}: {new_value}' for field, _, new_value in changes])
-
-    create_log(instance, action, previous_state, modified_state)
+        # The diff replaces the textual states, see ProjectLogSerializer
+        create_log(instance, history.UPDATED_PROJECT_ACTION, '', '', getattr(instance, '_changes', {}))
 
 @receiver(post_delete, sender=Project)
 def delete_project_log(sender, instance, **kwargs):
@@ -91,6 +97,11 @@ def delete_project_log(sender, instance, **kwargs):
         instance (Project): The instance of the Project model being deleted.
         **kwargs: Additional keyword arguments.
     '''
+    if instance.deleted_at is not None:
+        # Logged when it was soft-deleted, see projects.deletion
+        return
+    # Entries recorded while its related rows were deleted still link to it
+    ProjectLog.objects.filter(project_id=instance.pk).update(project=None)
     create_log(
         instance,
         'Deleted Project',
@@ -108,15 +119,17 @@ def create_update_project_file_log(sender, instance, created, **kwargs):
         created (bool): A boolean indicating whether a new record was created.
         **kwargs: Additional keyword arguments.
     '''
+    if _file_signals_muted.get():
+        return
     if created:
         action = 'Added File to Project'
         previous_state = 'n/a'
         modified_state = f'New File, id: {instance.pk}, description: {instance.file_description}'
     else:
         action = 'Updated File Description'
-        changes = getattr(instance, '_changes', [])
-        previous_state = ', '.join([f'{field}: {old_value}' for field, old_value, _ in changes])
-        modified_state = ', '.join([f'{field}: {new_value}' for field, _, new_value in changes])
+        changes = getattr(instance, '_changes', {})
+        previous_state = ', '.join([f'{field}: {old_value}' for field, (old_value, _) in changes.items()])
+        modified_state = ', '.join([f'{field}: {new_value}' for field, (_, new_value) in changes.items()])
 
     create_file_handling_log(instance, action, previous_state, modified_state)
 
@@ -130,6 +143,93 @@ def delete_project_file_log(sender, instance, **kwargs):
         instance (ProjectFiles): The instance of the ProjectFiles model being deleted.
         **kwargs: Additional keyword arguments.
     '''
+    if _file_signals_muted.get():
+        return
     previous_state = f'File ID: {instance.pk}, Description: {instance.file_description}'
     action = 'Deleted File of Project'
-    create_file_handling_log(instance, action, previous_state, 'n/a')
\ No newline at end of file
+    create_file_handling_log(instance, action, previous_state, 'n/a')
+
+@receiver(pre_delete, sender=InvestorProject)
+def lock_project_ledger(sender, instance, **kwargs):
+    '''
+    Locks the funding ledger of the project before one of its shares is deleted.
+
+    Deletions thereby lock the project before the share, in the order of `InvestorProject.allocate_share`,
+    whatever deletes the share (a delisting, a cascade or a purge).
+
+    Parameters:
+        sender (type): The model class sending the signal.
+        instance (InvestorProject): The instance of the InvestorProject model being deleted.
+        **kwargs: Additional keyword arguments.
+    '''
+    if instance.share:
+        list(Project.all_objects.select_for_update().filter(pk=instance.project_id).values_list('pk', flat=True))
+
+@receiver(post_delete, sender=InvestorProject)
+def release_investor_share(sender, instance, **kwargs):
+    '''
+    Returns the share of a removed investor to the project's funding ledger.
+
+    Parameters:
+        sender (type): The model class sending the signal.
+        instance (InvestorProject): The instance of the InvestorProject model being deleted.
+        **kwargs: Additional keyword arguments.
+    '''
+    if instance.share:
+        Project.objects.filter(pk=instance.project_id).update(
+            allocated_share=F('allocated_share') - instance.share, updated_at=timezone.now())
+
+@receiver(post_save, sender=InvestorProject)
+@receiver(post_delete, sender=InvestorProject)
+def invalidate_share_cap_table(sender, instance, **kwargs):
+    '''
+    Drops the cached cap table of the project whose share was added, changed or removed.
+    '''
+    cap_table.invalidate(instance.project_id)
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_project_cap_table(sender, instance, **kwargs):
+    '''
+    Drops the cached cap table of a renamed or deleted project.
+    '''
+    cap_table.invalidate(instance.pk)
+
+@receiver(post_save, sender=Investor)
+def invalidate_investor_cap_tables(sender, instance, created, **kwargs):
+    '''
+    Drops the cached cap tables listing an investor, whose name may have changed.
+    '''
+    if not created:
+        cap_table.invalidate(*InvestorProject.objects.filter(investor=instance).values_list('project_id', flat=True))
+
+@receiver(post_save, sender=ProjectFiles)
+def reference_file_blob(sender, instance, created, **kwargs):
+    '''
+    Counts a new project file as a reference to its blob.
+
+    Parameters:
+        sender (type): The model class sending the signal.
+        instance (ProjectFiles): The instance of the ProjectFiles model being saved.
+        created (bool): A boolean indicating whether a new record was created.
+        **kwargs: Additional keyword arguments.
+    '''
+    if _file_signals_muted.get():
+        return
+    if created and instance.blob_id:
+        FileBlob.objects.filter(pk=instance.blob_id).update(ref_count=F('ref_count') + 1)
+
+@receiver(post_delete, sender=ProjectFiles)
+def release_file_blob(sender, instance, **kwargs):
+    '''
+    Drops the reference of a removed project file to its blob.
+
+    Parameters:
+        sender (type): The model class sending the signal.
+        instance (ProjectFiles): The instance of the ProjectFiles model being deleted.
+        **kwargs: Additional keyword arguments.
+    '''
+    if _file_signals_muted.get():
+        return
+    if instance.blob_id:
+        FileBlob.objects.filter(pk=instance.blob_id).update(ref_count=F('ref_count') - 1)
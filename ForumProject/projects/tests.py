@@ -1,7 +1,28 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import uuid
+import zipfile
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlparse
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.urls import reverse
+from django.utils import timezone
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework.response import Response
@@ -9,8 +30,13 @@ from django.db import transaction
 import copy, random, string
 from users.models import UserRoleCompany, CustomUser, UserStartup, UserInvestor
 from startups.models import Startup
+from startups.serializers import StartupSerializer
 from investors.models import Investor
-from .models import Project, InvestorProject
+from subscriptions.models import SubscribeInvestorStartup
+from notifications.models import Notification, OutgoingEmail
+from .models import (CurrencyRate, Project, FileBlob, ProjectFiles, InvestorProject, OversubscriptionError,
+                     ProjectLog, UploadSession)
+from . import archives, audit, blobs, budgets, bulk, deletion, history, integrity, partitions, uploads
 
 
 class ProjectsTestCase(TestCase):
@@ -204,11 +230,13 @@ class ProjectsTestCase(TestCase):
             'budget_currency': 'UAH',
             'budget_amount': 9000
         }
-        cls.project_create_response = cls.visit_endpoint(
-            'projects:project-list',
-            cls.tokens[cls.user_startuper.email],
-            data=cls.project_test_data
-        )
+        # Project log entries are written when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.project_create_response = cls.visit_endpoint(
+                'projects:project-list',
+                cls.tokens[cls.user_startuper.email],
+                data=cls.project_test_data
+            )
         cls.project = Project.objects.first()
         cls.project_test = cls.project
 
@@ -288,11 +316,11 @@ class ProjectsTestCase(TestCase):
         fields = ['name', 'description', 'duration', 'budget_amount']
         project = copy.deepcopy(self.project_test_data)
         project['name'] = 'Second Project'
-        self.visit_endpoint(
+        second_project_id = self.visit_endpoint(
             'projects:project-list',
             self.tokens[self.user_startuper.email],
             data=project
-        )
+        ).data['id']
         self.assertEqual(Project.objects.count(), 2)
         for field in fields:
             suffix = '1' if isinstance(project[field], str) else 1
@@ -302,7 +330,7 @@ class ProjectsTestCase(TestCase):
                 self.tokens[self.user_startuper.email],
                 'PUT',
                 project,
-                kwargs=2
+                kwargs=second_project_id
             )
             self.assertEqual(response.status_code, status.HTTP_200_OK)
 
@@ -351,7 +379,7 @@ class ProjectsTestCase(TestCase):
                 token = str(refresh.access_token)
             if i == 2:
                 UserRoleCompany.objects.create(user=user_alien, role='startup')
-            response = self.visit_endpoint('projects:project-detail', token, 'GET', kwargs=1)
+            response = self.visit_endpoint('projects:project-detail', token, 'GET', kwargs=self.project.pk)
             if i:
                 self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
             else:
@@ -549,3 +577,1272 @@ class ProjectsTestCase(TestCase):
             kwargs=self.project_create_response.data['id']
         )
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    # Group of tests regarding the Project list representation
+    def list_projects(self, token, **params):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
+        return client.get(reverse('projects:project-list'), params)
+
+    def test_ok_list_constant_queries(self):
+        token = self.tokens[self.user_investor.email]
+        with self.assertNumQueries(4):
+            self.list_projects(token, page=1)
+        Project.objects.bulk_create([
+            Project(name=f'Project {i}', startup=self.startup_test, description='Description')
+            for i in range(5)
+        ])
+        InvestorProject.objects.create(investor=self.investor_test, project=self.project, share=10)
+        with self.assertNumQueries(4):
+            response = self.list_projects(token, page=1)
+        self.assertEqual(response.data['count'], 6)
+        listed = {project['id']: project for project in response.data['results']}
+        self.assertEqual(listed[self.project.pk]['share_count'], 1)
+        self.assertNotIn('project_share', listed[self.project.pk])
+        self.assertNotIn('project_log', listed[self.project.pk])
+
+    def test_ok_list_is_paginated_only_on_request(self):
+        Project.objects.bulk_create([
+            Project(name=f'Project {i}', startup=self.startup_test, description='Description')
+            for i in range(11)
+        ])
+        token = self.tokens[self.user_investor.email]
+        response = self.list_projects(token)
+        self.assertEqual(len(response.data), 12)
+        response = self.list_projects(token, page=2)
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.list_projects(token, page_size=5)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_ok_list_sparse_fieldsets_and_expand(self):
+        InvestorProject.objects.create(investor=self.investor_test, project=self.project, share=10)
+        response = self.list_projects(self.tokens[self.user_investor.email],
+                                      fields='id,name', expand='project_share')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0], {
+            'id': self.project.pk,
+            'name': self.project.name,
+            'project_share': [self.project.project_share.get().pk],
+        })
+
+    def test_ok_list_expand_with_spaces_prefetches_relations(self):
+        for number in range(3):
+            project = Project.objects.create(name=f'Expanded {number}', startup=self.startup_test)
+            InvestorProject.objects.create(investor=self.investor_test, project=project, share=10)
+        token = self.tokens[self.user_investor.email]
+        # The count, the page and one query per expanded relation, whatever the number of projects
+        with self.assertNumQueries(6):
+            response = self.list_projects(token, expand='project_share, project_log', page=1)
+        self.assertIn('project_log', response.data['results'][0])
+
+    # Group of tests regarding Project search
+    def search_projects(self, token, **params):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
+        return client.get(reverse('projects:project-search'), params)
+
+    def test_ok_search_ranked_and_highlighted(self):
+        Project.objects.create(name='Payments gateway', startup=self.startup_test,
+                               description='Instant payments for small shops')
+        Project.objects.create(name='Delivery robots', startup=self.startup_test,
+                               description='Robots that accept card payments')
+        response = self.search_projects(self.tokens[self.user_investor.email], q='payments')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([project['name'] for project in results], ['Payments gateway', 'Delivery robots'])
+        self.assertEqual(results[0]['name_highlight'], '<b>Payments</b> gateway')
+        self.assertIn('<b>payments</b>', results[1]['description_highlight'])
+
+    def test_ok_search_highlights_escape_markup(self):
+        Project.objects.create(name='<i>Payments</i>', startup=self.startup_test,
+                               description='<img src=x onerror=alert(1)> payments')
+        response = self.search_projects(self.tokens[self.user_investor.email], q='payments')
+        result = response.data['results'][0]
+        self.assertEqual(result['name_highlight'], '&lt;i&gt;<b>Payments</b>&lt;/i&gt;')
+        self.assertTrue(result['description_highlight'].endswith('&gt; <b>payments</b>'))
+        for highlight in (result['name_highlight'], result['description_highlight']):
+            self.assertNotRegex(highlight.replace('<b>', '').replace('</b>', ''), '[<>]')
+
+    def test_ok_search_pages_tied_ranks_without_gaps(self):
+        ids = {Project.objects.create(name=f'Payments {number}', startup=self.startup_test).pk
+               for number in range(7)}
+        token = self.tokens[self.user_investor.email]
+        seen, params = [], {'q': 'payments', 'page_size': 3}
+        while True:
+            response = self.search_projects(token, **params)
+            seen += [project['id'] for project in response.data['results']]
+            if not response.data['next']:
+                break
+            params['cursor'] = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+        self.assertEqual(sorted(seen), sorted(ids))
+
+    def test_ok_search_matches_startup_and_follows_renames(self):
+        token = self.tokens[self.user_investor.email]
+        self.startup_test.startup_industry = 'Aerospace'
+        self.startup_test.save()
+        response = self.search_projects(token, q='aerospace')
+        self.assertEqual([project['id'] for project in response.data['results']], [self.project.pk])
+
+    def test_ok_search_vector_is_rebuilt_only_when_its_columns_change(self):
+        def search_vector():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT search_vector::text FROM projects_project WHERE id = %s', [self.project.pk])
+                return cursor.fetchone()[0]
+
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE projects_project SET search_vector = 'stale' WHERE id = %s", [self.project.pk])
+        Project.objects.filter(pk=self.project.pk).update(allocated_share=10, updated_at=timezone.now())
+        self.assertEqual(search_vector(), "'stale'")
+        Project.objects.filter(pk=self.project.pk).update(name='Renamed')
+        self.assertIn("'renam':1A", search_vector())
+
+    def test_fail_search_without_query(self):
+        response = self.search_projects(self.tokens[self.user_investor.email])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Group of tests regarding the funding ledger
+    def test_ok_ledger_follows_subscriptions(self):
+        for investor, share in ((self.user_investor, 30), (self.user_investor2, 50), (self.user_investor, 10)):
+            self.visit_endpoint('projects:subscription', self.tokens[investor.email],
+                                kwargs={'project_id': self.project.pk, 'share': share})
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.allocated_share, 60)
+        self.assertEqual(InvestorProject.get_total_funding(self.project.pk), 60.0)
+
+        self.follow_or_subscribe(self.user_investor2, {'project_id': self.project.pk}, 'delist_project')
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.allocated_share, 10)
+
+    def test_ok_project_update_keeps_ledger(self):
+        InvestorProject.allocate_share(self.project.pk, self.investor_test.pk, 25)
+        self.project.description = 'Stale instance saved after the allocation'
+        self.project.save()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.allocated_share, 25)
+
+
+STARTUP_DETAILS = {'startup_industry': 'IT', 'startup_phone': '+380987654321', 'startup_country': 'UA',
+                   'startup_city': 'Lviv', 'startup_address': 'Sirka 56'}
+INVESTOR_DETAILS = {'investor_industry': 'IT', 'investor_phone': '+380448889900', 'investor_country': 'UA',
+                    'investor_city': 'Odessa', 'investor_address': 'Stusya 11'}
+
+
+def create_startup(name):
+    """
+    Creates a startup with the contact details shared by the tests.
+    """
+    return Startup.objects.create(startup_name=name, **STARTUP_DETAILS)
+
+
+def create_investor(name):
+    """
+    Creates an investor with the contact details shared by the tests.
+    """
+    return Investor.objects.create(investor_name=name, **INVESTOR_DETAILS)
+
+
+def create_member(email, company, role='startup', link=False):
+    """
+    Creates a user acting for the company in the given role.
+
+    Args:
+        email (str): The email of the user.
+        company (Startup | Investor): The selected company of the user.
+        role (str): 'startup' or 'investor'.
+        link (bool): Whether the user is also made a member of the company.
+
+    Returns:
+        CustomUser: The created user object.
+    """
+    user = CustomUser.objects.create_user(email=email, password='Pa88word_')
+    UserRoleCompany.objects.create(user=user, role=role, company_id=company.pk)
+    if link and role == 'startup':
+        UserStartup.objects.create(customuser=user, startup=company, startup_role_id=1)
+    elif link:
+        UserInvestor.objects.create(customuser=user, investor=company, investor_role_id=1)
+    return user
+
+
+def authenticated_client(user):
+    """
+    Returns an API client that sends its requests as the user.
+    """
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def use_temporary_media(test_case):
+    """
+    Stores the files of a test in a temporary directory.
+    """
+    directory = test_case.enterContext(tempfile.TemporaryDirectory())
+    test_case.enterContext(override_settings(MEDIA_ROOT=directory))
+    cwd = os.getcwd()
+    os.chdir(directory)
+    test_case.addCleanup(os.chdir, cwd)
+
+
+class ResumableUploadTestCase(TestCase):
+    """
+    Tests of resumable chunked uploads of project files.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup = create_startup('Uploads')
+        cls.project = Project.objects.create(name='Video', startup=cls.startup, description='Pitch')
+        cls.user = create_member('owner@uploads.com', cls.startup)
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = authenticated_client(self.user)
+        self.content = os.urandom(3000)
+
+    def open_session(self, size=3000):
+        return self.client.post(reverse('projects:upload_sessions', args=[self.project.pk]),
+                                {'file_name': '../pitch video.mp4', 'file_description': 'Pitch video',
+                                 'size': size}, format='json')
+
+    def put_chunk(self, session_id, start, chunk, size=3000):
+        return self.client.put(reverse('projects:upload_session', args=[self.project.pk, session_id]),
+                               chunk, content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=f'bytes {start}-{start + len(chunk) - 1}/{size}')
+
+    def test_ok_upload_resumes_and_finalizes_into_project_file(self):
+        session_id = self.open_session().data['id']
+        url = reverse('projects:upload_session', args=[self.project.pk, session_id])
+
+        self.assertEqual(self.put_chunk(session_id, 0, self.content[:1000]).data['offset'], 1000)
+        response = self.put_chunk(session_id, 2000, self.content[2000:])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.head(url)['Upload-Offset'], '1000')
+        self.assertEqual(self.put_chunk(session_id, 1000, self.content[1000:]).data['offset'], 3000)
+
+        response = self.client.post(
+            reverse('projects:finalize_upload', args=[self.project.pk, session_id]),
+            {'sha256': hashlib.sha256(self.content).hexdigest()}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        project_file = ProjectFiles.objects.get(pk=response.data['id'])
+        self.assertEqual(project_file.file_name, 'pitch_video.mp4')
+        self.assertEqual((project_file.file_size, project_file.sha256),
+                         (3000, hashlib.sha256(self.content).hexdigest()))
+        with project_file.file.open('rb') as uploaded:
+            self.assertEqual(uploaded.read(), self.content)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_interrupted_chunk_keeps_received_bytes(self):
+        session = UploadSession.objects.get(pk=self.open_session().data['id'])
+
+        class DroppedConnection(io.BytesIO):
+            def read(self, size=-1):
+                if self.tell() >= 1500:
+                    raise OSError('Connection reset')
+                return super().read(min(size, 500))
+
+        with self.assertRaises(OSError):
+            uploads.write_chunk(session, 0, 3000, DroppedConnection(self.content))
+
+        session.refresh_from_db()
+        self.assertEqual(session.offset, 1500)
+
+    def test_fail_incomplete_or_corrupted_upload(self):
+        session_id = self.open_session().data['id']
+        url = reverse('projects:finalize_upload', args=[self.project.pk, session_id])
+        self.put_chunk(session_id, 0, self.content[:1000])
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_409_CONFLICT)
+
+        self.put_chunk(session_id, 1000, self.content[1000:])
+        response = self.client.post(url, {'sha256': '0' * 64}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(ProjectFiles.objects.exists())
+
+    def test_fail_chunk_or_finalize_of_finalized_session(self):
+        session_id = self.open_session().data['id']
+        self.put_chunk(session_id, 0, self.content)
+        stale = UploadSession.objects.get(pk=session_id)
+        url = reverse('projects:finalize_upload', args=[self.project.pk, session_id])
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_201_CREATED)
+
+        with self.assertRaises(uploads.SessionClosedError):
+            uploads.finalize_session(stale)
+        with self.assertRaises(uploads.SessionClosedError):
+            uploads.write_chunk(stale, 3000, 0, io.BytesIO())
+        self.assertEqual(ProjectFiles.objects.count(), 1)
+
+    @override_settings(STARTUP_STORAGE_QUOTA=5000)
+    def test_fail_upload_over_startup_quota(self):
+        self.assertEqual(self.open_session().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.open_session().status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        UploadSession.objects.update(expires_at=timezone.now())
+        self.assertEqual(self.open_session().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(uploads.purge_expired_sessions(), 1)
+
+
+class ContentAddressedFilesTestCase(TestCase):
+    """
+    Tests of the deduplicated, reference-counted storage of project files.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup = create_startup('Blobs')
+        cls.projects = [Project.objects.create(name=f'Deck {number}', startup=cls.startup, description='Deck')
+                        for number in range(2)]
+        cls.user = create_member('owner@blobs.com', cls.startup)
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = authenticated_client(self.user)
+        self.content = os.urandom(2000)
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+
+    def upload(self, project):
+        return self.client.post(
+            reverse('projects:project_files_by_project', args=[project.pk]),
+            {'file': SimpleUploadedFile('deck.pdf', self.content), 'file_description': 'Deck'},
+            format='multipart')
+
+    def test_duplicate_uploads_share_one_blob(self):
+        responses = [self.upload(project) for project in self.projects]
+
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_201_CREATED] * 2)
+        blob = FileBlob.objects.get()
+        self.assertEqual((blob.sha256, blob.ref_count), (self.sha256, 2))
+        blob_path = os.path.join('media', 'blobs', self.sha256[:2], self.sha256[2:4], self.sha256)
+        self.assertEqual(set(ProjectFiles.objects.values_list('file', flat=True)), {blob_path})
+        self.assertEqual(os.listdir(os.path.dirname(blob_path)), [self.sha256])
+        self.assertEqual(responses[0].data['file_name'], 'deck.pdf')
+
+    def test_unreferenced_blobs_are_collected(self):
+        first, second = [self.upload(project).data['id'] for project in self.projects]
+        path = default_storage.path(FileBlob.storage_name(self.sha256))
+
+        self.client.delete(reverse('projects:project_file', args=[self.projects[0].pk, first]))
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+        self.assertEqual(blobs.collect_garbage(), 0)
+
+        self.client.delete(reverse('projects:project_files_by_project', args=[self.projects[1].pk]))
+        self.assertEqual(FileBlob.objects.get().ref_count, 0)
+        self.assertTrue(os.path.exists(path))
+
+        self.assertEqual(blobs.collect_garbage(), 1)
+        self.assertFalse(FileBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_upload_restores_the_content_of_an_unreferenced_blob(self):
+        first = self.upload(self.projects[0]).data['id']
+        self.client.delete(reverse('projects:project_file', args=[self.projects[0].pk, first]))
+        path = default_storage.path(FileBlob.storage_name(self.sha256))
+        # A collection interrupted after removing the content leaves the row behind
+        os.remove(path)
+
+        self.assertEqual(self.upload(self.projects[1]).status_code, status.HTTP_201_CREATED)
+        with open(path, 'rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+        self.assertEqual(os.listdir(default_storage.path(blobs.BLOB_ROOT)), [self.sha256[:2]])
+
+    def test_resumable_upload_of_stored_content_only_adds_a_reference(self):
+        self.upload(self.projects[0])
+        session = uploads.open_session(self.projects[1], 'deck.pdf', 'Deck', len(self.content))
+        uploads.write_chunk(session, 0, len(self.content), io.BytesIO(self.content))
+
+        project_file = uploads.finalize_session(session)
+
+        self.assertEqual(project_file.blob_id, self.sha256)
+        self.assertEqual(FileBlob.objects.get().ref_count, 2)
+        self.assertFalse(os.path.exists(default_storage.path(session.staged_name)))
+
+    def test_archive_streams_all_project_files(self):
+        other = os.urandom(3000)
+        self.upload(self.projects[0])
+        self.upload(self.projects[0])
+        self.client.post(reverse('projects:project_files_by_project', args=[self.projects[0].pk]),
+                         {'file': SimpleUploadedFile('notes.txt', other), 'file_description': 'Notes'},
+                         format='multipart')
+
+        with mock.patch.object(archives, 'BLOCK_SIZE', 512):
+            response = self.client.get(reverse('projects:project_files_archive', args=[self.projects[0].pk]))
+            chunks = list(response.streaming_content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(response['Accept-Ranges'], 'none')
+        self.assertLessEqual(max(len(chunk) for chunk in chunks), 512 + 100)
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            self.assertEqual(archive.namelist(), ['deck.pdf', 'deck_1.pdf', 'notes.txt'])
+            self.assertEqual([entry.compress_type for entry in archive.infolist()], [zipfile.ZIP_STORED] * 3)
+            self.assertEqual(archive.read('deck_1.pdf'), self.content)
+            self.assertEqual(archive.read('notes.txt'), other)
+
+    def test_archive_is_available_to_following_investors_only(self):
+        self.upload(self.projects[0])
+        investor = create_investor('Diligent Fund')
+        client = authenticated_client(create_member('fund@blobs.com', investor, role='investor'))
+        url = reverse('projects:project_files_archive', args=[self.projects[0].pk])
+
+        self.assertEqual(client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        InvestorProject.objects.create(investor=investor, project=self.projects[0], share=10)
+        response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(archive.read('deck.pdf'), self.content)
+
+
+class BulkFileDeletionTestCase(TestCase):
+    """
+    Tests of deleting many project files at once.
+    """
+
+    FIXTURE_ACTIONS = ['Created Project', 'Added File to Project']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup = create_startup('Deletion')
+        cls.project = Project.objects.create(name='Archive', startup=cls.startup, description='Files')
+        cls.user = create_member('owner@deletion.com', cls.startup)
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = authenticated_client(self.user)
+        # Files stored before content-addressed storage, and two references to one blob
+        self.own_files = [ProjectFiles.objects.create(project=self.project, file_description=f'Page {number}',
+                                                      file=SimpleUploadedFile(f'page_{number}.pdf', b'page'))
+                          for number in range(20)]
+        for _ in range(2):
+            self.client.post(reverse('projects:project_files_by_project', args=[self.project.pk]),
+                             {'file': SimpleUploadedFile('deck.pdf', b'deck'), 'file_description': 'Deck'},
+                             format='multipart')
+
+    def test_delete_project_removes_files_with_one_log_entry(self):
+        paths = [project_file.file.path for project_file in self.own_files]
+        project_id = self.project.pk
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('projects:project-detail', args=[project_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Project.objects.filter(pk=project_id).exists())
+        self.assertEqual(ProjectFiles.objects.count(), 22)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(deletion.purge_deleted(batch_size=8), {'projects': 1, 'startups': 0})
+
+        self.assertFalse(Project.all_objects.filter(pk=project_id).exists())
+        self.assertFalse(ProjectFiles.objects.exists())
+        self.assertFalse([path for path in paths if os.path.exists(path)])
+        self.assertEqual(FileBlob.objects.get().ref_count, 0)
+        # Besides the entries of the fixture
+        logs = ProjectLog.objects.filter(project_birth_id=project_id).exclude(action__in=self.FIXTURE_ACTIONS)
+        self.assertEqual(list(logs.values_list('action', flat=True)), ['Deleted Project'])
+
+    def test_delete_project_files_with_one_log_entry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('projects:project_file', args=[self.project.pk, self.own_files[0].pk]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('projects:project_files_by_project', args=[self.project.pk]))
+
+        self.assertFalse(ProjectFiles.objects.exists())
+        self.assertFalse(os.path.exists(self.own_files[1].file.path))
+        self.assertEqual(FileBlob.objects.get().ref_count, 0)
+        logs = ProjectLog.objects.filter(project_birth_id=self.project.pk).exclude(
+            action__in=self.FIXTURE_ACTIONS).order_by('id')
+        self.assertEqual([(log.action, log.previous_state.split(',')[0]) for log in logs],
+                         [('Deleted File of Project', f'File ID: {self.own_files[0].pk}'),
+                          ('Deleted Files of Project', '21 files')])
+
+
+class SoftDeletionTestCase(TestCase):
+    """
+    Tests of hiding deleted startups and projects and purging them later.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup = create_startup('Closing')
+        cls.project = Project.objects.create(name='Wind-down', startup=cls.startup, status='closed')
+        cls.investor = create_investor('Patient fund')
+        InvestorProject.allocate_share(cls.project.pk, cls.investor.pk, 10)
+        SubscribeInvestorStartup.objects.create(investor=cls.investor, startup=cls.startup)
+        cls.user = create_member('owner@closing.com', cls.startup, link=True)
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.project_file = ProjectFiles.objects.create(project=self.project, file_description='Report',
+                                                        file=SimpleUploadedFile('report.pdf', b'report'))
+        self.client = authenticated_client(self.user)
+
+    def test_deleted_startup_is_hidden_and_its_name_reusable(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('startups:startup-detail', args=[self.startup.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Startup.objects.filter(pk=self.startup.pk).exists())
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+        self.assertEqual(self.client.get(reverse('projects:project-detail', args=[self.project.pk])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertTrue(os.path.exists(self.project_file.file.path))
+        create_startup('Closing')
+
+    def test_purge_removes_rows_and_files_in_chunks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('startups:startup-detail', args=[self.startup.pk]))
+        path = self.project_file.file.path
+        Notification.objects.bulk_create([
+            Notification(project=self.project, startup=self.startup, investor=self.investor,
+                         trigger='Project profile changed', initiator='project')
+            for _ in range(3)])
+        notifications = set(Notification.objects.values_list('pk', flat=True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            output = io.StringIO()
+            with CaptureQueriesContext(connection) as queries:
+                call_command('purge_deleted', '--batch-size', '1', stdout=output)
+
+        self.assertEqual(output.getvalue().strip(), '1 project(s) and 1 startup(s) purged.')
+        self.assertFalse(Startup.all_objects.exists())
+        self.assertFalse(InvestorProject.objects.exists())
+        self.assertFalse(SubscribeInvestorStartup.objects.exists())
+        self.assertFalse(UserStartup.objects.exists())
+        self.assertFalse(os.path.exists(path))
+        # Notifications are unlinked one chunk at a time, none by the final deletes
+        unlinked = set(Notification.objects.filter(project=None, startup=None).values_list('pk', flat=True))
+        self.assertLessEqual(notifications, unlinked)
+        self.assertEqual(unlinked, set(Notification.objects.values_list('pk', flat=True)))
+        unlinks = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE "notifications_notification"')]
+        self.assertEqual(len(unlinks), 2 * len(unlinked))
+        self.assertTrue(all('IN (' in sql for sql in unlinks))
+        logs = ProjectLog.objects.filter(project_birth_id=self.project.pk, action='Deleted Project')
+        self.assertEqual([log.project_id for log in logs], [None])
+
+
+class BulkProjectUpdateTestCase(TestCase):
+    """
+    Tests of updating several projects in one request.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup = create_startup('Round')
+        cls.projects = [Project.objects.create(name=f'Project {number}', startup=cls.startup, description='Round')
+                        for number in range(3)]
+        cls.investor = create_investor('Follower')
+        create_member('fund@round.com', cls.investor, role='investor', link=True)
+        for project in cls.projects[:2]:
+            InvestorProject.objects.create(investor=cls.investor, project=project, share=0)
+        cls.user = create_member('owner@round.com', cls.startup)
+        cls.url = reverse('projects:project-bulk-update')
+
+    def setUp(self):
+        self.client = authenticated_client(self.user)
+
+    def test_batch_is_applied_with_one_log_entry_per_project_and_one_notification(self):
+        items = [{'id': project.pk, 'status': 'closed'} for project in self.projects]
+        items[2]['name'] = '  renamed'
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.url, {'projects': items}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data['updated']), [project.pk for project in self.projects])
+        self.assertEqual(list(Project.objects.order_by('pk').values_list('status', 'name')),
+                         [('closed', 'Project 0'), ('closed', 'Project 1'), ('closed', 'Renamed')])
+        logs = ProjectLog.objects.filter(action='Updated Project').order_by('project_birth_id')
+        self.assertEqual([log.changes for log in logs],
+                         [{'status': ['open', 'closed']}] * 2 + [{'name': ['Project 2', 'Renamed'],
+                                                                  'status': ['open', 'closed']}])
+        notification = Notification.objects.get(investor=self.investor, trigger='Project profile changed')
+        self.assertIsNone(notification.project)
+        email = OutgoingEmail.objects.get(subject__startswith='Update on 2 Projects')
+        self.assertEqual(email.subject, 'Update on 2 Projects of Startup Round')
+        self.assertEqual(email.recipients, ['fund@round.com'])
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            bulk.update_projects(self.startup.pk, [{'id': project.pk, 'duration': 6} for project in self.projects])
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if query['sql'].startswith('INSERT INTO "projects_projectlog')]), 1)
+        self.assertEqual(ProjectLog.objects.filter(changes={'duration': [None, 6.0]}).count(), 3)
+
+    def test_fail_invalid_item_updates_nothing(self):
+        other = Project.objects.create(name='Other', startup=create_startup('Other'))
+        items = [{'id': self.projects[0].pk, 'status': 'closed'},
+                 {'id': self.projects[1].pk, 'status': 'archived'},
+                 {'id': self.projects[2].pk, 'name': 'Project 0'},
+                 {'id': other.pk, 'status': 'closed'}]
+
+        response = self.client.patch(self.url, {'projects': items}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(sorted(response.data['errors']), [1, 2, 3])
+        self.assertFalse(Project.objects.filter(status='closed').exists())
+        self.assertEqual(self.client.patch(self.url, {'projects': []}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.patch(self.url, items, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class BatchUploadTestCase(TestCase):
+    """
+    Tests of uploading several project files in one request.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup = create_startup('Batches')
+        cls.project = Project.objects.create(name='Data room', startup=cls.startup, description='Files')
+        cls.user = create_member('owner@batches.com', cls.startup)
+        cls.url = reverse('projects:upload_files_batch', args=[cls.project.pk])
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = authenticated_client(self.user)
+        self.contents = [os.urandom(1000), os.urandom(1000), b'shared', b'shared']
+
+    def upload(self, descriptions):
+        files = [SimpleUploadedFile(f'doc_{index}.pdf', content) for index, content in enumerate(self.contents)]
+        return self.client.post(self.url, {'files': files, 'file_descriptions': descriptions}, format='multipart')
+
+    def test_batch_is_saved_with_one_log_entry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.upload(['Plan', 'Budget', 'Team', 'Team copy'])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([result['status'] for result in response.data['results']], ['created'] * 4)
+        project_files = ProjectFiles.objects.filter(project=self.project).order_by('id')
+        self.assertEqual([f.file_name for f in project_files], ['doc_0.pdf', 'doc_1.pdf', 'doc_2.pdf', 'doc_3.pdf'])
+        for project_file, content in zip(project_files, self.contents):
+            with project_file.file.open('rb') as stored:
+                self.assertEqual(stored.read(), content)
+        self.assertEqual(FileBlob.objects.get(pk=hashlib.sha256(b'shared').hexdigest()).ref_count, 2)
+        logs = ProjectLog.objects.filter(project_birth_id=self.project.pk).exclude(action='Created Project')
+        self.assertEqual(list(logs.values_list('action', flat=True)), ['Added Files to Project'])
+        self.assertEqual([name for name in os.listdir(default_storage.path('media/blobs')) if name.startswith('.')], [])
+
+    def test_fail_batch_with_invalid_file_saves_nothing(self):
+        response = self.upload(['Plan', ' ', 'Team', 'Team copy'])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['not saved', 'failed', 'not saved', 'not saved'])
+        self.assertFalse(ProjectFiles.objects.exists())
+        self.assertFalse(FileBlob.objects.exists())
+
+    @override_settings(STARTUP_STORAGE_QUOTA=1500)
+    def test_fail_batch_over_quota_removes_staged_files(self):
+        response = self.upload(['Plan', 'Budget', 'Team', 'Team copy'])
+
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(ProjectFiles.objects.exists())
+        self.assertEqual(os.listdir(default_storage.path('media/blobs')), [])
+
+
+class FollowedProjectsTestCase(TestCase):
+    """
+    Tests of the paginated list of followed projects.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup = create_startup('Followed')
+        cls.investors = [create_investor(f'Fund {number}') for number in range(30)]
+        cls.open_project = Project.objects.create(name='Open', startup=cls.startup)
+        cls.closed_project = Project.objects.create(name='Closed', startup=cls.startup, status='closed')
+        InvestorProject.objects.bulk_create(
+            [InvestorProject(investor=investor, project=cls.open_project, share=1) for investor in cls.investors]
+            + [InvestorProject(investor=cls.investors[0], project=cls.closed_project, share=5)])
+        cls.startup_user = create_member('owner@followed.com', cls.startup)
+        cls.investor_user = create_member('fund@followed.com', cls.investors[0], role='investor')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('projects:view_followed_projects')
+
+    def test_startup_pages_followers_in_constant_queries(self):
+        self.client.force_authenticate(self.startup_user)
+
+        # The count and the page with its related objects
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'page_size': 25})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 31)
+        self.assertEqual(len(response.data['results']), 25)
+        follow = response.data['results'][0]
+        self.assertEqual(follow['startup'], {'id': self.startup.pk, 'startup_name': 'Followed'})
+        self.assertEqual(set(follow['project']), {'id', 'name', 'status', 'allocated_share'})
+        self.assertIn('investor_name', follow['investor'])
+
+    def test_investor_filters_by_share_and_status_and_orders(self):
+        self.client.force_authenticate(self.investor_user)
+
+        response = self.client.get(self.url, {'ordering': '-share'})
+        self.assertEqual([follow['share'] for follow in response.data['results']], [5, 1])
+
+        response = self.client.get(self.url, {'share_min': 2, 'status': 'closed'})
+        self.assertEqual([follow['project']['name'] for follow in response.data['results']], ['Closed'])
+
+        response = self.client.get(self.url, {'status': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProjectBudgetTestCase(TestCase):
+    """
+    Tests of the base-currency budgets and the range screening of projects.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        CurrencyRate.objects.update_or_create(currency='USD', defaults={'rate': 1})
+        CurrencyRate.objects.create(currency='EUR', rate='1.1')
+        cls.startup = create_startup('Budgets')
+        cls.dollars = Project.objects.create(name='Dollars', startup=cls.startup, budget_currency='USD',
+                                             budget_amount=1000, duration=6)
+        cls.euros = Project.objects.create(name='Euros', startup=cls.startup, budget_currency='eur',
+                                           budget_amount=2000, duration=12, status='closed')
+        cls.hryvnias = Project.objects.create(name='Hryvnias', startup=cls.startup, budget_currency='UAH',
+                                              budget_amount=50000, duration=3)
+        cls.investor_user = create_member('fund@budgets.com', create_investor('Screening Fund'), role='investor')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_budget_is_normalized_on_write(self):
+        self.assertEqual(self.dollars.budget_base_amount, 1000)
+        self.assertEqual(self.euros.budget_base_amount, 2200)
+        self.assertIsNone(self.hryvnias.budget_base_amount)
+
+        self.euros.budget_amount = 3000
+        self.euros.save()
+        self.assertEqual(self.euros.budget_base_amount, 3300)
+        # With the rate cached, neither the rate nor the converted amount is read from the database
+        self.euros.budget_amount = 3001
+        with CaptureQueriesContext(connection) as queries:
+            self.euros.save()
+        self.assertEqual(self.euros.budget_base_amount, 3301)
+        self.assertEqual(Project.objects.get(pk=self.euros.pk).budget_base_amount, 3301)
+        self.assertFalse([query for query in queries.captured_queries
+                          if query['sql'].startswith(('SELECT "projects_currencyrate"', 'SELECT "projects_project"'))])
+        Project.objects.filter(pk=self.dollars.pk).update(budget_currency='EUR')
+        self.assertEqual(Project.objects.get(pk=self.dollars.pk).budget_base_amount, 1100)
+
+    def test_bulk_update_converts_the_budget(self):
+        changed = bulk.update_projects(self.startup.pk, [
+            {'id': self.dollars.pk, 'budget_currency': 'EUR'},
+            {'id': self.hryvnias.pk, 'name': 'Still hryvnias'},
+        ])
+        self.assertEqual({project.name: project.budget_base_amount for project in changed},
+                         {'Dollars': 1100, 'Still hryvnias': None})
+        self.assertEqual(Project.objects.get(pk=self.dollars.pk).budget_base_amount, 1100)
+
+    def test_rate_updates_renormalize_affected_projects(self):
+        updated_at = Project.objects.get(pk=self.euros.pk).updated_at
+        self.assertEqual(CurrencyRate.base_amount(100, 'eur'), 110)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(budgets.update_rates({'eur': '1.2', 'UAH': '0.025'}, batch_size=1), 2)
+        # The cached rates are dropped, saved budgets are converted with the new ones
+        self.assertEqual(CurrencyRate.base_amount(100, 'eur'), 120)
+        self.assertEqual(CurrencyRate.base_amount(100, 'UAH'), 3)
+        self.assertEqual(dict(Project.objects.values_list('name', 'budget_base_amount')),
+                         {'Dollars': 1000, 'Euros': 2400, 'Hryvnias': 1250})
+        self.assertEqual(Project.objects.get(pk=self.euros.pk).updated_at, updated_at)
+        # Unchanged rates rewrite nothing
+        self.assertEqual(budgets.update_rates({'EUR': '1.2'}), 0)
+
+        for rates in ({'EUR': 0}, {'EURO': 1}, {'USD': 2}, {'EUR': 'abc'}):
+            with self.assertRaises(ValueError):
+                budgets.update_rates(rates)
+        self.assertEqual(CurrencyRate.objects.get(currency='EUR').rate, Decimal('1.2'))
+
+    def test_command_reads_rates_from_arguments_and_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as stream:
+            stream.write('UAH,0.025\n')
+        self.addCleanup(os.remove, stream.name)
+
+        call_command('update_currency_rates', 'EUR=1.2', '--file', stream.name, stdout=io.StringIO())
+        self.assertEqual(Project.objects.get(pk=self.hryvnias.pk).budget_base_amount, 1250)
+        with self.assertRaises(CommandError):
+            call_command('update_currency_rates', 'EUR', stdout=io.StringIO())
+
+    def test_investor_screens_projects_by_budget_and_duration(self):
+        client = authenticated_client(self.investor_user)
+        url = reverse('projects:project-list')
+
+        response = client.get(url, {'budget_min': 1000, 'ordering': '-budget'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([project['name'] for project in response.data], ['Euros', 'Dollars'])
+        self.assertEqual(response.data[0]['budget_base_amount'], 2200)
+
+        response = client.get(url, {'status': 'open', 'duration_min': 4, 'duration_max': 12, 'page': 1})
+        self.assertEqual([project['name'] for project in response.data['results']], ['Dollars'])
+
+        response = client.get(url, {'budget_max': 'many'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CapTableTestCase(TestCase):
+    """
+    Tests of the cached shares breakdown of a project.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        startup = create_startup('Cap table')
+        cls.project = Project.objects.create(name='Seed round', startup=startup)
+        cls.investors = [create_investor(name) for name in ('Alpha', 'Beta', 'Gamma')]
+        for investor, share in zip(cls.investors, (20, 50, 20)):
+            InvestorProject.allocate_share(cls.project.pk, investor.pk, share)
+        cls.user = create_member('owner@captable.com', startup)
+        cls.url = reverse('projects:views_shares_info', args=[cls.project.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.client = authenticated_client(self.user)
+
+    def test_breakdown_is_ranked_with_running_totals_and_cached(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row['investor_name'], row['share'], row['running_total'], row['rank'])
+                          for row in response.data['investors']],
+                         [('Beta', 50, 50, 1), ('Alpha', 20, 70, 2), ('Gamma', 20, 90, 2)])
+        self.assertEqual((response.data['total_share'], response.data['remaining_share']), (90.0, 10.0))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data, response.data)
+
+    def test_share_and_investor_changes_invalidate_the_breakdown(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            InvestorProject.allocate_share(self.project.pk, self.investors[0].pk, 30)
+        self.assertEqual(self.client.get(self.url).data['remaining_share'], 0.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.investors[1].investor_name = 'Beta Capital'
+            self.investors[1].save()
+        self.assertEqual(self.client.get(self.url).data['investors'][0]['investor_name'], 'Beta Capital')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            InvestorProject.objects.filter(investor=self.investors[2]).delete()
+        self.assertEqual([row['investor_name'] for row in self.client.get(self.url).data['investors']],
+                         ['Beta Capital', 'Alpha'])
+
+    def test_fail_breakdown_of_missing_project(self):
+        self.assertEqual(self.client.get(reverse('projects:views_shares_info', args=[0])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+
+class FileDeliveryTestCase(TestCase):
+    """
+    Tests of file downloads through signed URLs.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup = create_startup('Delivery')
+        cls.project = Project.objects.create(name='Downloads', startup=cls.startup, description='Files')
+        cls.user = create_member('owner@delivery.com', cls.startup)
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = authenticated_client(self.user)
+        self.content = os.urandom(2000)
+        response = self.client.post(
+            reverse('projects:project_files_by_project', args=[self.project.pk]),
+            {'file': SimpleUploadedFile('report.pdf', self.content), 'file_description': 'Report'},
+            format='multipart')
+        self.project_file = ProjectFiles.objects.get(pk=response.data['id'])
+
+    def file_url(self):
+        response = self.client.get(reverse('projects:project_file', args=[self.project.pk, self.project_file.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['file_url']
+
+    def test_signed_url_streams_file_with_ranges_and_etag(self):
+        anonymous = APIClient()
+        url = self.file_url()
+
+        response = anonymous.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="report.pdf"')
+        etag = response['ETag']
+
+        response = anonymous.get(url, HTTP_RANGE='bytes=100-199', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/2000')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+        self.assertEqual(b''.join(anonymous.get(url, HTTP_RANGE='bytes=-50').streaming_content),
+                         self.content[-50:])
+        self.assertEqual(anonymous.get(url, HTTP_RANGE='bytes=5000-').status_code,
+                         status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(anonymous.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_fail_tampered_or_expired_url(self):
+        url = self.file_url()
+        self.assertEqual(self.client.get(url[:-3] + 'xx/').status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(FILE_URL_MAX_AGE=-1):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(FILE_DELIVERY_BACKEND='x-accel-redirect', FILE_DELIVERY_ACCEL_PREFIX='/protected/')
+    def test_front_server_delivers_the_bytes(self):
+        response = self.client.get(self.file_url())
+
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/' + self.project_file.file.name)
+        self.assertEqual(response.content, b'')
+
+        self.startup.startup_logo.name = 'media/startup_logos/logo.png'
+        logo_url = StartupSerializer(self.startup).data['startup_logo']
+        response = self.client.get(logo_url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/media/startup_logos/logo.png')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="logo.png"')
+
+
+class FileIntegrityScanTestCase(TestCase):
+    """
+    Tests of the background integrity checks of stored project files.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup = create_startup('Scans')
+        cls.project = Project.objects.create(name='Scanned', startup=cls.startup, description='Files')
+        cls.user = create_member('owner@scans.com', cls.startup)
+        cls.url = reverse('projects:project_files_by_project', args=[cls.project.pk])
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = authenticated_client(self.user)
+        self.files = []
+        for name in ('intact.pdf', 'corrupted.pdf', 'missing.pdf'):
+            self.client.post(self.url, {'file': SimpleUploadedFile(name, os.urandom(1000)),
+                                        'file_description': name}, format='multipart')
+            self.files.append(ProjectFiles.objects.get(file_name=name))
+
+    def test_scan_flags_missing_and_corrupted_files(self):
+        intact, corrupted, missing = self.files
+        with open(corrupted.file.path, 'r+b') as stored:
+            stored.write(b'tampered')
+        os.remove(missing.file.path)
+        logs = ProjectLog.objects.count()
+
+        report = integrity.scan(batch_size=2)
+
+        self.assertEqual(report, {'ok': 1, 'missing': 1, 'corrupted': 1})
+        for project_file, file_status in zip(self.files, ['ok', 'corrupted', 'missing']):
+            sha256 = project_file.sha256
+            project_file.refresh_from_db()
+            self.assertEqual(project_file.file_status, file_status)
+            self.assertEqual(project_file.sha256, sha256)
+            self.assertEqual(project_file.file_description, project_file.file_name)
+            self.assertIsNotNone(project_file.checked_at)
+        self.assertEqual(ProjectLog.objects.count(), logs)
+        # The next scan starts with the least recently checked file
+        self.assertEqual(integrity.scan(limit=1), {'ok': 1, 'missing': 0, 'corrupted': 0})
+
+    def test_list_only_reads_the_recorded_status(self):
+        os.remove(self.files[0].file.path)
+        integrity.scan()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries if not query['sql'].startswith('SELECT')])
+        self.assertEqual([item['file_status'] for item in response.data], ['missing', 'ok', 'ok'])
+        self.assertEqual([item['file_description'] for item in response.data],
+                         ['intact.pdf', 'corrupted.pdf', 'missing.pdf'])
+
+
+class ProjectLogPartitionTestCase(TestCase):
+    """
+    Tests of the monthly partitions of the project log.
+    """
+
+    def create_log(self, change_date):
+        log = ProjectLog.objects.create(project_birth_id=1, user_id=1, startup_id=1, action='Created Project',
+                                        previous_state='n/a', modified_state='New Project')
+        ProjectLog.objects.filter(pk=log.pk).update(change_date=change_date)
+        return log
+
+    @staticmethod
+    def partition_of(log):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM projects_projectlog WHERE id = %s', [log.pk])
+            return cursor.fetchone()[0]
+
+    def test_rows_are_stored_in_the_partition_of_their_month(self):
+        log = self.create_log(date.today())
+        self.assertEqual(self.partition_of(log), partitions.partition_name(date.today()))
+
+    def test_create_partitions_moves_rows_out_of_the_default_partition(self):
+        log = self.create_log(date(2100, 1, 15))
+        self.assertEqual(self.partition_of(log), partitions.DEFAULT_PARTITION)
+
+        created = partitions.create_partitions()
+
+        self.assertEqual(created, ['projects_projectlog_y2100m01'])
+        self.assertEqual(self.partition_of(log), 'projects_projectlog_y2100m01')
+        self.assertEqual(partitions.create_partitions(), [])
+
+    def test_archive_partitions_exports_and_drops_old_months(self):
+        old_log, recent_log = self.create_log(date(2001, 3, 10)), self.create_log(date.today())
+        partitions.create_partitions()
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = partitions.archive_partitions(date(2001, 4, 1), directory)
+            self.assertEqual(paths, [os.path.join(directory, 'projects_projectlog_y2001m03.csv.gz')])
+            with gzip.open(paths[0], 'rt') as archive:
+                rows = list(csv.DictReader(archive))
+
+        self.assertEqual([int(row['id']) for row in rows], [old_log.pk])
+        self.assertEqual(rows[0]['change_date'], '2001-03-10')
+        self.assertEqual(list(ProjectLog.objects.values_list('pk', flat=True)), [recent_log.pk])
+
+
+class ProjectAuditLogTestCase(TransactionTestCase):
+    """
+    Tests of the project audit log, which is written in the transaction of the change it records.
+    """
+
+    def setUp(self):
+        self.startup = create_startup('Audit')
+        self.owner = create_member('owner@audit.com', self.startup, link=True)
+        self.member = create_member('member@audit.com', self.startup, link=True)
+        self.client = authenticated_client(self.member)
+
+    def test_request_events_are_written_once_with_acting_user(self):
+        response = self.client.post(reverse('projects:project-list'),
+                                    {'name': 'Audit', 'description': 'Audited'}, format='json')
+        project_id = response.data['id']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch(reverse('projects:project-detail', args=[project_id]),
+                              {'name': 'Audited'}, format='json')
+        log_inserts = [query for query in queries.captured_queries
+                       if query['sql'].startswith('INSERT INTO "projects_projectlog"')]
+        self.assertEqual(len(log_inserts), 1)
+        logs = ProjectLog.objects.filter(project_birth_id=project_id)
+        self.assertEqual(sorted(log.action for log in logs), ['Created Project', 'Updated Project'])
+        self.assertEqual({log.user_id for log in logs}, {self.member.pk})
+
+    def test_updates_record_typed_diffs_that_replay_to_the_project(self):
+        response = self.client.post(reverse('projects:project-list'),
+                                    {'name': 'Audit', 'description': 'Audited', 'duration': 6}, format='json')
+        project_id = response.data['id']
+        self.client.patch(reverse('projects:project-detail', args=[project_id]),
+                          {'name': 'Renamed', 'duration': '6', 'description': 'Audited'}, format='json')
+        self.client.patch(reverse('projects:project-detail', args=[project_id]),
+                          {'name': 'Renamed', 'budget_amount': 1000, 'budget_currency': 'USD'}, format='json')
+
+        created, renamed, budgeted = ProjectLog.objects.filter(project_birth_id=project_id).order_by('id')
+        self.assertEqual(renamed.changes, {'name': ['Audit', 'Renamed']})
+        self.assertEqual((renamed.previous_state, renamed.modified_state), ('', ''))
+        self.assertEqual(budgeted.changes, {'budget_currency': [None, 'USD'], 'budget_amount': [None, 1000]})
+
+        # Sending the current values again changes nothing and logs nothing
+        response = self.client.patch(reverse('projects:project-detail', args=[project_id]),
+                                     {'name': 'Renamed', 'duration': 6}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Renamed')
+        self.assertEqual(ProjectLog.objects.filter(project_birth_id=project_id).count(), 3)
+
+        project = Project.objects.get(pk=project_id)
+        self.assertEqual(history.replay(self.startup.pk, project_id), history.snapshot(project))
+        self.assertEqual(history.replay(self.startup.pk, project_id, until=created.pk)['name'], 'Audit')
+
+        logs = self.client.get(reverse('projects:view_logs', args=[project_id])).data
+        self.assertEqual(logs[1]['previous_state'], 'name: Audit')
+        self.assertEqual(logs[1]['modified_state'], 'name: Renamed')
+
+    def test_events_of_deleted_project_are_unlinked(self):
+        use_temporary_media(self)
+        project = Project.objects.create(name='Short lived', startup=self.startup, description='x')
+        project_id = project.pk
+        ProjectFiles.objects.create(project=project, file_description='Report',
+                                    file=SimpleUploadedFile('report.pdf', b'report'))
+        with transaction.atomic():
+            project.delete()
+        logs = ProjectLog.objects.filter(project_birth_id=project_id)
+        self.assertEqual(sorted(log.action for log in logs),
+                         ['Added File to Project', 'Created Project', 'Deleted File of Project', 'Deleted Project'])
+        self.assertFalse(logs.exclude(project=None).exists())
+        self.assertEqual(set(logs.values_list('user_id', flat=True)), {self.owner.pk})
+
+    def test_rolled_back_events_are_not_written(self):
+        try:
+            with transaction.atomic():
+                Project.objects.create(name='Rolled back', startup=self.startup, description='x')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(ProjectLog.objects.exists())
+
+    def test_failed_log_write_fails_the_change(self):
+        with mock.patch.object(ProjectLog.objects, 'bulk_create', side_effect=DatabaseError('log is full')):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                Project.objects.create(name='Unlogged', startup=self.startup, description='x')
+        self.assertFalse(Project.all_objects.filter(name='Unlogged').exists())
+
+
+class FundingLedgerConcurrencyTestCase(TransactionTestCase):
+    """
+    Stress test of the funding ledger: many investors subscribe to one project at the same time.
+    """
+    INVESTORS = 40
+    SHARE = 7
+
+    def setUp(self):
+        self.project = Project.objects.create(name='Ledger', startup=create_startup('Ledger'), description='Ledger')
+        self.investors = Investor.objects.bulk_create([
+            Investor(investor_name=f'Investor {i}', **INVESTOR_DETAILS) for i in range(self.INVESTORS)
+        ])
+
+    def test_no_oversubscription_under_concurrency(self):
+        barrier = threading.Barrier(self.INVESTORS)
+        results = []
+
+        def subscribe(investor):
+            try:
+                barrier.wait()
+                InvestorProject.allocate_share(self.project.pk, investor.pk, self.SHARE)
+                results.append(True)
+            except OversubscriptionError:
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=subscribe, args=(investor,)) for investor in self.investors]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.project.refresh_from_db()
+        allocated = sum(InvestorProject.objects.filter(project=self.project).values_list('share', flat=True))
+        self.assertEqual(results.count(True), 100 // self.SHARE)
+        self.assertEqual(self.project.allocated_share, allocated)
+        self.assertLessEqual(allocated, 100)
+
+    def test_concurrent_changes_and_delistings_do_not_deadlock(self):
+        # At most 10 * 5 + 10 * 4 percent are allocated at any time, no change is refused
+        followers, newcomers = self.investors[:10], self.investors[10:20]
+        for investor in followers:
+            InvestorProject.allocate_share(self.project.pk, investor.pk, 4)
+        barrier = threading.Barrier(len(followers) + len(newcomers))
+        errors = []
+
+        def change(investor):
+            try:
+                barrier.wait()
+                if investor in followers:
+                    # Raised and released again, then delisted
+                    InvestorProject.allocate_share(self.project.pk, investor.pk, 5)
+                    InvestorProject.release_share(self.project.pk, investor.pk)
+                else:
+                    InvestorProject.follow(self.project.pk, investor.pk)
+                    InvestorProject.allocate_share(self.project.pk, investor.pk, 4)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=change, args=(investor,)) for investor in followers + newcomers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.project.refresh_from_db()
+        shares = list(InvestorProject.objects.filter(project=self.project).values_list('share', flat=True))
+        self.assertEqual(shares, [4] * len(newcomers))
+        self.assertEqual(self.project.allocated_share, sum(shares))
+
+
+class UploadSessionLockTestCase(TransactionTestCase):
+    """
+    Tests of concurrent requests on one upload session.
+    """
+
+    def setUp(self):
+        use_temporary_media(self)
+        project = Project.objects.create(name='Locks', startup=create_startup('Locks'), description='Locks')
+        self.content = os.urandom(3000)
+        self.session = uploads.open_session(project, 'deck.pdf', 'Deck', len(self.content))
+
+    def run_concurrently(self, target, count):
+        barrier = threading.Barrier(count)
+        results = []
+
+        def run():
+            try:
+                barrier.wait()
+                results.append(target())
+            except Exception as e:
+                results.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_finalizations_create_one_file(self):
+        uploads.write_chunk(self.session, 0, len(self.content), io.BytesIO(self.content))
+
+        results = self.run_concurrently(
+            lambda: uploads.finalize_session(UploadSession.objects.select_related('project').get(pk=self.session.pk)),
+            4)
+
+        self.assertEqual(sum(isinstance(result, ProjectFiles) for result in results), 1)
+        self.assertEqual(sum(isinstance(result, uploads.SessionClosedError) for result in results), 3)
+        self.assertEqual(ProjectFiles.objects.count(), 1)
+
+    def test_chunk_is_streamed_under_a_lease_without_locking_the_session(self):
+        reading, release = threading.Event(), threading.Event()
+        content = io.BytesIO(self.content)
+
+        class SlowStream:
+            def read(self, size):
+                reading.set()
+                release.wait()
+                return content.read(size)
+
+        def write():
+            try:
+                uploads.write_chunk(UploadSession.objects.get(pk=self.session.pk), 0, len(self.content), SlowStream())
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        reading.wait()
+        try:
+            # No row lock is held while the client sends the chunk
+            with transaction.atomic():
+                UploadSession.objects.select_for_update(nowait=True).get(pk=self.session.pk)
+            with self.assertRaises(uploads.OffsetMismatchError):
+                uploads.write_chunk(self.session, 0, len(self.content), io.BytesIO(self.content))
+        finally:
+            release.set()
+            writer.join()
+
+        session = UploadSession.objects.get(pk=self.session.pk)
+        self.assertEqual((session.offset, session.writer, session.writing_until), (3000, None, None))
+
+    def test_lapsed_lease_is_taken_over(self):
+        UploadSession.objects.filter(pk=self.session.pk).update(
+            writer=uuid.uuid4(), writing_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(uploads.write_chunk(self.session, 0, len(self.content), io.BytesIO(self.content)), 3000)
@@ -0,0 +1,432 @@
+"""
+Resumable chunked uploads of project files.
+
+A client opens an upload session with the name, description and size of a file, sends the file in
+chunks with PUT requests carrying a `Content-Range` header, and finalizes the session, which turns
+the upload into a `ProjectFiles` row. Chunks are streamed from the request into the partially
+uploaded file in the destination storage in fixed-size blocks, so memory use does not depend on
+the chunk or file size. Bytes received before a connection drops are kept: the session offset
+tells the client where to resume.
+
+Small files can also be sent together in one multipart request (`upload_batch`): they are
+written to storage by a pool of UPLOAD_WORKERS threads and saved with one `bulk_create` and a
+single log entry. A batch is saved completely or not at all.
+
+Opening a session reserves its full size against the storage quota of the startup
+(`STARTUP_STORAGE_QUOTA`). A session expires `PROJECT_UPLOAD_SESSION_TTL` seconds after its last
+chunk; expired sessions stop counting against the quota and are removed by the
+`purge_upload_sessions` command.
+
+Functions:
+    check_quota: Ensures a startup has room for a number of bytes.
+    open_session: Opens an upload session for a project file.
+    write_chunk: Writes a chunk read from a stream at the session offset.
+    finalize_session: Turns a complete upload into a ProjectFiles row.
+    discard_session: Deletes a session together with its partially uploaded file.
+    purge_expired_sessions: Discards the sessions that have expired.
+    upload_batch: Saves several uploaded files of a project at once.
+"""
+
+import logging
+import os
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from startups.models import Startup
+from .models import FileBlob, ProjectFiles, UploadSession
+from . import audit, blobs
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 1024 * 1024
+UPLOAD_WORKERS = 8
+ADDED_FILES_ACTION = 'Added Files to Project'
+
+
+class QuotaExceededError(Exception):
+    """
+    Raised when a file does not fit into the storage quota of a startup.
+
+    Attributes:
+        available (int): The number of bytes the startup can still store.
+    """
+    def __init__(self, available):
+        super().__init__(f'Storage quota exceeded, available: {available} bytes')
+        self.available = available
+
+
+class OffsetMismatchError(Exception):
+    """
+    Raised when a chunk does not start at the session offset or an incomplete upload is finalized.
+
+    Attributes:
+        offset (int): The number of bytes the session has received.
+    """
+    def __init__(self, offset):
+        super().__init__(f'Upload offset is {offset}')
+        self.offset = offset
+
+
+class SessionClosedError(Exception):
+    """
+    Raised when a session was finalized or discarded by a concurrent request.
+    """
+
+
+class BatchUploadError(Exception):
+    """
+    Raised when files of a batch upload are invalid or fail to be stored; no file of the batch is saved.
+
+    Attributes:
+        errors (dict[int, str]): The error of every failed file by its position in the batch.
+    """
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} file(s) of the batch failed')
+        self.errors = errors
+
+
+def _expiry():
+    return timezone.now() + timedelta(seconds=settings.PROJECT_UPLOAD_SESSION_TTL)
+
+
+def _used_storage(startup_id):
+    files = ProjectFiles.objects.filter(project__startup_id=startup_id).aggregate(total=Sum('file_size'))
+    sessions = UploadSession.objects.filter(
+        project__startup_id=startup_id, expires_at__gt=timezone.now()).aggregate(total=Sum('size'))
+    return (files['total'] or 0) + (sessions['total'] or 0)
+
+
+def check_quota(startup_id, size):
+    """
+    Ensures a startup has room for a number of bytes.
+
+    Must run in a transaction: the startup row is locked until it ends, so concurrent uploads of
+    the same startup cannot both take the last free bytes.
+
+    Raises:
+    - QuotaExceededError: If the bytes do not fit into the quota.
+    """
+    Startup.objects.select_for_update().filter(pk=startup_id).exists()
+    available = settings.STARTUP_STORAGE_QUOTA - _used_storage(startup_id)
+    if size > available:
+        raise QuotaExceededError(max(available, 0))
+
+
+def open_session(project, file_name, file_description, size):
+    """
+    Opens an upload session for a project file.
+
+    Parameters:
+    - project (Project): The Project the file is uploaded to.
+    - file_name (str): The name of the file.
+    - file_description (str): The description of the file.
+    - size (int): The size of the file in bytes.
+
+    Returns:
+    - UploadSession: The new session.
+
+    Raises:
+    - QuotaExceededError: If the file does not fit into the startup's quota.
+    """
+    session = UploadSession(project=project, file_name=file_name, file_description=file_description,
+                            size=size, expires_at=_expiry())
+    session.staged_name = os.path.join(
+        'media', f'startups/startup_{project.startup_id}/project_{project.pk}/.uploads/{session.pk}')
+    with transaction.atomic():
+        check_quota(project.startup_id, size)
+        session.save()
+    return session
+
+
+def _lock_session(session):
+    """
+    Locks the row of a session until the transaction ends and refreshes the state of `session`.
+
+    Raises:
+    - SessionClosedError: If the session no longer exists.
+    """
+    locked = UploadSession.objects.select_for_update().filter(pk=session.pk).first()
+    if locked is None:
+        raise SessionClosedError()
+    session.offset, session.expires_at = locked.offset, locked.expires_at
+
+
+def _current_offset(session):
+    """
+    Refreshes and returns the offset of a session.
+
+    Raises:
+    - SessionClosedError: If the session no longer exists.
+    """
+    offset = UploadSession.objects.filter(pk=session.pk).values_list('offset', flat=True).first()
+    if offset is None:
+        raise SessionClosedError()
+    session.offset = offset
+    return offset
+
+
+def _claim(session, start):
+    """
+    Takes the write lease of a session for a chunk starting at `start`, with a single UPDATE.
+
+    Returns:
+    - UUID: The token identifying the lease.
+
+    Raises:
+    - OffsetMismatchError: If the chunk does not start at the session offset, or another request
+      holds the lease.
+    - SessionClosedError: If the session no longer exists.
+    """
+    token = uuid.uuid4()
+    now = timezone.now()
+    claimed = UploadSession.objects.filter(
+        Q(writing_until__isnull=True) | Q(writing_until__lte=now), pk=session.pk, offset=start,
+    ).update(writer=token, writing_until=now + timedelta(seconds=settings.PROJECT_UPLOAD_CHUNK_LEASE),
+             expires_at=_expiry())
+    if not claimed:
+        raise OffsetMismatchError(_current_offset(session))
+    return token
+
+
+def _release(session, token, offset):
+    """
+    Records the new offset of a session and gives its write lease back, with a single UPDATE.
+
+    Raises:
+    - OffsetMismatchError: If the lease lapsed and was taken by another request.
+    - SessionClosedError: If the session was finalized or discarded meanwhile.
+    """
+    released = UploadSession.objects.filter(pk=session.pk, writer=token).update(
+        offset=offset, writer=None, writing_until=None, expires_at=_expiry())
+    if released:
+        session.offset = offset
+        return
+    current = UploadSession.objects.filter(pk=session.pk).values_list('offset', flat=True).first()
+    if current is not None:
+        session.offset = current
+        raise OffsetMismatchError(current)
+    # Opening the file for the chunk may have recreated it after the session was discarded
+    try:
+        os.remove(default_storage.path(session.staged_name))
+    except FileNotFoundError:
+        pass
+    raise SessionClosedError()
+
+
+def write_chunk(session, start, length, stream):
+    """
+    Writes a chunk read from a stream at the session offset.
+
+    The chunk is copied in blocks of BLOCK_SIZE bytes. Whatever arrived is kept when reading
+    fails, e.g. because the client disconnected, and the offset is advanced accordingly. No
+    transaction is open while the client sends the chunk: the request takes a write lease on the
+    session (`writer`, `writing_until`) with one UPDATE, streams the chunk, and records the new
+    offset and gives the lease back with another. A concurrent chunk for the same session is
+    rejected at once rather than written over the same bytes. The lease of a request that died
+    lapses after PROJECT_UPLOAD_CHUNK_LEASE seconds.
+
+    Parameters:
+    - session (UploadSession): The session the chunk belongs to.
+    - start (int): The position of the first byte of the chunk in the file.
+    - length (int): The length of the chunk.
+    - stream (file): The stream to read the chunk from.
+
+    Returns:
+    - int: The new session offset.
+
+    Raises:
+    - OffsetMismatchError: If the chunk does not start at the session offset, or another chunk
+      of the session is being written.
+    - SessionClosedError: If the session was finalized or discarded meanwhile.
+    - ValueError: If the chunk extends past the declared file size.
+    - OSError: If reading the chunk failed; the bytes that arrived are kept.
+    """
+    if start + length > session.size:
+        raise ValueError('The chunk extends past the declared file size')
+    token = _claim(session, start)
+
+    error = None
+    written = 0
+    try:
+        path = default_storage.path(session.staged_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # O_CREAT without O_TRUNC: earlier chunks are kept
+        with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT, 0o644), 'wb') as staged:
+            staged.seek(start)
+            while written < length:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                staged.write(block)
+                written += len(block)
+    except OSError as e:
+        # Raised once the offset of the bytes that arrived is recorded
+        error = e
+    finally:
+        _release(session, token, start + written)
+    if error is not None:
+        raise error
+    return session.offset
+
+
+def finalize_session(session, sha256=None):
+    """
+    Turns a complete upload into a ProjectFiles row.
+
+    The file is hashed in one sequential pass and moved into the blob store without copying, or
+    dropped if its content is already stored. A session whose checksum does not match is discarded.
+    The session is locked throughout, so of concurrent finalizations only the first creates a file.
+
+    Parameters:
+    - session (UploadSession): The session to finalize.
+    - sha256 (str | None): The hex SHA-256 digest the client computed, verified when given.
+
+    Returns:
+    - ProjectFiles: The created project file.
+
+    Raises:
+    - OffsetMismatchError: If the upload is incomplete.
+    - SessionClosedError: If the session was finalized or discarded meanwhile.
+    - ValueError: If the checksum does not match.
+    - QuotaExceededError: If the session has expired and the file no longer fits into the quota.
+    """
+    with transaction.atomic():
+        _lock_session(session)
+        if session.offset != session.size:
+            raise OffsetMismatchError(session.offset)
+
+        path = default_storage.path(session.staged_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as staged:
+            # Bytes past the declared size can remain from a chunk whose offset update was lost
+            staged.truncate(session.size)
+        digest = blobs.file_sha256(path)
+        mismatch = bool(sha256) and sha256.lower() != digest
+        if mismatch:
+            discard_session(session)
+        else:
+            if session.expires_at <= timezone.now():
+                # The reservation of an expired session has lapsed
+                check_quota(session.project.startup_id, session.size)
+            blob = blobs.store_path(path, digest, session.size)
+            project_file = ProjectFiles.objects.create(
+                project=session.project, file=FileBlob.storage_name(digest), file_name=session.file_name,
+                file_description=session.file_description, file_size=session.size, sha256=digest, blob=blob)
+            session.delete()
+    if mismatch:
+        raise ValueError('The SHA-256 checksum does not match the uploaded file')
+    return project_file
+
+
+def discard_session(session):
+    """
+    Deletes a session together with its partially uploaded file.
+    """
+    try:
+        os.remove(default_storage.path(session.staged_name))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def purge_expired_sessions():
+    """
+    Discards the sessions that have expired.
+
+    Returns:
+    - int: The number of discarded sessions.
+    """
+    expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+    count = 0
+    for session in expired.iterator():
+        discard_session(session)
+        count += 1
+    return count
+
+
+def _batch_errors(files, descriptions):
+    errors = {}
+    for index in range(max(len(files), len(descriptions))):
+        if index >= len(files) or not files[index]:
+            errors[index] = 'The file is missing'
+        elif index >= len(descriptions) or not descriptions[index].strip():
+            errors[index] = 'The file description is required'
+        elif len(descriptions[index].strip()) > ProjectFiles._meta.get_field('file_description').max_length:
+            errors[index] = 'The file description is too long'
+        else:
+            try:
+                get_valid_filename(os.path.basename(files[index].name))
+            except SuspiciousFileOperation:
+                errors[index] = 'The file name is not valid'
+    return errors
+
+
+def upload_batch(project, files, descriptions):
+    """
+    Saves several uploaded files of a project at once.
+
+    The files are hashed and written next to the blob store in parallel threads, then moved into
+    place, saved with one `bulk_create` and logged with one entry in a single transaction. If any
+    file is invalid or fails to be written, nothing is saved and the staged files are removed.
+
+    Parameters:
+    - project (Project): The Project the files are uploaded to.
+    - files (list[File]): The uploaded files.
+    - descriptions (list[str]): The description of every file, in the same order.
+
+    Returns:
+    - list[ProjectFiles]: The created project files, in the order of the uploads.
+
+    Raises:
+    - BatchUploadError: If files are invalid or cannot be stored.
+    - QuotaExceededError: If the files do not fit into the startup's quota together.
+    """
+    errors = _batch_errors(files, descriptions)
+    if errors:
+        raise BatchUploadError(errors)
+
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(files))) as pool:
+        futures = [pool.submit(blobs.stage_upload, file) for file in files]
+    staged = {}
+    for index, future in enumerate(futures):
+        try:
+            staged[index] = future.result()
+        except OSError as e:
+            logger.error(f'Error: file {files[index].name} failed to be staged: {str(e)}')
+            errors[index] = 'The file could not be stored'
+
+    try:
+        if errors:
+            raise BatchUploadError(errors)
+        with transaction.atomic():
+            check_quota(project.startup_id, sum(file.size for file in files))
+            blobs.store_paths([(path, sha256, files[index].size) for index, (path, sha256) in staged.items()])
+            # The staged files are in place now
+            digests = [staged.pop(index)[1] for index in range(len(files))]
+            project_files = ProjectFiles.objects.bulk_create([
+                ProjectFiles(project=project, file=FileBlob.storage_name(sha256),
+                             file_name=get_valid_filename(os.path.basename(file.name)),
+                             file_description=description.strip(), file_size=file.size, sha256=sha256, blob_id=sha256)
+                for file, description, sha256 in zip(files, descriptions, digests)
+            ])
+            # bulk_create sends no signals: count the references and log here
+            blobs.update_references(Counter(digests))
+            audit.record(project.pk, project.pk, project.startup_id, ADDED_FILES_ACTION, 'n/a',
+                         f'{len(project_files)} new files, IDs: ' + ', '.join(str(f.pk) for f in project_files))
+    finally:
+        for path, _ in staged.values():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return project_files
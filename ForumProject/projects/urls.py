@@ -1,5 +1,5 @@
 from django.urls import path, include
-from . import views_projects, views_files, views_follow, views_logs, views_shares_info
+from . import views_projects, views_files, views_follow, views_logs, views_shares_info, views_uploads
 from rest_framework import routers
 
 app_name = 'projects'
@@ -8,16 +8,27 @@ router = routers.DefaultRouter()
 router.register('', views_projects.ProjectViewSet)
 
 urlpatterns = [
-    path('followed/', views_follow.view_followed_projects, name='view_followed_projects'),
+    path('followed/', views_follow.FollowedProjectListView.as_view(), name='view_followed_projects'),
     path('logs/<int:pk>/', views_logs.view_logs, name='view_logs'),
+    path('download/<str:token>/', views_files.download_file, name='download'),
     path('', include(router.urls)), 
     path('<int:pk>/files/', views_files.ProjectFilesViewSet.as_view({
         'get': 'list',
         'post': 'create',
         'delete': 'destroy',
     }), name='project_files_by_project'),
+    path('<int:pk>/files/batch/',
+         views_files.upload_files_batch, name='upload_files_batch'),
+    path('<int:pk>/files/archive/',
+         views_files.project_files_archive, name='project_files_archive'),
     path('<int:pk>/file/<int:projectfiles_id>/',
          views_files.project_file, name='project_file'),
+    path('<int:pk>/uploads/',
+         views_uploads.upload_sessions, name='upload_sessions'),
+    path('<int:pk>/uploads/<uuid:session_id>/',
+         views_uploads.upload_session, name='upload_session'),
+    path('<int:pk>/uploads/<uuid:session_id>/finalize/',
+         views_uploads.finalize_upload, name='finalize_upload'),
     path('follow/<int:project_id>/',
          views_follow.follow, name='follow'),
     path('subscription/<int:project_id>/<int:share>/',
@@ -1,14 +1,18 @@
 from django.shortcuts import render, get_object_or_404
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_safe
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view, permission_classes
 import os
-from django.db.models.signals import post_save
-from .signals import create_update_project_file_log
-from .models import Project, ProjectFiles
+from django.conf import settings
+from django.db import transaction
+from django.utils.text import get_valid_filename
+from .models import Project, ProjectFiles, FileBlob
 from .serializers import ProjectFilesSerializer
+from . import archives, blobs, deletion, delivery, uploads
 
-from users.permissions import IsProjectMember
+from users.permissions import IsProjectFollower, IsProjectMember
 
 class ProjectFilesViewSet(viewsets.ModelViewSet):
     '''
@@ -30,8 +34,9 @@ class ProjectFilesViewSet(viewsets.ModelViewSet):
         '''
         List all ProjectFiles associated with a specific Project.
 
-        This method retrieves all `ProjectFiles` for a given Project and checks whether the files exist on the server. 
-        If a file is missing, it adds a warning to the `file_description`.
+        This method retrieves all `ProjectFiles` for a given Project. It does not touch the stored files:
+        their existence and integrity are checked in the background by the `scan_project_files` command,
+        which records the result in `file_status`.
 
         Parameters:
             request (HttpRequest): The HTTP request object.
@@ -44,7 +49,7 @@ class ProjectFilesViewSet(viewsets.ModelViewSet):
             Http404: If the Project with the given ID does not exist.
 
         Note:
-            If a file does not exist on the server, the method updates its `file_description` to include a warning.
+            Missing or corrupted files are flagged by `file_status`; `file_description` is left as entered.
         '''
         # Get the project with the specified ID
         project_instance = get_object_or_404(Project, id=pk)
@@ -52,19 +57,6 @@ class ProjectFilesViewSet(viewsets.ModelViewSet):
         # Get all ProjectFiles related to this project
         queryset = ProjectFiles.objects.filter(project=project_instance)
 
-        # Check if the actual files exist on the server and if not - add warning to file_description 
-        for project_file in queryset:
-            if project_file.file:
-                file_path = project_file.file.path
-                if not os.path.exists(file_path):
-                    # Add worning and truncate file_description to prevent exceeding max_length
-                    file_description = project_file.file_description
-                    warning = (f"!!! ATTENTION - THIS FILE IS NOT FOUND - {file_description}")
-                    warning = warning[:project_file._meta.get_field("file_description").max_length]
-                    # Update file description
-                    project_file.file_description = warning
-                    project_file.save()
-        
         # Serialize the data and return HTTP 200 with the list of ProjectFiles
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -89,7 +81,9 @@ class ProjectFilesViewSet(viewsets.ModelViewSet):
 
         Note:
             The method returns an HTTP 201 status code upon successful creation. If the file or file description 
-            is missing, it returns an HTTP 400 status code with an error message.
+            is missing, it returns an HTTP 400 status code with an error message. A file that does not fit into
+            the startup's storage quota returns an HTTP 413 status code. Large files should use the resumable
+            upload sessions instead (see `views_uploads`), many files the batch upload (see `upload_files_batch`).
         '''
         # Ensure the project exists
         project_instance = get_object_or_404(Project, id=pk)
@@ -101,13 +95,23 @@ class ProjectFilesViewSet(viewsets.ModelViewSet):
         if not file or not file_description:
             return Response({"error": "Both file and file description are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create a new ProjectFiles instance
-        project_file = ProjectFiles(
-            project=project_instance,
-            file=file,
-            file_description=file_description
-        )
-        project_file.save()
+        try:
+            with transaction.atomic():
+                uploads.check_quota(project_instance.startup_id, file.size)
+                # Content that is already stored is only referenced
+                blob = blobs.store_upload(file)
+                project_file = ProjectFiles(
+                    project=project_instance,
+                    file=FileBlob.storage_name(blob.pk),
+                    file_name=get_valid_filename(os.path.basename(file.name)),
+                    file_description=file_description,
+                    file_size=file.size,
+                    sha256=blob.pk,
+                    blob=blob
+                )
+                project_file.save()
+        except uploads.QuotaExceededError as e:
+            return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
 
         # Serialize and return HTTP 201 with the created ProjectFiles
         serializer = ProjectFilesSerializer(project_file)
@@ -119,7 +123,7 @@ class ProjectFilesViewSet(viewsets.ModelViewSet):
         Delete all ProjectFiles for a specific Project.
 
         This method deletes all `ProjectFiles` associated with a specific Project, including the corresponding 
-        files from the server and their database records.
+        files from the server and their database records, in bulk through `projects.deletion`.
 
         Parameters:
             request (HttpRequest): The HTTP request indicating the Project whose files will be deleted.
@@ -132,28 +136,102 @@ class ProjectFilesViewSet(viewsets.ModelViewSet):
             Http404: If the Project with the given ID does not exist.
 
         Note:
-            This method deletes both the file from the server and the corresponding database record.
+            This method deletes both the files from the server and the corresponding database records, with a single
+            log entry. Files are removed from the server in parallel once the deletion has been committed.
             It returns an HTTP 200 status code upon successful deletion.
         '''
         # Ensure the project exists
         project_instance = get_object_or_404(Project, id=pk)
 
-        # Get all ProjectFiles related to this project
-        project_files = ProjectFiles.objects.filter(project=project_instance)
-
-        post_save.disconnect(create_update_project_file_log, sender=ProjectFiles)
-        # Delete the corresponding files from the server
-        for project_file in project_files:
-            if project_file.file:
-                project_file.file.delete()  # Delete the file from the server
-        
-        # Delete all ProjectFiles instances from the database
-        project_files.delete()
-        post_save.connect(create_update_project_file_log, sender=ProjectFiles)
+        # Delete all ProjectFiles of the project and, after commit, their files on the server
+        deletion.delete_files(project_instance)
 
         return Response({"message": "All files deleted successfully"}, status=status.HTTP_200_OK)
     
 
+@api_view(['POST'])
+@permission_classes([IsProjectMember])
+def upload_files_batch(request, pk):
+    '''
+    Upload several files to a specific Project in one multipart request.
+
+    The request holds the files as repeated `files` parts and their descriptions as repeated `file_descriptions`
+    parts, in the same order. The files are written to storage concurrently and saved together with a single log
+    entry (see `projects.uploads.upload_batch`); a batch is saved completely or not at all.
+
+    Parameters:
+        request (HttpRequest): The HTTP request containing the files and their descriptions.
+        pk (int): The ID of the Project to which the files will be added.
+
+    Returns:
+        Response: The result of every file, in request order, with an HTTP 201 status code:
+        `{"results": [{"file_name": ..., "status": "created", "file": {...}}, ...]}`.
+
+    Error Handling:
+        - A request without files returns an HTTP 400 status code.
+        - If any file is invalid or cannot be stored, no file is saved and an HTTP 400 status code is returned with
+          the result of every file: `failed` with its error, or `not saved`.
+        - Files that do not fit into the startup's storage quota together return an HTTP 413 status code.
+    '''
+    project_instance = get_object_or_404(Project, id=pk)
+    files = request.FILES.getlist('files')
+    descriptions = request.data.getlist('file_descriptions') if hasattr(request.data, 'getlist') else []
+    if not files:
+        return Response({"error": "At least one file is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        project_files = uploads.upload_batch(project_instance, files, descriptions)
+    except uploads.QuotaExceededError as e:
+        return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except uploads.BatchUploadError as e:
+        results = [
+            {"file_name": file.name if file else None, "status": "failed", "error": e.errors[index]}
+            if index in e.errors else {"file_name": file.name, "status": "not saved"}
+            for index, file in enumerate(files + [None] * (len(descriptions) - len(files)))
+        ]
+        return Response({"error": "No files were saved", "results": results}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = [
+        {"file_name": project_file.file_name, "status": "created",
+         "file": ProjectFilesSerializer(project_file, context={'request': request}).data}
+        for project_file in project_files
+    ]
+    return Response({"results": results}, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsProjectMember | IsProjectFollower])
+def project_files_archive(request, pk):
+    '''
+    Download all files of a specific Project as one ZIP archive, e.g. for the due diligence of an
+    investor following the Project; members of the Project's startup can download it too.
+
+    The archive is streamed while it is built, file by file in fixed-size blocks, so neither memory
+    nor disk use grows with its size. Files are stored uncompressed; files missing from storage are left out.
+
+    Parameters:
+        request (HttpRequest): The HTTP request object.
+        pk (int): The ID of the Project whose files are archived.
+
+    Returns:
+        StreamingHttpResponse: The ZIP archive as an attachment.
+
+    Raises:
+        Http404: If the Project with the given ID does not exist.
+
+    Note:
+        The archive size is unknown until it is complete, so the response has no `Content-Length` and does
+        not support `Range` requests (`Accept-Ranges: none`). Single files are available via `project_file`.
+    '''
+    project_instance = get_object_or_404(Project, id=pk)
+    project_files = list(ProjectFiles.objects.filter(project=project_instance).order_by('id'))
+
+    response = StreamingHttpResponse(archives.stream_archive(project_files), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{archives.archive_name(project_instance)}"'
+    response['Accept-Ranges'] = 'none'
+    return response
+
+
 @api_view(['GET', 'DELETE', 'PUT'])
 @permission_classes([IsProjectMember])
 def project_file(request, pk, projectfiles_id):
@@ -161,7 +239,7 @@ def project_file(request, pk, projectfiles_id):
     Retrieve or delete a specific ProjectFiles instance.
 
     This function handles two operations based on the HTTP method used in the request: 
-    - `GET`: Returns the URL path for the specified file.
+    - `GET`: Returns a short-lived signed download URL for the specified file (see `download_file`).
     - `DELETE`: Deletes the specified ProjectFiles instance and its associated file from the server.
 
     Parameters:
@@ -170,7 +248,8 @@ def project_file(request, pk, projectfiles_id):
         projectfiles_id (int): The ID of the specific ProjectFiles instance to retrieve or delete.
 
     Returns:
-        Response: An HTTP response containing the file URL (for GET) or a success message (for DELETE).
+        Response: An HTTP response containing the file URL and the seconds it stays valid (for GET)
+        or a success message (for DELETE).
 
     Raises:
         Http404: If the specified ProjectFiles instance or Project does not exist.
@@ -183,22 +262,16 @@ def project_file(request, pk, projectfiles_id):
     project_file = get_object_or_404(ProjectFiles, id=projectfiles_id, project_id=pk)
     
     if request.method == 'GET':
-        # Return the file URL path
-        file_url = project_file.file.url if project_file.file else None
-        if file_url:
-            return Response({"file_url": file_url}, status=status.HTTP_200_OK)
+        # Return a signed URL, the download itself is not authorized again
+        if project_file.file:
+            file_url = delivery.signed_url(project_file.file.name, project_file.file_name or None, request=request)
+            return Response({"file_url": file_url, "expires_in": settings.FILE_URL_MAX_AGE}, status=status.HTTP_200_OK)
         else:
             return Response({"error": "File does not exist"}, status=status.HTTP_404_NOT_FOUND)
         
     elif request.method == 'DELETE':
-        post_save.disconnect(create_update_project_file_log, sender=ProjectFiles)
-        # Delete the file from the server, if it exists
-        if project_file.file:
-            project_file.file.delete()
-        
-        # Delete the instance from the database
-        project_file.delete()
-        post_save.connect(create_update_project_file_log, sender=ProjectFiles)
+        # Delete the instance and, after commit, its file on the server unless it is a shared blob
+        deletion.delete_files(project_file.project, [project_file.pk])
         
         # Return success response
         return Response({"message": "File deleted successfully"}, status=status.HTTP_200_OK)
@@ -208,12 +281,37 @@ def project_file(request, pk, projectfiles_id):
         if not file_description:
             return Response({"error": "File description cannot be empty"}, status=status.HTTP_400_BAD_REQUEST)
 
-        project_file._changes = [
-            ('file_description', project_file.file_description, file_description)
-        ]
+        project_file._changes = {
+            'file_description': [project_file.file_description, file_description]
+        }
         
         project_file.file_description = file_description
         project_file.save()
 
         serializer = ProjectFilesSerializer(project_file)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@require_safe
+def download_file(request, token):
+    '''
+    Deliver a file through a signed URL.
+
+    The URL is issued by an endpoint that has authorized the user, e.g. `project_file`, and stays valid for
+    `FILE_URL_MAX_AGE` seconds, so this view does not authenticate. Depending on `FILE_DELIVERY_BACKEND`
+    the transfer is handed to the front web server (`X-Accel-Redirect` / `X-Sendfile`) or, for local runs,
+    streamed by Django with support for `Range` and conditional requests (see `projects.delivery`).
+
+    Parameters:
+        request (HttpRequest): The HTTP request object (GET or HEAD).
+        token (str): The signed token naming the file.
+
+    Returns:
+        HttpResponse: The file, a part of it or a delegation to the front web server.
+
+    Error Handling:
+        - An invalid or expired token returns an HTTP 403 status code.
+        - A missing file returns an HTTP 404 status code.
+        - An unsatisfiable range returns an HTTP 416 status code.
+    '''
+    return delivery.serve(request, token)
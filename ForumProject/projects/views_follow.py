@@ -1,11 +1,15 @@
-from django.shortcuts import render, get_object_or_404
-from django.db.models import Sum
-from rest_framework import viewsets, status
+from django.http import Http404
+from django.shortcuts import render
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import generics, viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.decorators import api_view, permission_classes
-from .models import Project, InvestorProject
-from .serializers import InvestorProjectSerializer
+from .models import Project, InvestorProject, OversubscriptionError
+from .filters import InvestorProjectFilter
+from .serializers import FollowedProjectSerializer
+
+from startups.views import StandardResultsSetPagination
 
 from users.permissions import (IsInvestorRole, IsInvestorCompanySelected, IsStartupCompanySelected)
 
@@ -41,23 +45,15 @@ def follow(request, project_id):
     
     investor_id = request.user.user_info.company_id
 
-    # Check if a Project with given project_id exists
-    if not Project.objects.filter(pk=project_id):
+    # Checked and created under the locks of the project's funding ledger
+    try:
+        _, created = InvestorProject.follow(project_id, investor_id)
+    except Project.DoesNotExist:
         return Response({"error": "Project does not exist"},
                         status=status.HTTP_400_BAD_REQUEST)
-
-    # Check if an InvestorProject with the given project_id and investor_id already exists
-    if InvestorProject.objects.filter(project_id=project_id, investor_id=investor_id).exists():
+    if not created:
         return Response({"error": "Project is already followed by this investor"},
                         status=status.HTTP_400_BAD_REQUEST)
-    
-    # Create a new InvestorProject with share=0
-    investor_project = InvestorProject(
-        project_id=project_id,
-        investor_id=investor_id,
-        share=0
-    )
-    investor_project.save()
 
     return Response({"message": "Project shortlisted with zero share"},
                     status=status.HTTP_201_CREATED)
@@ -103,47 +99,26 @@ def subscription(request, project_id, share):
     
     investor_id = request.user.user_info.company_id
 
-    # Get the total share for the project
-    total_share = InvestorProject.get_total_funding(project_id)
-
-    # Check if the new share exceeds the total allowable share
+    # The share is checked and written under a lock on the project's funding ledger
     try:
-        existing_investor_project = InvestorProject.objects.get(project_id=project_id,
-                                                                investor_id=investor_id)
-        total_share -= existing_investor_project.share
-    except InvestorProject.DoesNotExist:
-        pass
-
-    if total_share + float(share) > 100:
-        available_share = 100 - total_share
+        _, created = InvestorProject.allocate_share(project_id, investor_id, int(share))
+    except Project.DoesNotExist:
+        return Response({"error": "Project does not exist"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    except OversubscriptionError as e:
         return Response(
-            {"error": f"Total share for the project cannot exceed 100%. Available share: {available_share}%"},
+            {"error": f"Total share for the project cannot exceed 100%. "
+                      f"Available share: {float(e.available_share)}%"},
             status=status.HTTP_400_BAD_REQUEST,
         )
-    # Check if an InvestorProject with the given project_id and investor_id already exists
-    try:
-        investor_project = InvestorProject.objects.get(project_id=project_id,
-                                                       investor_id=investor_id)
-        
-        investor_project.share = share
-        investor_project.save()
-
-        return Response(
-            {"message": f"Project share updated to {share}."}, status=status.HTTP_200_OK)
-
-    # If no record exists, create a new one
-    except InvestorProject.DoesNotExist:
-        investor_project = InvestorProject(
-            project_id=project_id,
-            investor_id=investor_id,
-            share=share
-        )
-        investor_project.save()
 
+    if created:
         return Response(
             {"message": f"Project subscribed with share {share}."},
             status=status.HTTP_201_CREATED
         )
+    return Response(
+        {"message": f"Project share updated to {share}."}, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -154,8 +129,8 @@ def delist_project(request, project_id):
 
     This function removes an `InvestorProject` instance for a specific investor and project,
     effectively delisting the project
-    for the investor. It fetches the `InvestorProject` record and deletes it, returning
-    a success message.
+    for the investor. The `InvestorProject` record is deleted through `InvestorProject.release_share`,
+    which locks the project's funding ledger before the record, returning a success message.
 
     Parameters:
         request (HttpRequest): The HTTP request indicating the project to be delisted.
@@ -171,48 +146,49 @@ def delist_project(request, project_id):
         - If successful, the function returns an HTTP 200 response with a success message.
     """
     investor_id = request.user.user_info.company_id
-    investor_project = get_object_or_404(InvestorProject, project_id=project_id,
-                                         investor_id=investor_id)
-    investor_project.delete()
+    try:
+        delisted = InvestorProject.release_share(project_id, investor_id)
+    except Project.DoesNotExist:
+        delisted = False
+    if not delisted:
+        raise Http404
 
     return Response({"message": "Project delisted for the investor"}, status=status.HTTP_200_OK)
 
 
-@api_view(['GET'])
-@permission_classes([IsInvestorCompanySelected | IsStartupCompanySelected])
-def view_followed_projects(request):
+class FollowedProjectListView(generics.ListAPIView):
     """
-    Retrieve a list of projects followed by an investor or created by a startup and followed
-    by investors.
+    Lists the projects followed by an investor, or the followers of a startup's projects, a page
+    at a time.
 
-    This function fetches a list of `InvestorProject` instances based on the user's role. 
-    If the user is an investor, it retrieves projects followed by that investor. 
-    If the user represents a startup, it retrieves projects followed by investors that belong
-    to that startup.
-
-    Parameters:
-        request (HttpRequest): The HTTP request to fetch the followed projects.
+    Each follow is returned with its project, startup and investor, read with `select_related` in
+    the page query, so a page costs one count and one data query whatever the number of followers.
 
-    Returns:
-        Response: A response containing the serialized list of followed projects.
-
-    Notes:
-        - If the user is an investor, the function retrieves projects that the investor follows.
-        - If the user represents a startup, it retrieves projects created by the startup that are
-        followed by investors.
-        - The response contains serialized data for the list of followed projects and returns
-        an HTTP 200 status upon success.
+    Query parameters:
+    - share_min, share_max: The range of the share, inclusive.
+    - status: The status of the project.
+    - ordering: `share`, `updated` (recency), or either with `-` for descending; `-updated` by default.
+    - page, page_size: The page and its size (at most 100).
     """
-    
-    user = request.user
-    if user.user_info.role == 'investor':
-        # Filter any Project(s) that the Investor follows
-        followed_projects = InvestorProject.objects.filter(investor__id=user.user_info.company_id)
-    else:
-        # Find projects created by the startup and followed by an investor
-        startup_id = user.user_info.company_id
-        followed_projects = InvestorProject.objects.filter(project__startup=startup_id)
-
-    # Serialize the data and return the list
-    serializer = InvestorProjectSerializer(followed_projects, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    serializer_class = FollowedProjectSerializer
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = InvestorProjectFilter
+    permission_classes = [IsInvestorCompanySelected | IsStartupCompanySelected]
+
+    def get_queryset(self):
+        user_info = self.request.user.user_info
+        if user_info.role == 'investor':
+            # Projects that the investor follows
+            queryset = InvestorProject.objects.filter(investor_id=user_info.company_id)
+        else:
+            # Projects of the startup followed by investors
+            queryset = InvestorProject.objects.filter(project__startup_id=user_info.company_id)
+        # Deleted projects are hidden until they are purged
+        queryset = queryset.filter(project__deleted_at__isnull=True)
+        return (queryset.select_related('project__startup', 'investor')
+                .only('id', 'share', 'updated_at',
+                      'project__id', 'project__name', 'project__status', 'project__allocated_share',
+                      'project__startup__id', 'project__startup__startup_name',
+                      'investor__id', 'investor__investor_name')
+                .order_by('-updated_at', '-id'))
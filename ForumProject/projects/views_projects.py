@@ -1,11 +1,18 @@
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.exceptions import NotFound
-from django.db.models.signals import post_save
-from .models import Project, ProjectFiles
-from .serializers import ProjectSerializer
-from .signals import create_update_project_file_log
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Cast, Coalesce
+from startups.views import StandardResultsSetPagination
+from .models import Project, InvestorProject, ProjectLog, SEARCH_CONFIG
+from .serializers import (HIGHLIGHT_START, HIGHLIGHT_STOP, ProjectSerializer, ProjectSearchSerializer,
+                          query_param_list)
+from .filters import ProjectFilter
+from . import bulk, deletion, history
 
 
 from users.permissions import (
@@ -16,6 +23,45 @@ from users.permissions import (
 )
 
 
+def _related_count(model):
+    """
+    Build a correlated subquery counting the rows of `model` that point to the outer Project.
+
+    Subqueries keep the two counts independent, unlike two joined COUNTs that would multiply
+    the shares by the log entries of every project.
+    """
+    return Coalesce(Subquery(
+        model.objects.filter(project=OuterRef('pk')).order_by()
+        .values('project').annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField()
+    ), 0)
+
+
+class ProjectSearchPagination(CursorPagination):
+    """
+    Cursor pagination of search results from the most to the least relevant.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # Ranks tie often, the ID makes the order unique so pages neither skip nor repeat rows
+    ordering = ('-rank', 'id')
+
+
+class ProjectListPagination(StandardResultsSetPagination):
+    """
+    Page number pagination of the project list, applied only when a page is requested.
+
+    The list used to be returned whole, so a request without `?page=` or `?page_size=` still gets
+    a plain list of projects; paginated responses have the `count`/`next`/`previous`/`results` shape.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not {self.page_query_param, self.page_size_query_param} & request.query_params.keys():
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
 class ProjectViewSet(viewsets.ModelViewSet):
     """
     ViewSet for interacting with Project objects.
@@ -23,19 +69,40 @@ class ProjectViewSet(viewsets.ModelViewSet):
     Attributes:
         queryset (QuerySet): The queryset of Project objects.
         serializer_class (Serializer): The serializer class for Project objects.
+        pagination_class (Pagination): Pages the list when `?page=` or `?page_size=` is given.
+        filterset_class (FilterSet): Screens the list by status, budget and duration ranges.
     """
     
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
+    pagination_class = ProjectListPagination
+    filterset_class = ProjectFilter
 
     def get_queryset(self):
+        """
+        Return the projects visible to the user with their relation counts annotated,
+        prefetching only the relation lists requested with `?expand=`.
+        """
         user = self.request.user
 
         if user.user_info.role == 'investor':
-            return Project.objects.all()
-        
-        startup_id = user.user_info.company_id
-        return Project.objects.filter(startup=startup_id)
+            queryset = Project.objects.all()
+        else:
+            startup_id = user.user_info.company_id
+            queryset = Project.objects.filter(startup=startup_id)
+
+        # search_vector is maintained by the database and never rendered
+        queryset = queryset.defer('search_vector').annotate(
+            share_count=_related_count(InvestorProject), log_count=_related_count(ProjectLog))
+        # Parsed like the serializer does, so every rendered relation list is prefetched
+        expand = query_param_list(self.request, 'expand')
+        if 'project_share' in expand:
+            queryset = queryset.prefetch_related(
+                Prefetch('project_share', queryset=InvestorProject.objects.only('id', 'project_id')))
+        if 'project_log' in expand:
+            queryset = queryset.prefetch_related(
+                Prefetch('project_log', queryset=ProjectLog.objects.only('id', 'project_id')))
+        return queryset
     
     def get_permissions(self):
         """
@@ -47,11 +114,11 @@ class ProjectViewSet(viewsets.ModelViewSet):
         Returns:
             List[BasePermission]: List of permission instances.
         """
-        if self.action == 'list':
+        if self.action in ['list', 'search']:
             permission_classes = [IsInvestorRole | IsStartupRole]
         elif self.action == 'retrieve':
             permission_classes = [IsInvestorRole | IsProjectMember]
-        elif self.action == 'create':
+        elif self.action in ['create', 'bulk_update']:
             permission_classes = [IsStartupCompanySelected]
         elif self.action in ['update', 'partial_update', 'destroy']:
             permission_classes = [IsStartupCompanySelected, IsProjectMember]
@@ -59,6 +126,70 @@ class ProjectViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    @action(detail=False, methods=['get'], pagination_class=ProjectSearchPagination,
+            serializer_class=ProjectSearchSerializer)
+    def search(self, request):
+        """
+        Full-text search over the visible projects.
+
+        The query (`?q=`) accepts web search syntax: quoted phrases, `or` and `-word`. It is matched
+        against the GIN-indexed `search_vector`, which weighs the project name over its description,
+        the startup name and the startup industry. Results are ordered by rank, carry HTML-escaped
+        fragments of the name and description with the matches in <b> tags, and are cursor-paginated.
+
+        Returns:
+            Response: A page of ranked results, or HTTP 400 if `q` is missing.
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"error": "Search query is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        highlight = {'config': SEARCH_CONFIG, 'start_sel': HIGHLIGHT_START, 'stop_sel': HIGHLIGHT_STOP}
+        queryset = self.get_queryset().filter(search_vector=query).annotate(
+            # ts_rank returns real; double precision survives the round trip through the cursor
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+            name_highlight=SearchHeadline('name', query, highlight_all=True, **highlight),
+            description_highlight=SearchHeadline('description', query, max_fragments=2, **highlight),
+        )
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['patch'], url_path='bulk')
+    def bulk_update(self, request):
+        """
+        Update several Projects of the user's startup at once, e.g. to close out a funding round.
+
+        The request holds the new field values of every Project with its ID:
+        `{"projects": [{"id": 1, "status": "closed"}, {"id": 2, "name": "...", "duration": 6}]}`.
+        The batch is validated as a whole and applied in one transaction with a single `bulk_update`
+        (see `projects.bulk`): every changed Project gets one log entry, all written at once, and every
+        investor following any of them gets one notification.
+
+        Returns:
+            Response: The IDs of the changed Projects with an HTTP 200 status code: `{"updated": [1, 2]}`.
+
+        Error Handling:
+            - A body that is not a JSON object, or a missing, empty or too long list returns an HTTP 400
+              status code.
+            - If any item is invalid or names a Project of another startup, no Project is updated and an
+              HTTP 400 status code is returned with the errors of every invalid item by its position.
+        """
+        if not isinstance(request.data, dict):
+            return Response({"error": "A JSON object with a list of projects is required"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            changed = bulk.update_projects(request.user.user_info.company_id, request.data.get('projects'),
+                                           context={'request': request})
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except bulk.BulkUpdateError as e:
+            return Response({"error": "No projects were updated", "errors": e.errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({"updated": [project.pk for project in changed]}, status=status.HTTP_200_OK)
+
     def create(self, request, *args, **kwargs):
         """
         Handle project creation and create a log upon success.
@@ -112,8 +243,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
             Exception: If an unexpected error occurs during the update.
 
         Log Creation:
-            If there are changes to the Project, the method creates a log entry to record the updated fields. 
-            The log captures the field names along with their old and new values.
+            The validated data is compared with a snapshot of the Project taken when it was loaded, and the
+            log entry records the changed fields with their old and new values (see `projects.history`).
+            An update that changes nothing is not saved and not logged.
 
         Error Handling:
             If an exception occurs during the update, a response with a status code `HTTP_500_INTERNAL_SERVER_ERROR` is returned 
@@ -121,20 +253,15 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """
         try:
             instance = self.get_object()
+            loaded = history.snapshot(instance)
             serializer = self.get_serializer(instance, data=request.data, partial=True, context={'request': request})
             serializer.is_valid(raise_exception=True)
-            
-            changes = []
-            for field in Project._meta.fields:
-                field_name = field.name
-                old_value = str(getattr(instance, field_name))
-                new_value = str(request.data.get(field_name, old_value))
-                if old_value != new_value:
-                    changes.append((field_name, old_value, new_value))
-            
-            if changes:
-                instance._changes = changes
-            
+
+            instance._changes = history.diff(loaded, serializer.validated_data)
+            if not instance._changes:
+                # Nothing changed: no write and no empty log entry, as in projects.bulk
+                return Response(serializer.data)
+
             serializer.save()
             
             return Response(serializer.data)
@@ -149,9 +276,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
         '''
         Delete an existing Project along with its associated files and ensure only one log entry is created.
 
-        This method handles the deletion of a Project instance, including its related ProjectFiles. 
-        It ensures that logs are created for both the project deletion and any associated file deletions
-        by marking the project instance with `_log_deletion = True`.
+        The Project is soft-deleted through `projects.deletion`: it is hidden at once, and its files,
+        shares and stored files are removed later in bounded chunks by the `purge_deleted` command,
+        so deleting a large Project does not hold up the request.
 
         Parameters:
             request (HttpRequest): The HTTP request indicating the Project to be deleted.
@@ -165,8 +292,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             NotFound: If the Project does not exist.
 
         Log Creation:
-            The method creates log entries for the project deletion and, if applicable, for each ProjectFile deleted during this process.
-            By marking the project instance with `_log_deletion = True`, it ensures that the log entry is created only once.
+            The method creates a single log entry for the project deletion; the deleted files are not logged one by one.
 
         Error Handling:
             If the Project does not exist, a `NotFound` exception is raised with an appropriate message.
@@ -175,16 +301,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         project_instance = self.get_object()
 
         try:
-            project_files = ProjectFiles.objects.filter(project=project_instance)
-
-            post_save.disconnect(create_update_project_file_log, sender=ProjectFiles)
-            for project_file in project_files:                
-                if project_file.file:
-                    project_file.file.delete()  # Delete from file system
-            
-            project_files.delete()
-            project_instance.delete()
-            post_save.connect(create_update_project_file_log, sender=ProjectFiles)
+            deletion.soft_delete_project(project_instance)
             return Response({"message": "Project and associated files deleted successfully"}, status=status.HTTP_200_OK)
         except Project.DoesNotExist:
             return Response({"error": "Project not found."}, status=status.HTTP_404_NOT_FOUND)
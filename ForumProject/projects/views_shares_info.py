@@ -1,10 +1,8 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
-from .models import Project, InvestorProject
-from .serializers import InvestorProjectSerializer
 from users.permissions import (IsStartupRole, IsStartupCompanySelected)
 from rest_framework import status
+from . import cap_table
 
 
 @api_view(['GET'])
@@ -12,7 +10,11 @@ from rest_framework import status
 def project_investor_shares(request, project_id):
     """
     View to get all investors and their shares for a specific project,
-    along with the total share.
+    along with the total and the remaining share.
+
+    Investors are listed from the largest share down, each with its name, rank and the running
+    total of the shares up to it. The breakdown is read in one query and cached until a share,
+    the project or an investor changes (see projects/cap_table.py).
 
     Parameters:
         request (HttpRequest): The HTTP request object.
@@ -20,22 +22,12 @@ def project_investor_shares(request, project_id):
 
     Returns:
         Response: A JSON response containing project details, investors' shares, and the total share.
-    """
-
-    project = get_object_or_404(Project, pk=project_id)
-    investor_projects = InvestorProject.objects.filter(project=project)
 
-    # Calculate total funding
-    total_funding = InvestorProject.get_total_funding(project_id)
-
-    # Serialize individual investor shares
-    investor_projects_serialized = InvestorProjectSerializer(investor_projects, many=True).data
-
-    # Prepare response data
-    data = {
-        'project': project.name,
-        'investors': investor_projects_serialized,
-        'total_share': total_funding
-    }
+    Error Handling:
+        - If the project does not exist, an HTTP 404 status code is returned.
+    """
 
+    data = cap_table.breakdown(project_id)
+    if data is None:
+        return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
     return Response(data, status=status.HTTP_200_OK)
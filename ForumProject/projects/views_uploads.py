@@ -0,0 +1,148 @@
+import re
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view, permission_classes
+from .models import Project, UploadSession
+from .serializers import ProjectFilesSerializer, UploadSessionSerializer
+from . import uploads
+
+from users.permissions import IsProjectMember
+
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+
+def _session_response(session, status_code=status.HTTP_200_OK):
+    '''
+    Serialize an upload session, repeating its progress in the `Upload-Offset` and `Upload-Length` headers.
+    '''
+    return Response(
+        UploadSessionSerializer(session).data,
+        status=status_code,
+        headers={'Upload-Offset': str(session.offset), 'Upload-Length': str(session.size)}
+    )
+
+
+@api_view(['POST'])
+@permission_classes([IsProjectMember])
+def upload_sessions(request, pk):
+    '''
+    Open a resumable upload session for a file of a specific Project.
+
+    The request body holds `file_name`, `file_description` and `size` (in bytes). The file is then sent
+    in chunks to the session URL and finalized, see `upload_session` and `finalize_upload`.
+
+    Parameters:
+        request (HttpRequest): The HTTP request with the file metadata.
+        pk (int): The ID of the Project the file is uploaded to.
+
+    Returns:
+        Response: The created session with an HTTP 201 status code.
+
+    Error Handling:
+        - Invalid metadata returns an HTTP 400 status code.
+        - A file that does not fit into the startup's storage quota returns an HTTP 413 status code.
+    '''
+    project = get_object_or_404(Project, id=pk)
+    serializer = UploadSessionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+        session = uploads.open_session(project, **serializer.validated_data)
+    except uploads.QuotaExceededError as e:
+        return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    return _session_response(session, status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'HEAD', 'PUT', 'DELETE'])
+@permission_classes([IsProjectMember])
+def upload_session(request, pk, session_id):
+    '''
+    Report the progress of an upload session, append a chunk to it or abort it.
+
+    - `GET` / `HEAD`: Returns the session; `offset` (also in the `Upload-Offset` header) is the position
+      the next chunk has to start at, e.g. after a dropped connection.
+    - `PUT`: Streams the raw request body into the file. The `Content-Range: bytes <first>-<last>/<size>`
+      header gives the position of the chunk, which must start at the current offset.
+    - `DELETE`: Aborts the upload and removes the partially uploaded file.
+
+    Parameters:
+        request (HttpRequest): The HTTP request.
+        pk (int): The ID of the Project the file is uploaded to.
+        session_id (UUID): The ID of the upload session.
+
+    Returns:
+        Response: The session with its new offset, or a success message for DELETE.
+
+    Error Handling:
+        - A missing or inconsistent `Content-Range` header returns an HTTP 400 status code.
+        - A chunk that does not start at the current offset, or arrives while another chunk of the session
+          is being written, returns an HTTP 409 status code with the session.
+        - A session finalized or aborted meanwhile returns an HTTP 404 status code.
+        - A chunk interrupted by the client keeps the bytes that arrived and returns an HTTP 400 status code.
+    '''
+    session = get_object_or_404(UploadSession, id=session_id, project_id=pk)
+
+    if request.method in ('GET', 'HEAD'):
+        return _session_response(session)
+
+    if request.method == 'DELETE':
+        uploads.discard_session(session)
+        return Response({"message": "Upload aborted"}, status=status.HTTP_200_OK)
+
+    match = CONTENT_RANGE.fullmatch(request.headers.get('Content-Range', ''))
+    if not match:
+        return Response({"error": "Content-Range header is required: bytes <first>-<last>/<size>"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    start, length = int(match[1]), int(match[2]) - int(match[1]) + 1
+    content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if length <= 0 or length != content_length or match[3] not in ('*', str(session.size)):
+        return Response({"error": "Content-Range does not match the chunk"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        uploads.write_chunk(session, start, length, request.stream)
+    except uploads.OffsetMismatchError:
+        return _session_response(session, status.HTTP_409_CONFLICT)
+    except uploads.SessionClosedError:
+        return Response({"error": "Upload session not found"}, status=status.HTTP_404_NOT_FOUND)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except OSError:
+        return Response({"error": "The chunk was interrupted", "offset": session.offset},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return _session_response(session)
+
+
+@api_view(['POST'])
+@permission_classes([IsProjectMember])
+def finalize_upload(request, pk, session_id):
+    '''
+    Finalize a complete upload into a ProjectFiles instance.
+
+    An optional `sha256` in the request body is compared with the digest of the uploaded file.
+
+    Parameters:
+        request (HttpRequest): The HTTP request.
+        pk (int): The ID of the Project the file is uploaded to.
+        session_id (UUID): The ID of the upload session.
+
+    Returns:
+        Response: The created ProjectFiles instance with an HTTP 201 status code.
+
+    Error Handling:
+        - An incomplete upload returns an HTTP 409 status code with the session.
+        - A session finalized or aborted by a concurrent request returns an HTTP 404 status code.
+        - A checksum mismatch discards the upload and returns an HTTP 400 status code.
+        - An expired session whose file no longer fits into the quota returns an HTTP 413 status code.
+    '''
+    session = get_object_or_404(UploadSession.objects.select_related('project'), id=session_id, project_id=pk)
+    try:
+        project_file = uploads.finalize_session(session, request.data.get('sha256'))
+    except uploads.OffsetMismatchError:
+        return _session_response(session, status.HTTP_409_CONFLICT)
+    except uploads.SessionClosedError:
+        return Response({"error": "Upload session not found"}, status=status.HTTP_404_NOT_FOUND)
+    except uploads.QuotaExceededError as e:
+        return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(ProjectFilesSerializer(project_file).data, status=status.HTTP_201_CREATED)
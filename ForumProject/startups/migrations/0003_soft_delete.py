@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-19 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('startups', '0002_startup_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='startup',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='startup',
+            name='startup_name',
+            field=models.CharField(max_length=150),
+        ),
+        migrations.AddIndex(
+            model_name='startup',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='startup_deleted_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='startup',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('startup_name',), name='unique_live_startup_name'),
+        ),
+    ]
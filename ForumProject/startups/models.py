@@ -3,6 +3,17 @@ from django.core.exceptions import ValidationError
 from .validation import phone_regex, image_validator
 from django_countries.fields import CountryField
 
+class SoftDeleteManager(models.Manager):
+    """
+    Manager hiding soft-deleted rows, i.e. rows whose `deleted_at` is set.
+
+    Models using it as their default manager keep a plain `all_objects` manager for the purge job
+    (see `projects.deletion`); related objects are still reachable from their foreign keys.
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Startup(models.Model):
     """
     Model representing a startup.
@@ -15,15 +26,34 @@ class Startup(models.Model):
         startup_city (str): The city where the startup is located.
         startup_address (str): The address of the startup.
         startup_logo (ImageField): The logo of the startup.
+        updated_at (datetime): When the startup was last modified, for incremental exports.
+        deleted_at (datetime): When the startup was deleted; it is hidden from then on and its rows
+            are removed later by the `purge_deleted` command.
     """
 
-    startup_name = models.CharField(max_length=150, unique=True) 
+    startup_name = models.CharField(max_length=150)
     startup_industry = models.CharField(max_length=50)
     startup_phone = models.CharField(max_length=20, validators=[phone_regex])
     startup_country = CountryField()
     startup_city = models.CharField(max_length=50)
     startup_address = models.CharField(max_length=150)
     startup_logo = models.ImageField(upload_to='media/startup_logos/', validators=[image_validator], null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        constraints = [
+            # Names of deleted startups waiting for the purge can be taken again
+            models.UniqueConstraint(fields=['startup_name'], condition=models.Q(deleted_at__isnull=True),
+                                    name='unique_live_startup_name'),
+        ]
+        indexes = [
+            models.Index(fields=['deleted_at'], condition=models.Q(deleted_at__isnull=False),
+                         name='startup_deleted_idx'),
+        ]
 
     def __str__(self):
         """
@@ -1,14 +1,15 @@
 from rest_framework import serializers
+from projects.delivery import SignedFilesMixin
 from .models import Startup
 
-class StartupSerializer(serializers.ModelSerializer):
+class StartupSerializer(SignedFilesMixin, serializers.ModelSerializer):
     """
     Serializer for the Startup model.
 
     Attributes:
         id (int): The ID of the startup (read-only).
         startup_name (str): The name of the startup.
-        startup_logo (ImageField): The logo of the startup.
+        startup_logo (ImageField): The logo of the startup, represented by a signed URL.
         startup_industry (str): The industry of the startup.
         startup_phone (str): The phone number of the startup.
         startup_country (CountryField): The country where the startup is located.
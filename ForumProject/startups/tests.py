@@ -138,7 +138,7 @@ class StartupCreationTestCase(TestCase):
         response = self.create_startup(self.startup_data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Startup.objects.count(), 2) #created in SetUp and in test exsists 
-        self.assertEqual(Startup.objects.all()[1].startup_name, 'Defaultstartup')
+        self.assertEqual(Startup.objects.order_by('id')[1].startup_name, 'Defaultstartup')
 
     @transaction.atomic
     def test_ok_create_two_startups(self):
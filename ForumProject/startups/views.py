@@ -7,6 +7,7 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from projects import deletion
 from projects.models import Project
 from users.models import UserStartup
 from users.permissions import (IsInvestorRole, IsStartupMember, IsStartupRole)
@@ -134,8 +135,9 @@ class StartupViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Cannot delete startup with ongoing projects.")
 
         # If the startup has all projects closed and the user is the owner,
-        # then deletion is possible
-        instance.delete()
+        # then deletion is possible: the startup and its projects are hidden at once
+        # and purged later by the purge_deleted command
+        deletion.soft_delete_startup(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -11,11 +11,13 @@ class SubscribeInvestorStartup(models.Model):
         investor (Investor): The investor following the startup.
         startup (Startup): The startup being followed by the investor.
         saved_at (DateTimeField): The datetime when the investor saved the startup.
+        updated_at (DateTimeField): When the subscription was last modified, for incremental exports.
     """
 
     investor = models.ForeignKey(Investor, on_delete=models.SET_NULL, null=True)
     startup = models.ForeignKey(Startup, on_delete=models.SET_NULL, null=True)
     saved_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     class Meta:
         unique_together = [['investor', 'startup']]
 
@@ -405,8 +405,8 @@ class SubscriptionTests(APITestCase):
 
         expected_data = {
             "project": None,
-            "startup": 79,
-            "investor": 41,
+            "startup": self.startup_profile.pk,
+            "investor": self.investor_profile.pk,
             "trigger": "Startup subscribers list changed",
             "initiator": "investor",
         }
@@ -442,8 +442,8 @@ class SubscriptionTests(APITestCase):
 
         expected_data2 = {
             "project": None,
-            "startup": 78,
-            "investor": 39,
+            "startup": self.startup_profile.pk,
+            "investor": self.investor_profile.pk,
             "trigger": "Startup profile updated",
             "initiator": "startup",
         }
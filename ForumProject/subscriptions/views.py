@@ -151,7 +151,8 @@ class SubscriptionMixin:
         Returns:
             Queryset: Subscriptions related to the user's investor profile.
         """
-        return SubscribeInvestorStartup.objects.filter(investor=user_investor)
+        # Deleted startups are hidden until they are purged
+        return SubscribeInvestorStartup.objects.filter(investor=user_investor, startup__deleted_at__isnull=True)
 
 class SubscriptionViewsets(viewsets.ModelViewSet, SubscriptionMixin):
     """
@@ -0,0 +1,101 @@
+"""
+Coalesced tracking of the time users were last seen.
+
+Every authenticated HTTP request and WebSocket event records the user's last-seen timestamp in a
+Redis hash with a single HSET, so no database write happens on the request path. The
+`flush_user_activity` management command periodically drains the hash and applies all timestamps
+to `CustomUser.last_seen` with one UPDATE statement; timestamps are only dropped from Redis once
+the UPDATE is committed.
+
+Functions:
+    touch: Records that a user has just been seen.
+    flush: Moves the recorded timestamps from Redis to the database.
+"""
+
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.db import connection, transaction
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, ResponseError
+
+from .models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+LAST_SEEN_KEY = 'users:last_seen'
+
+
+def touch(user_id, timestamp=None):
+    """
+    Records that a user has just been seen.
+
+    Tracking is best effort: a Redis outage must never fail the request being tracked, while any
+    other error propagates.
+
+    Parameters:
+    - user_id (int): The ID of the user.
+    - timestamp (float | None): Unix time of the activity, now by default.
+    """
+    try:
+        redis = get_redis_connection('default')
+    except NotImplementedError:
+        # The cache is not Redis (local settings, tests): activity is not tracked
+        return
+    try:
+        redis.hset(LAST_SEEN_KEY, user_id, int(timestamp or time.time()))
+    except RedisError as e:
+        logger.warning(f'Failed to record activity of user {user_id}: {str(e)}')
+
+
+def _merge_back(redis, flush_key, entries):
+    """
+    Returns the timestamps of a failed flush to the hash, keeping newer ones recorded meanwhile.
+    """
+    pipeline = redis.pipeline(transaction=True)
+    for user_id, timestamp in entries.items():
+        pipeline.hsetnx(LAST_SEEN_KEY, user_id, timestamp)
+    pipeline.delete(flush_key)
+    pipeline.execute()
+
+
+def flush():
+    """
+    Moves the recorded timestamps from Redis to the database.
+
+    The hash is atomically renamed to a key of this flush, so activity recorded while the flush runs
+    is kept for the next one. All timestamps are applied with a single UPDATE that never moves
+    `last_seen` backwards; the renamed hash is deleted once the UPDATE is committed, and merged back
+    into the hash if the UPDATE fails.
+
+    Returns:
+    - int: The number of users updated.
+    """
+    redis = get_redis_connection('default')
+    flush_key = f'{LAST_SEEN_KEY}:flush:{uuid.uuid4().hex}'
+    try:
+        redis.rename(LAST_SEEN_KEY, flush_key)
+    except ResponseError:
+        # Nothing was recorded since the last flush
+        return 0
+    entries = redis.hgetall(flush_key)
+
+    user_ids = [int(user_id) for user_id in entries]
+    last_seen = [datetime.fromtimestamp(int(timestamp), tz=timezone.utc) for timestamp in entries.values()]
+    table = CustomUser._meta.db_table
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET last_seen = activity.last_seen '
+                f'FROM unnest(%s::bigint[], %s::timestamptz[]) AS activity(id, last_seen) '
+                f'WHERE {table}.id = activity.id '
+                f'AND ({table}.last_seen IS NULL OR {table}.last_seen < activity.last_seen)',
+                [user_ids, last_seen]
+            )
+            transaction.on_commit(lambda: redis.delete(flush_key))
+            return cursor.rowcount
+    except Exception:
+        _merge_back(redis, flush_key, entries)
+        raise
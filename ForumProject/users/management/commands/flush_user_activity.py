@@ -0,0 +1,41 @@
+"""
+Management command that flushes the last-seen timestamps recorded in Redis to the database.
+
+Usage:
+    python manage.py flush_user_activity                 # flush once, e.g. from cron
+    python manage.py flush_user_activity --interval 60   # flush every minute until stopped
+"""
+
+import logging
+import time
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+from redis.exceptions import RedisError
+from users import activity
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Apply the last-seen timestamps recorded in Redis to the users table in one UPDATE.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep running and flush every INTERVAL seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                updated = activity.flush()
+                self.stdout.write(f'{updated} user(s) updated.')
+            except (RedisError, DatabaseError) as e:
+                # Outages are retried on the next interval, programming errors stop the command
+                if not options['interval']:
+                    raise
+                logger.error(f'Failed to flush user activity: {str(e)}')
+            if not options['interval']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,43 @@
+"""
+Management command that provisions users and their companies from a CSV or NDJSON file.
+
+Usage:
+    python manage.py import_users cohort.csv --domain forum.example.com
+    python manage.py import_users cohort.ndjson --chunk-size 1000 --workers 8
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from users.provisioning import provision_users, read_records
+
+
+class Command(BaseCommand):
+    help = 'Bulk import users, roles and companies from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the file to import.')
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='File format, derived from the file extension by default.')
+        parser.add_argument('--domain', default='localhost:8000',
+                            help='Domain used in the email verification links.')
+        parser.add_argument('--chunk-size', type=int, default=settings.USER_IMPORT_CHUNK_SIZE)
+        parser.add_argument('--workers', type=int, default=settings.USER_IMPORT_WORKERS,
+                            help='Password hashing processes (0 hashes in-process).')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if file_format not in ('csv', 'ndjson'):
+            raise CommandError('Format should be csv or ndjson')
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = provision_users(read_records(stream, file_format), options['domain'],
+                                         chunk_size=options['chunk_size'], workers=options['workers'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except UnicodeDecodeError as e:
+            raise CommandError(f'File should be UTF-8 encoded, the records before the error were imported: {e}')
+
+        for error in report['errors']:
+            self.stderr.write(f'Record {error["record"]}: {error["error"]}')
+        self.stdout.write(f'{report["created"]} user(s) created, {report["skipped"]} skipped, '
+                          f'{len(report["errors"])} invalid.')
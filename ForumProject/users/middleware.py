@@ -1,3 +1,6 @@
+from . import activity
+
+
 class JWTAuthMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -13,3 +16,22 @@ class JWTAuthMiddleware:
         response = self.get_response(request)
 
         return response
+
+
+class ActivityTrackingMiddleware:
+    """
+    Records the last-seen time of authenticated users with a single Redis command per request.
+
+    The check runs after the view, so users authenticated by DRF (JWT) are tracked as well.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            activity.touch(user.pk)
+
+        return response
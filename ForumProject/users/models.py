@@ -69,6 +69,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     - is_active (BooleanField): A flag indicating whether the user account is active.
     - is_staff (BooleanField): A flag indicating whether the user has staff access.
     - is_superuser (BooleanField): A flag indicating whether the user is a superuser.
+    - last_seen (DateTimeField): The time of the user's last activity, flushed from Redis
+      periodically by the `flush_user_activity` command.
 
     Manager:
     - objects: The default manager for the CustomUser model.
@@ -100,6 +102,7 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
+    last_seen = models.DateTimeField(null=True, blank=True, db_index=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'phone_number']
@@ -1,7 +1,7 @@
 from django.shortcuts import get_object_or_404
 from rest_framework.permissions import BasePermission
 from .models import UserStartup
-from projects.models import Project
+from projects.models import InvestorProject, Project
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
@@ -189,8 +189,8 @@ class IsProjectMember(BasePermission):
     Permission class to check if the authenticated user is a member of
     the startup associated with a project.
 
-    The user is considered a member if their company_id matches
-    the ID of the startup associated with the project.
+    The user is considered a member if their role is startup and their company_id matches
+    the ID of the startup associated with the project; investor and startup IDs overlap.
     """
     def has_permission(self, request, view):
         """
@@ -206,11 +206,39 @@ class IsProjectMember(BasePermission):
         """
         try:
             project = get_object_or_404(Project, pk=view.kwargs['pk'])
-            return request.user.user_info.company_id == project.startup.id
+            user_info = request.user.user_info
+            return user_info.role == 'startup' and user_info.company_id == project.startup_id
         except AttributeError:
             return False
 
 
+class IsProjectFollower(BasePermission):
+    """
+    Permission class to check if the authenticated user is an investor following a project.
+
+    The user is considered a follower if their selected investor holds a share of the project.
+    """
+    def has_permission(self, request, view):
+        """
+        Check if the authenticated user's investor holds a share of the project.
+
+        Args:
+            request: The request object.
+            view: The view object.
+
+        Returns:
+            bool: True if the user is an investor following the project, False otherwise.
+        """
+        try:
+            user_info = request.user.user_info
+        except AttributeError:
+            return False
+        if user_info.role != 'investor' or not user_info.company_id:
+            return False
+        return InvestorProject.objects.filter(project_id=view.kwargs['pk'], investor_id=user_info.company_id,
+                                              project__deleted_at__isnull=True).exists()
+
+
 class IsStartupMember(BasePermission):
     """
     Permission class to check if the authenticated user is a member of a startup.
@@ -0,0 +1,307 @@
+"""
+Bulk provisioning of users and their companies.
+
+This module imports accounts from CSV or NDJSON streams in chunks. Every chunk hashes its
+passwords in a worker pool (processes for the `import_users` command, a few threads within an API
+request; PBKDF2 releases the GIL) and writes users, roles, company links, companies and notification
+preferences with one `bulk_create` per table, then queues all verification emails with one INSERT.
+`bulk_create` bypasses model signals, so the rows that signals would otherwise create (such as
+notification preferences and chat directory contacts) are created here explicitly.
+
+Record fields:
+    email, first_name, last_name, phone_number (required);
+    password (optional, an unusable password is set when it is missing);
+    role ('startup' or 'investor', required);
+    company_name, company_industry, company_phone, company_country, company_city,
+    company_address (optional; the company is validated like on the API and created, a company of
+    that name that was not created by the same import is not joined and the record is rejected).
+
+Functions:
+    read_records: Iterates over the records of a CSV or NDJSON stream.
+    provision_users: Creates users and companies from records in chunks.
+"""
+
+import csv
+import io
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils.text import capfirst
+from rest_framework.exceptions import ValidationError
+
+from communications.models import ChatContact
+from investors.models import Investor
+from investors.serializers import InvestorSerializer
+from notifications.models import StartupNotificationPrefs, InvestorNotificationPrefs
+from notifications.utils import queue_emails
+from startups.models import Startup
+from startups.serializers import StartupSerializer
+from .models import CustomUser, UserRoleCompany, UserStartup, UserInvestor
+from .tokens import make_token, VERIFY_EMAIL
+from .utils import Util
+from .validators import CustomUserValidator
+
+logger = logging.getLogger(__name__)
+
+COMPANY_MODELS = {
+    'startup': (Startup, 'startup', UserStartup, StartupNotificationPrefs, StartupSerializer),
+    'investor': (Investor, 'investor', UserInvestor, InvestorNotificationPrefs, InvestorSerializer),
+}
+COMPANY_FIELDS = ('name', 'industry', 'phone', 'country', 'city', 'address')
+
+VERIFICATION_MESSAGE = {
+    'subject': 'Verify your email',
+    'body': ' Use the link below to verify your email \n'
+}
+
+
+class RecordError(ValueError):
+    """
+    A line of a stream that does not hold a record, yielded by `read_records` in its place.
+    """
+
+
+def read_records(stream, file_format):
+    """
+    Iterates over the records of a CSV or NDJSON stream without loading it into memory.
+
+    An NDJSON line that is not valid JSON or not a JSON object is yielded as a `RecordError`, so
+    that callers can report it with the record number and carry on, or raise it.
+
+    Parameters:
+    - stream (file): A binary or text file object.
+    - file_format (str): 'csv' or 'ndjson'.
+
+    Yields:
+    - dict | RecordError: One record per row or line.
+
+    Raises:
+    - UnicodeDecodeError: If a binary stream is not UTF-8 encoded.
+    """
+    wrapper = None
+    if isinstance(stream.read(0), bytes):
+        stream = wrapper = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if file_format == 'csv':
+            yield from csv.DictReader(stream)
+        elif file_format == 'ndjson':
+            for line in stream:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield RecordError(f'Invalid JSON: {e.msg}')
+                    continue
+                yield record if isinstance(record, dict) else RecordError('Record should be a JSON object')
+        else:
+            raise ValueError(f'Unsupported format: {file_format}')
+    finally:
+        # The binary stream stays open for the caller, e.g. to read it again after counting the records
+        if wrapper is not None:
+            wrapper.detach()
+
+
+def _validate_record(record):
+    """
+    Validates and normalizes a single record.
+
+    Returns:
+    - dict: The normalized record.
+
+    Raises:
+    - ValueError: If the record is invalid.
+    """
+    if isinstance(record, RecordError):
+        raise record
+    record = {key: str(value).strip() for key, value in record.items() if key and value is not None}
+    try:
+        validate_email(record.get('email') or '')
+    except DjangoValidationError:
+        raise ValueError('Invalid email')
+    record['email'] = CustomUser.objects.normalize_email(record['email'])
+    for field in ('first_name', 'last_name'):
+        if not record.get(field) or len(record[field]) > CustomUser._meta.get_field(field).max_length:
+            raise ValueError(f'Invalid {field}')
+    if record.get('role') not in COMPANY_MODELS:
+        raise ValueError('Role should be a startup or an investor')
+    try:
+        CustomUserValidator.validate_phone_number(record.get('phone_number') or '')
+        if record.get('password'):
+            CustomUserValidator.validate_password(record['password'])
+    except ValidationError as error:
+        raise ValueError(' '.join(str(detail) for detail in error.detail))
+    return record
+
+
+def _hash_passwords(passwords, executor):
+    """
+    Hashes passwords in the worker pool, or in the calling thread when no pool is given.
+    """
+    if executor is None:
+        return [make_password(password) for password in passwords]
+    return list(executor.map(make_password, passwords, chunksize=16))
+
+
+def _validate_companies(role, records, imported):
+    """
+    Validates the companies of one role that the records would create, with the serializer of
+    the API.
+
+    Companies that already exist and were not created by this import are rejected: their owners
+    invite their members, the import does not attach users to them.
+
+    Returns:
+    - tuple[dict, dict]: The validated data of the new companies and the errors of the invalid
+      ones, both by the company name of the records.
+    """
+    model, prefix, _, _, serializer_class = COMPANY_MODELS[role]
+    name_field = f'{prefix}_name'
+    wanted = {}
+    for record in records:
+        name = record.get('company_name')
+        if record['role'] == role and name and name not in imported[role]:
+            wanted.setdefault(name, record)
+
+    existing = set(model.objects.filter(**{f'{name_field}__in': list(wanted)}).values_list(name_field, flat=True))
+    new, errors = {}, {}
+    for name, record in wanted.items():
+        if name in existing:
+            errors[name] = f'{capfirst(model._meta.verbose_name)} {name} already exists'
+            continue
+        serializer = serializer_class(data={f'{prefix}_{field}': record.get(f'company_{field}', '')
+                                            for field in COMPANY_FIELDS})
+        if serializer.is_valid():
+            new[name] = serializer.validated_data
+        else:
+            errors[name] = ' '.join(f"{key.replace(prefix, 'company', 1)}: {' '.join(map(str, messages))}"
+                                    for key, messages in serializer.errors.items())
+    return new, errors
+
+
+def _create_companies(role, new, imported):
+    """
+    Creates the validated companies of one role and their notification preferences in bulk,
+    adding them to the companies created by this import.
+    """
+    model, prefix, _, prefs_model, _ = COMPANY_MODELS[role]
+    if not new:
+        return
+    companies = model.objects.bulk_create([model(**data) for data in new.values()])
+    prefs_model.objects.bulk_create([prefs_model(**{prefix: company}) for company in companies])
+    imported[role].update(zip(new, companies))
+
+
+def _provision_chunk(records, executor, site, report, imported):
+    """
+    Creates the users of one chunk together with their roles, companies and links.
+    """
+    valid = []
+    for number, record in records:
+        try:
+            valid.append((number, _validate_record(record)))
+        except ValueError as error:
+            report['errors'].append({'record': number, 'error': str(error)})
+
+    existing = set(CustomUser.objects.filter(
+        email__in=[record['email'] for _, record in valid]).values_list('email', flat=True))
+    unique = {}
+    for number, record in valid:
+        if record['email'] in existing or record['email'] in unique:
+            report['skipped'] += 1
+        else:
+            unique[record['email']] = (number, record)
+
+    new_companies = {}
+    for role in COMPANY_MODELS:
+        new_companies[role], errors = _validate_companies(
+            role, [record for _, record in unique.values()], imported)
+        for email, (number, record) in list(unique.items()):
+            if record['role'] == role and record.get('company_name') in errors:
+                report['errors'].append({'record': number, 'error': errors[record['company_name']]})
+                del unique[email]
+    records = [record for _, record in unique.values()]
+    if not records:
+        return
+
+    hashes = _hash_passwords([record.get('password') or None for record in records], executor)
+
+    with transaction.atomic():
+        for role, new in new_companies.items():
+            _create_companies(role, new, imported)
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email=record['email'], first_name=record['first_name'],
+                       last_name=record['last_name'], phone_number=record['phone_number'],
+                       password=password_hash)
+            for record, password_hash in zip(records, hashes)
+        ])
+
+        roles, links = [], {role: [] for role in COMPANY_MODELS}
+        for user, record in zip(users, records):
+            company = imported[record['role']].get(record.get('company_name'))
+            roles.append(UserRoleCompany(user=user, role=record['role'],
+                                         company_id=company.pk if company else None))
+            if company:
+                _, prefix, link_model, _, _ = COMPANY_MODELS[record['role']]
+                links[record['role']].append(
+                    link_model(**{'customuser': user, prefix: company, f'{prefix}_role_id': 1}))
+        UserRoleCompany.objects.bulk_create(roles)
+        for role, role_links in links.items():
+            COMPANY_MODELS[role][2].objects.bulk_create(role_links)
+        ChatContact.objects.bulk_create([
+            ChatContact.from_membership(link, user=link.customuser, startup=link.startup, role='startup')
+            for link in links['startup']
+        ])
+
+        queue_emails([
+            Util.verification_email(site, 'users:email-verify', user, make_token(user, VERIFY_EMAIL),
+                                    VERIFICATION_MESSAGE)
+            for user in users
+        ])
+
+    report['created'] += len(users)
+
+
+def provision_users(records, site, chunk_size=500, workers=None, processes=True):
+    """
+    Creates users and companies from records in chunks.
+
+    Each chunk is committed in its own transaction, so an import can be re-run after a failure:
+    emails that already exist are skipped.
+
+    Parameters:
+    - records (iterable[dict]): The records to import, see the module docstring.
+    - site (str): The domain used in the verification links.
+    - chunk_size (int): The number of records written per transaction.
+    - workers (int | None): Size of the password hashing pool, 0 hashes in the calling thread,
+      None uses one process per CPU.
+    - processes (bool): Whether the pool runs processes or, e.g. within a request, threads.
+
+    Returns:
+    - dict: A report with the number of created and skipped users and per-record errors.
+    """
+    report = {'created': 0, 'skipped': 0, 'errors': []}
+    numbered = enumerate(records, start=1)
+    # The companies created by this import, by role and name; later chunks join them
+    imported = {role: {} for role in COMPANY_MODELS}
+    if workers == 0:
+        executor = None
+    elif processes:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while chunk := list(islice(numbered, chunk_size)):
+            _provision_chunk(chunk, executor, site, report, imported)
+            logger.info(f'Provisioned {report["created"]} users so far')
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return report
@@ -1,4 +1,13 @@
-from unittest.mock import patch
+import io
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -7,8 +16,11 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.test import TestCase, Client
 
 from rest_framework.test import APIClient
-from users.models import CustomUser
+from users.models import CustomUser, UserStartup
 from django.urls import reverse
+from notifications.models import OutgoingEmail, StartupNotificationPrefs
+from startups.models import Startup
+from users import activity, tokens
 
 
 class UserRegistration(APITestCase):
@@ -111,7 +123,7 @@ class PasswordResetViewTests(APITestCase):
     @classmethod
     def setUpTestData(cls):
         cls.user = CustomUser.objects.create_user(email='test@gmail.com', password='Pa88word_')
-        cls.token = RefreshToken.for_user(cls.user).access_token
+        cls.token = tokens.make_token(cls.user, tokens.RESET_PASSWORD)
 
     def test_successful_password_reset(self):
         new_password = 'NewPa55word_'
@@ -179,6 +191,62 @@ class PasswordResetViewTests(APITestCase):
         self.assertEqual(response.data['error'], 'Invalid token')
 
 
+class SingleUseTokenTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='test@gmail.com', password='Pa88word_')
+
+    def test_verify_email(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        token = tokens.make_token(self.user, tokens.VERIFY_EMAIL)
+        url = reverse('users:email-verify', args=(token,))
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+    def test_token_is_single_use(self):
+        token = tokens.make_token(self.user, tokens.RESET_PASSWORD)
+        url = reverse('users:password-reset', args=(token,))
+        data = {'password': 'NewPa55word_', 'password2': 'NewPa55word_'}
+        self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_200_OK)
+
+        data = {'password': 'OtherPa55word_', 'password2': 'OtherPa55word_'}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['error'], 'Invalid token')
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('NewPa55word_'))
+
+    def test_token_of_another_purpose_is_rejected(self):
+        token = tokens.make_token(self.user, tokens.VERIFY_EMAIL)
+        url = reverse('users:password-reset', args=(token,))
+        data = {'password': 'NewPa55word_', 'password2': 'NewPa55word_'}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Pa88word_'))
+
+    def test_login_tokens_are_rejected(self):
+        refresh = RefreshToken.for_user(self.user)
+        data = {'password': 'NewPa55word_', 'password2': 'NewPa55word_'}
+        for token in (refresh, refresh.access_token):
+            response = self.client.post(reverse('users:password-reset', args=(token,)), data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Pa88word_'))
+
+    def test_token_survives_failed_update(self):
+        token = str(tokens.make_token(self.user, tokens.RESET_PASSWORD))
+        with patch('users.tokens.make_password', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                tokens.reset_password(token, 'NewPa55word_')
+
+        self.assertTrue(tokens.reset_password(token, 'NewPa55word_'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('NewPa55word_'))
+
+
 class TokenObtainPairViewTests(APITestCase):
     @classmethod
     def setUpTestData(cls):
@@ -273,3 +341,201 @@ class LogoutViewTest(TestCase):
         response = self.client.post(self.logout_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertIn("Authentication credentials were not provided.", response.data["detail"])
+
+
+class BulkUserImportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(email='admin@gmail.com', password='Pa88word_')
+        cls.url = reverse('users:bulk-import')
+        cls.header = ('email,first_name,last_name,phone_number,password,role,company_name,'
+                      'company_industry,company_phone,company_country,company_city,company_address\n')
+
+    def upload(self, content, name='cohort.csv', user=None):
+        self.client.force_authenticate(user or self.admin)
+        if isinstance(content, str):
+            content = content.encode()
+        return self.client.post(self.url, {'file': SimpleUploadedFile(name, content)},
+                                format='multipart')
+
+    @override_settings(USER_IMPORT_REQUEST_WORKERS=0)
+    def test_import_csv(self):
+        content = self.header + (
+            'one@gmail.com,One,User,+380974131765,Rootroot1$,startup,Cohort One,IT,+380974131765,UA,Lviv,Addr\n'
+            'two@gmail.com,Two,User,+380974131766,,startup,Cohort One,IT,+380974131765,UA,Lviv,Addr\n'
+            'three@gmail.com,Three,User,+380974131767,Rootroot1$,investor,Fund,Finance,+380974131765,UA,Kyiv,Addr\n'
+            'broken,Four,User,+380974131768,Rootroot1$,startup,,,,,,\n'
+        )
+        response = self.upload(content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['errors'], [{'record': 4, 'error': 'Invalid email'}])
+
+        startup = Startup.objects.get(startup_name='Cohort One')
+        self.assertEqual(UserStartup.objects.filter(startup=startup).count(), 2)
+        self.assertTrue(StartupNotificationPrefs.objects.filter(startup=startup).exists())
+        investor_user = CustomUser.objects.get(email='three@gmail.com')
+        self.assertEqual(investor_user.user_info.role, 'investor')
+        self.assertTrue(investor_user.check_password('Rootroot1$'))
+        self.assertFalse(CustomUser.objects.get(email='two@gmail.com').has_usable_password())
+        self.assertEqual(OutgoingEmail.objects.count(), 3)
+
+        # Re-running the import skips the accounts that already exist
+        response = self.upload(content)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['skipped'], 3)
+
+    @override_settings(USER_IMPORT_REQUEST_WORKERS=2)
+    def test_import_ndjson_with_hashing_threads(self):
+        content = '\n'.join(json.dumps({
+            'email': f'user{i}@gmail.com', 'first_name': 'User', 'last_name': str(i),
+            'phone_number': f'+38097413176{i}', 'password': 'Rootroot1$', 'role': 'investor'
+        }) for i in range(3))
+        with patch('users.provisioning.ProcessPoolExecutor') as process_pool:
+            response = self.upload(content, name='cohort.ndjson')
+        process_pool.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 3)
+        self.assertTrue(CustomUser.objects.get(email='user2@gmail.com').check_password('Rootroot1$'))
+
+    def test_command_hashes_in_process_pool(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as stream:
+            stream.write(json.dumps({'email': 'pool@gmail.com', 'first_name': 'Pool', 'last_name': 'User',
+                                     'phone_number': '+380974131765', 'password': 'Rootroot1$',
+                                     'role': 'investor'}))
+        self.addCleanup(os.remove, stream.name)
+        call_command('import_users', stream.name, '--workers', '2', stdout=io.StringIO())
+        self.assertTrue(CustomUser.objects.get(email='pool@gmail.com').check_password('Rootroot1$'))
+
+    @override_settings(USER_IMPORT_REQUEST_WORKERS=0)
+    def test_companies_are_validated_and_existing_ones_are_not_joined(self):
+        Startup.objects.create(startup_name='Taken', startup_industry='IT', startup_phone='+380974131765',
+                               startup_country='UA', startup_city='Lviv', startup_address='Addr')
+        content = self.header + (
+            'one@gmail.com,One,User,+380974131765,,startup,Taken,IT,+380974131765,UA,Lviv,Addr\n'
+            'two@gmail.com,Two,User,+380974131766,,startup,No Phone,IT,call us,UA,Lviv,Addr\n'
+            'three@gmail.com,Three,User,+380974131767,,startup,No City,IT,+380974131765,UA,,Addr\n'
+        )
+        response = self.upload(content)
+        self.assertEqual(response.data['created'], 0)
+        errors = {error['record']: error['error'] for error in response.data['errors']}
+        self.assertEqual(errors[1], 'Startup Taken already exists')
+        self.assertTrue(errors[2].startswith('company_phone:'))
+        self.assertTrue(errors[3].startswith('company_city:'))
+        self.assertEqual(Startup.objects.count(), 1)
+        self.assertFalse(UserStartup.objects.exists())
+
+    @override_settings(USER_IMPORT_REQUEST_WORKERS=0, USER_IMPORT_CHUNK_SIZE=1)
+    def test_later_chunks_join_companies_created_by_the_import(self):
+        content = self.header + ''.join(
+            f'{number}@gmail.com,User,{number},+38097413176{number},,startup,Cohort,IT,+380974131765,UA,Lviv,Addr\n'
+            for number in range(2))
+        response = self.upload(content)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(UserStartup.objects.filter(startup__startup_name='Cohort').count(), 2)
+
+    def test_malformed_ndjson_lines_are_reported_per_record(self):
+        user = {'email': 'valid@gmail.com', 'first_name': 'Valid', 'last_name': 'User',
+                'phone_number': '+380974131765', 'role': 'investor'}
+        content = '\n'.join(['{"email": ', '[]', json.dumps(user), '1'])
+        response = self.upload(content, name='cohort.ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['record'] for error in response.data['errors']], [1, 2, 4])
+        self.assertTrue(response.data['errors'][0]['error'].startswith('Invalid JSON'))
+        self.assertEqual(response.data['errors'][1]['error'], 'Record should be a JSON object')
+
+    def test_import_requires_admin(self):
+        user = CustomUser.objects.create_user(email='user@gmail.com', password='Pa88word_')
+        response = self.upload(self.header, user=user)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_unsupported_format(self):
+        response = self.upload(self.header, name='cohort.xlsx')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_file_that_is_not_utf8_is_rejected(self):
+        content = (self.header + 'one@gmail.com,Jos\xe9,User,+380974131765,,investor,,,,,,\n').encode('latin-1')
+        response = self.upload(content)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': 'File should be UTF-8 encoded'})
+        self.assertFalse(CustomUser.objects.filter(email='one@gmail.com').exists())
+
+    @override_settings(USER_IMPORT_MAX_RECORDS=1, USER_IMPORT_REQUEST_WORKERS=0)
+    def test_file_over_the_record_limit_is_rejected(self):
+        content = self.header + ''.join(
+            f'{number}@gmail.com,User,{number},+38097413176{number},,investor,,,,,,\n' for number in range(2))
+        response = self.upload(content)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('import_users', response.data['error'])
+        self.assertFalse(CustomUser.objects.filter(email__in=['0@gmail.com', '1@gmail.com']).exists())
+
+        response = self.upload(self.header + content.splitlines(keepends=True)[1])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+
+
+class UserActivityTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='user@gmail.com', password='Pa88word_')
+
+    def test_authenticated_request_records_activity(self):
+        self.client.force_authenticate(self.user)
+        with patch('users.middleware.activity.touch') as touch:
+            self.client.post(reverse('users:bulk-import'))
+        touch.assert_called_once_with(self.user.pk)
+
+    def test_anonymous_request_is_not_tracked(self):
+        with patch('users.middleware.activity.touch') as touch:
+            self.client.post(reverse('users:bulk-import'))
+        touch.assert_not_called()
+
+    def test_redis_outage_does_not_fail_the_request(self):
+        redis = MagicMock()
+        redis.hset.side_effect = RedisConnectionError('Connection refused')
+        with patch('users.activity.get_redis_connection', return_value=redis):
+            activity.touch(self.user.pk)
+            redis.hset.side_effect = TypeError('bad timestamp')
+            with self.assertRaises(TypeError):
+                activity.touch(self.user.pk)
+
+    def test_flush_applies_latest_timestamps(self):
+        redis = MagicMock()
+        redis.hgetall.return_value = {str(self.user.pk).encode(): b'1700000000'}
+        with patch('users.activity.get_redis_connection', return_value=redis):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(activity.flush(), 1)
+            self.user.refresh_from_db()
+            self.assertEqual(self.user.last_seen.timestamp(), 1700000000)
+            flush_key = redis.rename.call_args.args[1]
+            redis.hgetall.assert_called_once_with(flush_key)
+            redis.delete.assert_called_once_with(flush_key)
+
+            # An older timestamp never moves last_seen backwards
+            redis.hgetall.return_value = {str(self.user.pk).encode(): b'1600000000'}
+            self.assertEqual(activity.flush(), 0)
+            self.user.refresh_from_db()
+            self.assertEqual(self.user.last_seen.timestamp(), 1700000000)
+
+    def test_failed_flush_merges_timestamps_back(self):
+        redis = MagicMock()
+        redis.hgetall.return_value = {b'1': b'1700000000', b'2': b'1700000001'}
+        with patch('users.activity.get_redis_connection', return_value=redis), \
+                patch('users.activity.connection.cursor', side_effect=DatabaseError('Connection lost')):
+            with self.assertRaises(DatabaseError):
+                activity.flush()
+
+        flush_key = redis.rename.call_args.args[1]
+        pipeline = redis.pipeline.return_value
+        self.assertEqual([call.args for call in pipeline.hsetnx.call_args_list],
+                         [(activity.LAST_SEEN_KEY, b'1', b'1700000000'),
+                          (activity.LAST_SEEN_KEY, b'2', b'1700000001')])
+        pipeline.delete.assert_called_once_with(flush_key)
+        redis.delete.assert_not_called()
+
+    def test_flush_without_activity_writes_nothing(self):
+        redis = MagicMock()
+        redis.rename.side_effect = ResponseError('no such key')
+        with patch('users.activity.get_redis_connection', return_value=redis), self.assertNumQueries(0):
+            self.assertEqual(activity.flush(), 0)
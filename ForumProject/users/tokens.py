@@ -0,0 +1,136 @@
+"""
+Single-use tokens for email verification and password reset.
+
+Tokens are signed and expire like the access tokens of the project, but have their own
+`token_type` and a `purpose` claim: login access and refresh tokens, which carry no purpose, are
+rejected here, and single-use tokens are rejected by the API authentication. Each token can be used
+once: in the transaction of its UPDATE, its `jti` is added to a Redis-backed set of used tokens with
+an atomic `cache.add` that expires together with the token, so a failed UPDATE does not use it up.
+Verification needs no user fetch, the decoded claims drive a single conditional UPDATE.
+
+Functions:
+    make_token: Issues a single-use token for a user.
+    consume_token: Validates a token and marks it as used.
+    verify_email: Activates the user a verification token was issued for.
+    reset_password: Sets a new password for the user a reset token was issued for.
+
+Invalid, reused or foreign-purpose tokens raise `jwt.InvalidTokenError`,
+expired tokens raise `jwt.ExpiredSignatureError`.
+"""
+
+import time
+
+import jwt
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import CustomUser
+
+VERIFY_EMAIL = 'verify_email'
+RESET_PASSWORD = 'reset_password'
+
+USED_TOKEN_KEY = 'users:used_token:{}'
+
+
+class SingleUseToken(AccessToken):
+    """
+    An access token that only the single-use token endpoints accept.
+    """
+    token_type = 'single_use'
+
+
+def make_token(user, purpose):
+    """
+    Issues a single-use token for a user.
+
+    Parameters:
+    - user (CustomUser): The user the token is issued for.
+    - purpose (str): VERIFY_EMAIL or RESET_PASSWORD.
+
+    Returns:
+    - SingleUseToken: The token, `str()` gives the encoded JWT.
+    """
+    token = SingleUseToken.for_user(user)
+    token['purpose'] = purpose
+    return token
+
+
+def _decode(token, purpose):
+    """
+    Decodes a single-use token issued for `purpose`, returning its claims.
+    """
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.SIMPLE_JWT['ALGORITHM']])
+    if payload.get('token_type') != SingleUseToken.token_type or payload.get('purpose') != purpose:
+        raise jwt.InvalidTokenError('Token was not issued for this purpose')
+    if 'jti' not in payload or 'user_id' not in payload:
+        raise jwt.InvalidTokenError('Token is missing required claims')
+    return payload
+
+
+def _mark_used(payload):
+    # SET NX: of several concurrent requests with the same token only one gets through
+    timeout = max(int(payload.get('exp', 0) - time.time()), 1)
+    if not cache.add(USED_TOKEN_KEY.format(payload['jti']), 1, timeout=timeout):
+        raise jwt.InvalidTokenError('Token has already been used')
+
+
+def consume_token(token, purpose):
+    """
+    Validates a token and marks it as used.
+
+    Parameters:
+    - token (str): The encoded JWT.
+    - purpose (str): The purpose the token must have been issued for.
+
+    Returns:
+    - int: The ID of the user the token was issued for.
+
+    Raises:
+    - jwt.ExpiredSignatureError: If the token has expired.
+    - jwt.InvalidTokenError: If the token is malformed, not a single-use token (e.g. a login
+      access or refresh token), issued for another purpose or already used.
+    """
+    payload = _decode(token, purpose)
+    _mark_used(payload)
+    return payload['user_id']
+
+
+def _apply(token, purpose, update):
+    """
+    Runs the UPDATE of a token, marking the token as used only once the UPDATE has succeeded.
+
+    The mark is made before the commit: of several concurrent requests with the same token, the
+    first marks it and the others roll their UPDATE back.
+    """
+    payload = _decode(token, purpose)
+    with transaction.atomic():
+        result = update(payload['user_id'])
+        _mark_used(payload)
+    return result
+
+
+def verify_email(token):
+    """
+    Activates the user a verification token was issued for.
+
+    The UPDATE only touches inactive users, so re-verifying an active account writes nothing.
+
+    Returns:
+    - bool: True if the user has just been activated, False if it was already active.
+    """
+    return _apply(token, VERIFY_EMAIL, lambda user_id: CustomUser.objects.filter(
+        pk=user_id, is_active=False).update(is_active=True) == 1)
+
+
+def reset_password(token, raw_password):
+    """
+    Sets a new password for the user a reset token was issued for.
+
+    Returns:
+    - bool: True if the user exists, False otherwise.
+    """
+    return _apply(token, RESET_PASSWORD, lambda user_id: CustomUser.objects.filter(
+        pk=user_id).update(password=make_password(raw_password)) == 1)
@@ -19,4 +19,5 @@ urlpatterns = [
     path('company-selection/', views.CompanySelectionView.as_view(), name='company-selection'),
     path('user-companies/', views.UserCompanyView.as_view(), name='user-companies'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
+    path('import/', views.BulkUserImportView.as_view(), name='bulk-import'),
 ]
@@ -1,9 +1,9 @@
 import logging
 
-from django.conf import settings
-from django.core.mail import EmailMessage
 from rest_framework.reverse import reverse
 
+from notifications.utils import queue_email
+
 logger = logging.getLogger('django.server')
 
 
@@ -14,13 +14,14 @@ class Util:
     This class provides a static method to send an email for user verification.
 
     Methods:
-    - send_email: Sends an email with a verification link to the user.
+    - verification_email: Builds an email with a verification link to the user.
+    - send_email: Queues an email with a verification link to the user.
     """
     @staticmethod
-    def send_email(site, view_name, user, token, message_data):
+    def verification_email(site, view_name, user, token, message_data):
         """
-        Send an email with a verification link to the user.
-SS
+        Build an email with a verification link to the user.
+
         Parameters:
         - site (str): The domain of the website.
         - view_name (str): The name of the view.
@@ -29,19 +30,32 @@ SS
         - message_data (dict): The dict with subject and body for email.
 
         Returns:
-        - None
-
-        Sends an email to the user's email address containing a verification link.
+        - tuple: (subject, body, recipients) ready to be queued.
         """
         verification_link = reverse(view_name, kwargs={'token': str(token)})
         absolute_url = site + verification_link
-        email = EmailMessage(
-            subject=message_data['subject'],
-            body='Hi ' + user.first_name + message_data['body'] + absolute_url,
-            from_email=settings.EMAIL_HOST_USER,
-            to=[user.email]
+        return (
+            message_data['subject'],
+            'Hi ' + user.first_name + message_data['body'] + absolute_url,
+            [user.email]
         )
-        try:
-            email.send()
-        except Exception as e:
-            logging.error(f"Failed to send email to {user.email}: {str(e)}")
+
+    @staticmethod
+    def send_email(site, view_name, user, token, message_data):
+        """
+        Queue an email with a verification link to the user.
+
+        Parameters:
+        - site (str): The domain of the website.
+        - view_name (str): The name of the view.
+        - user (CustomUser): The user object.
+        - token (str): The verification token.
+        - message_data (dict): The dict with subject and body for email.
+
+        Returns:
+        - None
+
+        Queues an email to the user's email address containing a verification link. The email is
+        delivered by the `send_queued_emails` worker, so the request does not wait for SMTP.
+        """
+        queue_email(*Util.verification_email(site, view_name, user, token, message_data))
@@ -1,11 +1,15 @@
+import csv
+
 from django.contrib.auth import authenticate, login
 from rest_framework_simplejwt.exceptions import TokenError
 import jwt
 from django.conf import settings
 from django.contrib.sites.shortcuts import get_current_site
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import status, generics
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -25,6 +29,8 @@ from startups.models import Startup
 from startups.serializers import StartupSerializer
 from .models import CustomUser, UserRoleCompany, UserStartup, UserInvestor
 from .permissions import IsRole
+from .provisioning import provision_users, read_records
+from . import tokens
 from .serializers import (UserRegisterSerializer, RecoveryEmailSerializer, PasswordResetSerializer,
                           RoleSerializer, CompanySerializer)
 from .utils import Util
@@ -286,14 +292,16 @@ class UserRegistrationView(APIView):
         """
         serializer = UserRegisterSerializer(data=request.data)
         if serializer.is_valid():
-            new_user = serializer.save()
-
-            token = RefreshToken.for_user(new_user).access_token
-            message_data = {
-                'subject': 'Verify your email',
-                'body': ' Use the link below to verify your email \n'
-            }
-            Util.send_email(get_current_site(request).domain, 'users:email-verify', new_user, token, message_data)
+            # The verification email is queued in the same transaction as the new user
+            with transaction.atomic():
+                new_user = serializer.save()
+
+                token = tokens.make_token(new_user, tokens.VERIFY_EMAIL)
+                message_data = {
+                    'subject': 'Verify your email',
+                    'body': ' Use the link below to verify your email \n'
+                }
+                Util.send_email(get_current_site(request).domain, 'users:email-verify', new_user, token, message_data)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -328,15 +336,11 @@ class VerifyEmailView(APIView):
             with HTTP status code 400.
         """
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, settings.SIMPLE_JWT['ALGORITHM'])
-            user = CustomUser.objects.get(id=payload['user_id'])
-            if not user.is_active:
-                user.is_active = True
-                user.save()
+            tokens.verify_email(token)
             return Response({'email': 'Successfully activated'}, status=status.HTTP_200_OK)
         except jwt.ExpiredSignatureError:
             return Response({'error': 'Activation Expired'}, status=status.HTTP_400_BAD_REQUEST)
-        except jwt.exceptions.DecodeError:
+        except jwt.InvalidTokenError:
             return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -402,7 +406,7 @@ class PasswordRecoveryView(APIView):
         if serializer.is_valid():
             try:
                 user = CustomUser.objects.get(email=email)
-                token = RefreshToken.for_user(user).access_token
+                token = tokens.make_token(user, tokens.RESET_PASSWORD)
                 message_data = {
                     'subject': 'Password reset link',
                     'body': ' Use the link below to reset your password \n'
@@ -459,16 +463,14 @@ class PasswordResetView(APIView):
         if serializer.is_valid():
             try:
                 if not request.user.is_authenticated:
-                    payload = jwt.decode(token, settings.SECRET_KEY, settings.SIMPLE_JWT['ALGORITHM'])
-                    user = CustomUser.objects.get(id=payload['user_id'])
-                    user.set_password(serializer.validated_data.get('password'))
-                    user.save()
+                    # a token of a user that no longer exists is reported as invalid
+                    if not tokens.reset_password(token, serializer.validated_data.get('password')):
+                        return Response({'error': 'Invalid token'}, status=status.HTTP_404_NOT_FOUND)
                     return Response({'success': 'Password has been successfully updated'},
                                     status=status.HTTP_200_OK)
             except jwt.ExpiredSignatureError:
                 return Response({'error': 'Activation Expired'}, status=status.HTTP_400_BAD_REQUEST)
-            # added CustomUser.DoesNotExist as a sign of invalid token
-            except (jwt.exceptions.DecodeError, CustomUser.DoesNotExist):
+            except jwt.InvalidTokenError:
                 return Response({'error': 'Invalid token'}, status=status.HTTP_404_NOT_FOUND)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -491,4 +493,66 @@ class LogoutView(APIView):
         except KeyError:
             return Response({"error": "Refresh token not provided."}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            return Response({"error": "An unexpected error occurred."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"error": "An unexpected error occurred."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BulkUserImportView(APIView):
+    """
+    Admin-only API endpoint for provisioning users and their companies from a file.
+
+    Request Payload (multipart):
+    - file: A CSV or NDJSON file, see `users.provisioning` for the record fields.
+    - format: 'csv' or 'ndjson' (optional, derived from the file extension by default).
+
+    Files of more than settings.USER_IMPORT_MAX_RECORDS records are rejected, they are imported with
+    the `import_users` command rather than within a request.
+
+    Response:
+    - Status Code: 200
+    - Response Body: {'created': int, 'skipped': int, 'errors': [{'record': int, 'error': str}]}
+
+    Permissions:
+    - IsAdminUser: Only staff users may provision accounts.
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        """
+        Stream the uploaded file through the provisioning pipeline.
+
+        The records are counted before anything is written, so a file that is too large or not UTF-8
+        encoded is rejected as a whole.
+
+        Returns:
+        - Response with the import report.
+        - Response with 400 error if the file is missing, its format is not supported, it is not UTF-8
+          encoded or it holds too many records.
+        """
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'File is required'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+        if file_format not in ('csv', 'ndjson'):
+            return Response({'error': 'Format should be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            count = sum(1 for _ in read_records(upload, file_format))
+        except UnicodeDecodeError:
+            return Response({'error': 'File should be UTF-8 encoded'}, status=status.HTTP_400_BAD_REQUEST)
+        except csv.Error as e:
+            return Response({'error': f'Invalid CSV: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        if count > settings.USER_IMPORT_MAX_RECORDS:
+            return Response({'error': f'File should hold at most {settings.USER_IMPORT_MAX_RECORDS} records, '
+                                      f'larger files are imported with the import_users command'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        upload.seek(0)
+
+        report = provision_users(
+            read_records(upload, file_format),
+            get_current_site(request).domain,
+            chunk_size=settings.USER_IMPORT_CHUNK_SIZE,
+            # no process pool is started from a web worker
+            workers=settings.USER_IMPORT_REQUEST_WORKERS,
+            processes=False
+        )
+        return Response(report, status=status.HTTP_200_OK)